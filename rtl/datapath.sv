@@ -3,7 +3,7 @@
 //-------------------------------
 // Engineer     : Olzhas Nurman
 // Create Date  : 20/01/2025
-// Last Revision: 14/07/2026
+// Last Revision: 18/10/2026
 //------------------------------
 
 
@@ -55,6 +55,8 @@ module datapath
     output logic                     reg_we_mem_o,
     output logic                     reg_we_wb_o,
     output logic                     branch_mispred_ex_o,
+    output logic                     branch_instr_ex_o,
+    output logic                     instr_ret_o,
     output logic                     icache_hit_o,
     output logic [XLEN        - 1:0] axi_raddr_instr_o,
     output logic [XLEN        - 1:0] axi_raddr_data_o,
@@ -503,6 +505,8 @@ module datapath
     //-------------------------------------------------------------
     assign rd_addr_wb_o        = rd_addr_wb_id;
     assign branch_mispred_ex_o = branch_mispred_ex_if;
+    assign branch_instr_ex_o   = branch_instr_ex_if;
+    assign instr_ret_o         = instr_ret_wb_ex;
     assign mdu_busy_ex_o       = mdu_busy_ex;
 
     // Pipeline between Dec & Exec.
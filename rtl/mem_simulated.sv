@@ -3,17 +3,29 @@
 //-------------------------------
 // Engineer     : Olzhas Nurman
 // Create Date  : 20/01/2025
-// Last Revision: 22/06/2026
+// Last Revision: 18/10/2026
 //------------------------------
 
 // --------------------------------------------------------------------------------------
 // This is a instruction memory simulation file.
+//
+// Memory is backed by a sparse page store in C (test/tb/mem_pages.c) that
+// allocates 4 KiB pages on first write, so a simulator only holds the pages
+// its program touches. Building with MAVERIC_DENSE_MEM keeps the full 1 GiB
+// word array in the model instead.
+//
+// The test image is loaded once, before the first clock edge. By default the
+// PT_LOAD segments of the ELF passed to the simulator are copied in word by
+// word (test/tb/mem_image.c). When MAVERIC_MEM_IMAGE_FILE is set
+// (tb_test_env.cpp), that $readmemh hex image is read instead. Defining
+// PATH_TO_MEM bakes a fixed hex image path into a dense build.
 // --------------------------------------------------------------------------------------
-`ifndef PATH_TO_MEM
-`define PATH_TO_MEM "./build/instr/riscv-arch-test/lwu-align-riscv64-nemu.txt"
-`endif
 `include "maveric_pkg.sv"
 
+`ifdef PATH_TO_MEM
+`define MAVERIC_DENSE_MEM
+`endif
+
 module mem_simulated
 // Parameters.
 #(
@@ -36,21 +48,73 @@ module mem_simulated
     output logic                    successful_read_o,
     output logic                    successful_write_o
 );
-    logic [DATA_WIDTH - 1:0] mem [268435455:0];
     logic access;
     logic access_request;
 
     assign access_request = read_request_i | we_i;
 
 
-    always_ff @(posedge clk_i, posedge arst_i) begin
-        if (arst_i) $readmemh(`PATH_TO_MEM, mem);
-        else if (we_i && access && (addr_i < 64'ha0000000)) mem[addr_i[29:2]] <= (wdata_i & {{8{wstrb_i[3]}}, {8{wstrb_i[2]}}, {8{wstrb_i[1]}}, {8{wstrb_i[0]}}}) |
-                                                                         (mem[addr_i[29:2]]  & (~{{8{wstrb_i[3]}}, {8{wstrb_i[2]}}, {8{wstrb_i[1]}}, {8{wstrb_i[0]}}}));
+    logic [DATA_WIDTH - 1:0] mem_rdata;
+    logic                    mem_we;
+
+    assign mem_we = ~arst_i & we_i & access & (addr_i < 64'ha0000000);
+
+`ifdef MAVERIC_DENSE_MEM
+    logic [DATA_WIDTH - 1:0] mem [268435455:0];
+
+`ifndef PATH_TO_MEM
+    // DPI-C functions for loading the test image.
+    import "DPI-C" function int    mem_image_is_hex ();
+    import "DPI-C" function string mem_image_path   ();
+    import "DPI-C" function int    mem_image_next   (output int index, output int word);
+`endif
+
+    initial begin
+`ifdef PATH_TO_MEM
+        $readmemh(`PATH_TO_MEM, mem);
+`else
+        int index;
+        int word;
+
+        if (mem_image_is_hex() != 0) $readmemh(mem_image_path(), mem);
+        else while (mem_image_next(index, word) != 0) mem[index[27:0]] = word;
+`endif
+    end
+
+    always_ff @(posedge clk_i) begin
+        if (mem_we) mem[addr_i[29:2]] <= (wdata_i & {{8{wstrb_i[3]}}, {8{wstrb_i[2]}}, {8{wstrb_i[1]}}, {8{wstrb_i[0]}}}) |
+                                         (mem[addr_i[29:2]]  & (~{{8{wstrb_i[3]}}, {8{wstrb_i[2]}}, {8{wstrb_i[1]}}, {8{wstrb_i[0]}}}));
+    end
+
+    assign mem_rdata = mem[addr_i[29:2]];
+`else
+    // DPI-C functions of the sparse page store.
+    import "DPI-C" function void mem_load_image ();
+    import "DPI-C" function int  mem_read       (input int index, input int write_count);
+    import "DPI-C" function void mem_write      (input int index, input int data, input byte mask);
+
+    // Counts committed writes. It is passed to mem_read only so that the read
+    // below re-evaluates when the page store changes under a stable address.
+    int mem_write_count_q = 0;
+
+    initial begin
+        mem_load_image();
     end
 
+    always_ff @(posedge clk_i) begin
+        if (mem_we) begin
+            mem_write({4'b0, addr_i[29:2]}, wdata_i, {4'b0, wstrb_i});
+            mem_write_count_q <= mem_write_count_q + 1;
+        end
+    end
+
+    always_comb begin
+        mem_rdata = mem_read({4'b0, addr_i[29:2]}, mem_write_count_q);
+    end
+`endif
+
 
-    assign rdata_o            = access ? ((addr_i < 64'ha0000000) ? mem[addr_i[29:2]] : mmio_rdata) : '0;
+    assign rdata_o            = access ? ((addr_i < 64'ha0000000) ? mem_rdata : mmio_rdata) : '0;
     assign successful_read_o  = 1'b1;
     assign successful_write_o = 1'b1;
 
@@ -0,0 +1,203 @@
+/* Copyright (c) 2024-2026 Maveric NU. All rights reserved. */
+
+//-------------------------------
+// Engineer     : Olzhas Nurman
+// Create Date  : 18/10/2026
+// Last Revision: 18/10/2026
+//------------------------------
+
+// ----------------------------------------------------------------------------------------------
+// This module counts microarchitectural events for performance reporting (simulation only).
+// Every stall cycle is charged to one source, in the priority order the hazard unit resolves
+// them, so the stall counts add up to at most the cycle count. The totals are passed to the
+// report_perf DPI-C hook (test/tb/report_perf.c) when the simulation ends; sampled runs read
+// them through perf_counter at the edges of each sample window.
+// ----------------------------------------------------------------------------------------------
+
+module perf_counters
+(
+    // Common clock & reset signal.
+    input  logic clk_i,
+    input  logic arst_i,
+
+    // Retirement.
+    input  logic instr_ret_i,
+
+    // Stall & flush sources.
+    input  logic stall_if_i,
+    input  logic stall_mem_i,
+    input  logic stall_cache_i,
+    input  logic mmio_stall_i,
+    input  logic mmu_stall_i,
+    input  logic mmu_stall_icache_i,
+    input  logic mdu_busy_i,
+    input  logic trap_stall_i,
+    input  logic csr_stall_i,
+    input  logic trap_return_stall_i,
+    input  logic sfence_i,
+    input  logic fencei_wb_done_full_i,
+    input  logic branch_mispred_i,
+    input  logic load_stall_i,
+
+    // Caches.
+    input  logic icache_hit_i,
+    input  logic instr_we_i,
+    input  logic mem_access_i,
+    input  logic dcache_hit_i,
+    input  logic dcache_we_i,
+
+    // Branches.
+    input  logic branch_instr_i
+);
+
+    /* verilator coverage_off */
+
+    //-------------------------------------------------------------
+    // Stall source of the current cycle.
+    //-------------------------------------------------------------
+    typedef enum logic [2:0]
+    {
+        SRC_NONE      = 3'd0,
+        SRC_CACHE     = 3'd1, // I$/D$ refill, write-back, MMIO.
+        SRC_MMU       = 3'd2, // Page-table walks.
+        SRC_MDU       = 3'd3, // Multi-cycle multiply/divide.
+        SRC_SERIALIZE = 3'd4, // Trap entry/return, CSR writes, sfence.vma, fence.i.
+        SRC_BRANCH    = 3'd5, // Branch misprediction flush.
+        SRC_LOAD_USE  = 3'd6  // Load-use hazard.
+    } t_stall_src;
+
+    t_stall_src stall_src;
+
+    always_comb begin
+        if      (stall_cache_i | mmio_stall_i                               ) stall_src = SRC_CACHE;
+        else if (mmu_stall_i                                                ) stall_src = SRC_MMU;
+        else if (mdu_busy_i                                                 ) stall_src = SRC_MDU;
+        else if (trap_stall_i | csr_stall_i | trap_return_stall_i | sfence_i) stall_src = SRC_SERIALIZE;
+        else if (mmu_stall_icache_i                                         ) stall_src = SRC_MMU;
+        else if (fencei_wb_done_full_i                                      ) stall_src = SRC_SERIALIZE;
+        else if (branch_mispred_i                                           ) stall_src = SRC_BRANCH;
+        else if (load_stall_i                                               ) stall_src = SRC_LOAD_USE;
+        else                                                                  stall_src = SRC_NONE;
+    end
+
+
+    //-------------------------------------------------------------
+    // Counters.
+    //-------------------------------------------------------------
+    logic [63:0] cycle_count;
+    logic [63:0] instr_count;
+    logic [63:0] stall_cache_cycles;
+    logic [63:0] stall_mmu_cycles;
+    logic [63:0] stall_mdu_cycles;
+    logic [63:0] stall_serialize_cycles;
+    logic [63:0] flush_branch_cycles;
+    logic [63:0] stall_load_use_cycles;
+    logic [63:0] icache_hits;
+    logic [63:0] icache_misses;
+    logic [63:0] dcache_hits;
+    logic [63:0] dcache_misses;
+    logic [63:0] branch_total;
+    logic [63:0] branch_mispred;
+
+    always_ff @(posedge clk_i, posedge arst_i) begin
+        if (arst_i) begin
+            cycle_count            <= '0;
+            instr_count            <= '0;
+            stall_cache_cycles     <= '0;
+            stall_mmu_cycles       <= '0;
+            stall_mdu_cycles       <= '0;
+            stall_serialize_cycles <= '0;
+            flush_branch_cycles    <= '0;
+            stall_load_use_cycles  <= '0;
+            icache_hits            <= '0;
+            icache_misses          <= '0;
+            dcache_hits            <= '0;
+            dcache_misses          <= '0;
+            branch_total           <= '0;
+            branch_mispred         <= '0;
+        end
+        else begin
+            cycle_count <= cycle_count + 64'd1;
+            if (instr_ret_i) instr_count <= instr_count + 64'd1;
+
+            case (stall_src)
+                SRC_CACHE    : stall_cache_cycles     <= stall_cache_cycles     + 64'd1;
+                SRC_MMU      : stall_mmu_cycles       <= stall_mmu_cycles       + 64'd1;
+                SRC_MDU      : stall_mdu_cycles       <= stall_mdu_cycles       + 64'd1;
+                SRC_SERIALIZE: stall_serialize_cycles <= stall_serialize_cycles + 64'd1;
+                SRC_BRANCH   : flush_branch_cycles    <= flush_branch_cycles    + 64'd1;
+                SRC_LOAD_USE : stall_load_use_cycles  <= stall_load_use_cycles  + 64'd1;
+                default      : ;
+            endcase
+
+            // A fetch or memory access counts once, in the cycle it leaves its
+            // stage; a miss counts once, when its refill is written.
+            if (~ stall_if_i  & icache_hit_i               ) icache_hits   <= icache_hits   + 64'd1;
+            if (instr_we_i                                 ) icache_misses <= icache_misses + 64'd1;
+            if (~ stall_mem_i & mem_access_i & dcache_hit_i) dcache_hits   <= dcache_hits   + 64'd1;
+            if (dcache_we_i                                ) dcache_misses <= dcache_misses + 64'd1;
+
+            if (~ stall_if_i & branch_instr_i  ) branch_total   <= branch_total   + 64'd1;
+            if (~ stall_if_i & branch_mispred_i) branch_mispred <= branch_mispred + 64'd1;
+        end
+    end
+
+
+    //-------------------------------------------------------------
+    // Report.
+    //-------------------------------------------------------------
+    import "DPI-C" function void report_perf(
+        longint unsigned cycle_count,
+        longint unsigned instr_count,
+        longint unsigned stall_cache_cycles,
+        longint unsigned stall_mmu_cycles,
+        longint unsigned stall_mdu_cycles,
+        longint unsigned stall_serialize_cycles,
+        longint unsigned flush_branch_cycles,
+        longint unsigned stall_load_use_cycles,
+        longint unsigned icache_hits,
+        longint unsigned icache_misses,
+        longint unsigned dcache_hits,
+        longint unsigned dcache_misses,
+        longint unsigned branch_total,
+        longint unsigned branch_mispred
+    );
+
+    // Read by the sampled-simulation hooks (test/tb/dromajo_cosim.cpp) at the
+    // edges of a sample window. Keep the indices in step with sample_counter there.
+    export "DPI-C" function perf_counter;
+
+    function longint perf_counter(input int index);
+        case (index)
+            0      : return icache_hits;
+            1      : return icache_misses;
+            2      : return dcache_hits;
+            3      : return dcache_misses;
+            4      : return branch_total;
+            5      : return branch_mispred;
+            default: return '0;
+        endcase
+    endfunction
+
+    final begin
+        report_perf(
+            cycle_count,
+            instr_count,
+            stall_cache_cycles,
+            stall_mmu_cycles,
+            stall_mdu_cycles,
+            stall_serialize_cycles,
+            flush_branch_cycles,
+            stall_load_use_cycles,
+            icache_hits,
+            icache_misses,
+            dcache_hits,
+            dcache_misses,
+            branch_total,
+            branch_mispred
+        );
+    end
+
+    /* verilator coverage_on */
+
+endmodule
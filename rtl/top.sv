@@ -3,7 +3,7 @@
 //-------------------------------
 // Engineer     : Olzhas Nurman
 // Create Date  : 20/01/2025
-// Last Revision: 15/07/2026
+// Last Revision: 18/10/2026
 //------------------------------
 
 // -----------------------------------------------------------------------
@@ -61,6 +61,8 @@ module top
     logic                    reg_we_mem;
     logic                    reg_we_wb;
     logic                    branch_mispred_ex;
+    logic                    branch_instr_ex;
+    logic                    instr_ret;
     logic                    load_instr_ex;
     logic                    mdu_busy_ex;
     logic                    mmu_stall_icache;
@@ -137,6 +139,8 @@ module top
         .reg_we_mem_o          (reg_we_mem          ),
         .reg_we_wb_o           (reg_we_wb           ),
         .branch_mispred_ex_o   (branch_mispred_ex   ),
+        .branch_instr_ex_o     (branch_instr_ex     ),
+        .instr_ret_o           (instr_ret           ),
         .icache_hit_o          (icache_hit          ),
         .axi_raddr_instr_o     (axi_raddr_icache    ),
         .axi_raddr_data_o      (axi_raddr_dcache    ),
@@ -228,6 +232,37 @@ module top
 
 
 
+    //-------------------------------------
+    // Performance counters.
+    //-------------------------------------
+    perf_counters PERF0 (
+        .clk_i                 (clk_i              ),
+        .arst_i                (arst_i             ),
+        .instr_ret_i           (instr_ret          ),
+        .stall_if_i            (stall_if           ),
+        .stall_mem_i           (stall_mem          ),
+        .stall_cache_i         (stall_cache        ),
+        .mmio_stall_i          (mmio_stall         ),
+        .mmu_stall_i           (mmu_stall          ),
+        .mmu_stall_icache_i    (mmu_stall_icache   ),
+        .mdu_busy_i            (mdu_busy_ex        ),
+        .trap_stall_i          (trap_stall         ),
+        .csr_stall_i           (csr_stall          ),
+        .trap_return_stall_i   (trap_return_stall  ),
+        .sfence_i              (sfence             ),
+        .fencei_wb_done_full_i (fencei_wb_done_full),
+        .branch_mispred_i      (branch_mispred_ex  ),
+        .load_stall_i          (load_stall         ),
+        .icache_hit_i          (icache_hit         ),
+        .instr_we_i            (instr_we           ),
+        .mem_access_i          (mem_access         ),
+        .dcache_hit_i          (dcache_hit         ),
+        .dcache_we_i           (dcache_we          ),
+        .branch_instr_i        (branch_instr_ex    )
+    );
+
+
+
     //---------------------------------------------
     // Internal continious assignments.
     //---------------------------------------------
@@ -3,23 +3,34 @@
 from __future__ import annotations
 
 import argparse
-import difflib
+import hashlib
+import heapq
+import json
+import math
 import os
 import re
 import selectors
 import shlex
 import shutil
+import signal
+import struct
 import subprocess
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
-from itertools import islice
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Callable, Mapping, Sequence
-
-from scripts import disasm2mem, elf2disasm
+from typing import BinaryIO, Callable, Mapping, Sequence
+
+from scripts import (
+    covselect,
+    disasm2mem,
+    elf2disasm,
+    sweepreport,
+    tracediff,
+    tracefmt,
+)
 from scripts.test_catalog import (
     GROUP_NAMES,
     SUBGROUP_NAMES,
@@ -39,6 +50,18 @@ ROOT = Path(__file__).resolve().parent
 SCRIPT_TRACECOMP = ROOT / "scripts/tracecomp.py"
 
 RESULT_FILE = ROOT / "results/result.txt"
+# Performance counters of every passing run, one JSON object per line and the
+# latest per (test, BLOCK_WIDTH, SET_COUNT); perf_result.txt is rendered from
+# them after each suite.
+PERF_RECORDS_FILE = ROOT / "results/perf_records.jsonl"
+PERF_RESULT_FILE = ROOT / "results/perf_result.txt"
+# Cache design-space report of a -v sweep (scripts/sweepreport.py), rebuilt
+# from the perf records of the swept tests once the sweep ends.
+SWEEP_REPORT_FILE = ROOT / "results/sweep_report.txt"
+SWEEP_REPORT_CSV_FILE = ROOT / "results/sweep_report.csv"
+# Rungs of a --sweep-strategy halving search: the tests each ran, the points
+# it measured with their metrics, and the points it promoted.
+SWEEP_SEARCH_FILE = ROOT / "results/sweep_search.json"
 
 DROMAJO_DIR = ROOT / "tools/dromajo"
 DROMAJO_INCLUDE = DROMAJO_DIR / "include"
@@ -47,7 +70,6 @@ DROMAJO_LIB = DROMAJO_DIR / "build" / "libdromajo_cosim.a"
 # All run artifacts live under build/: generated test inputs, per-test
 # Verilator builds, run outputs, traces, waveforms, and coverage.
 BUILD_DIR = ROOT / "build"
-BUILD_OBJ_DIR = BUILD_DIR / "obj"
 BUILD_RUN_DIR = BUILD_DIR / "run"
 LOG_TRACE_DIR = BUILD_DIR / "log_trace"
 SPIKE_LOG_TRACE_DIR = BUILD_DIR / "spike_log_trace"
@@ -58,6 +80,108 @@ COVERAGE_OUT_DIR = BUILD_DIR / "coverage"
 MERGED_COVERAGE_FILE = COVERAGE_OUT_DIR / "merged.dat"
 COVERAGE_RESULTS_FILE = COVERAGE_OUT_DIR / "coverage_results.txt"
 COVERAGE_ANNOTATED_DIR = COVERAGE_OUT_DIR / "annotated"
+# Per-test coverage files are folded into partial merges while the suite runs
+# (CoverageMerger), by up to MAVERIC_COVERAGE_MERGE_WORKERS verilator_coverage
+# processes at a time. PARTIAL holds the coverage of the tests finished so far.
+COVERAGE_MERGE_DIR = COVERAGE_OUT_DIR / "merge"
+COVERAGE_PARTIAL_FILE = COVERAGE_OUT_DIR / "partial.dat"
+COVERAGE_MERGE_WORKERS = int(os.environ.get("MAVERIC_COVERAGE_MERGE_WORKERS", "2"))
+# Coverage-guided regression subset (-g smoke-cov): the fewest tests that keep
+# MAVERIC_SMOKE_COV_TARGET of the coverage the whole suite reaches, picked
+# again from the per-test coverage files of every -a coverage run
+# (scripts/covselect.py). MAVERIC_SMOKE_COV_WEIGHTED=1 weighs each test's
+# contribution against its runtime history.
+SMOKE_COV_GROUP = "smoke-cov"
+SMOKE_COV_FILE = ROOT / "results/smoke_cov.json"
+SMOKE_COV_TARGET = float(os.environ.get("MAVERIC_SMOKE_COV_TARGET", "1.0"))
+SMOKE_COV_WEIGHTED = os.environ.get("MAVERIC_SMOKE_COV_WEIGHTED", "0") == "1"
+# Simulator builds, one directory per distinct set of build inputs. Entries are
+# reused across runs and evicted least recently used first once the cache grows
+# past MAVERIC_SIM_CACHE_MAX_BYTES.
+SIM_CACHE_DIR = BUILD_DIR / "sim_cache"
+SIM_CACHE_MARKER = ".complete"
+SIM_CACHE_MAX_BYTES = int(
+    os.environ.get("MAVERIC_SIM_CACHE_MAX_BYTES", str(8 * 1024 * 1024 * 1024))
+)
+
+# Normalized Spike reference traces, keyed by the ELF contents and everything
+# else that shapes the trace (ISA, continue-after-trap, tracecomp version).
+# They do not depend on the RTL or the cache geometry, so an entry is reused
+# across runs, -v sweep points, and branches until --refresh-spike-cache.
+SPIKE_TRACE_CACHE_DIR = BUILD_DIR / "spike_trace_cache"
+# Outcomes of passing runs, one file per run key: a digest of the simulator's
+# build inputs, the ELF, and every flag that shapes the run. --changed-only
+# reports a test whose key is here as cached instead of running it again.
+OUTCOME_CACHE_DIR = BUILD_DIR / "outcome_cache"
+# Booted-kernel checkpoints, one directory per simulator, shared test image,
+# and guard range (see TestRunner._plan_checkpoints). Entries are reused across
+# runs and evicted least recently used first once they grow past
+# MAVERIC_CHECKPOINT_MAX_BYTES.
+CHECKPOINT_DIR = BUILD_DIR / "checkpoints"
+CHECKPOINT_MAX_BYTES = int(
+    os.environ.get("MAVERIC_CHECKPOINT_MAX_BYTES", str(2 * 1024 * 1024 * 1024))
+)
+# Cycles between the rolling checkpoints a saving run stages while it boots;
+# the published checkpoint is at most this far before the end of the boot.
+CHECKPOINT_INTERVAL_CYCLES = int(
+    os.environ.get("MAVERIC_CHECKPOINT_INTERVAL", "2000000")
+)
+# Groups whose tests boot the same kernel and differ only in a small part of
+# their image, and how large that part may be for tests to share a checkpoint.
+CHECKPOINT_GROUPS = ("xv6",)
+CHECKPOINT_MAX_GUARD_BYTES = 4096
+# How often a test waiting on a checkpoint looks for it again.
+CHECKPOINT_POLL_SECONDS = 1.0
+# Sampled simulation (--sample): each test is measured over
+# MAVERIC_SAMPLE_WINDOWS windows of MAVERIC_SAMPLE_WINDOW retired
+# instructions, spread evenly over the program. Dromajo fast-forwards to each
+# one, and the RTL runs MAVERIC_SAMPLE_WARMUP instructions before the window
+# to warm its caches and branch predictor.
+SAMPLE_WINDOWS = int(os.environ.get("MAVERIC_SAMPLE_WINDOWS", "10"))
+SAMPLE_WINDOW_INSTRUCTIONS = int(os.environ.get("MAVERIC_SAMPLE_WINDOW", "10000"))
+SAMPLE_WARMUP_INSTRUCTIONS = int(os.environ.get("MAVERIC_SAMPLE_WARMUP", "50000"))
+# Two-sided 95% Student t quantiles for 1..30 degrees of freedom; the normal
+# quantile is close enough beyond that.
+T_QUANTILES_95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+NORMAL_QUANTILE_95 = 1.96
+# Per-test phase durations from earlier runs; -j runs start the tests that
+# are expected to take longest first and print an ETA from them.
+TIMING_DB_FILE = BUILD_DIR / "timing.json"
+
+# Compiler cache put in front of every compile of the generated simulator
+# makefile (verilated.mk's OBJCACHE). The Verilator runtime, the testbench
+# sources, and model files that did not change are then compiled once and
+# reused by every later build. MAVERIC_OBJCACHE= (empty) turns it off.
+OBJCACHE = os.environ.get("MAVERIC_OBJCACHE", "ccache")
+OBJCACHE_DIR = BUILD_DIR / "ccache"
+OBJCACHE_MAX_SIZE = os.environ.get("MAVERIC_OBJCACHE_MAX_SIZE", "5G")
+
+# -j runs build simulators in their own pool, BUILD_WORKERS at a time with the
+# cores split between them. The build stage runs at most BUILD_AHEAD models
+# ahead of the simulations: it waits while that many built (or building)
+# models still have tests queued.
+BUILD_WORKERS = int(os.environ.get("MAVERIC_BUILD_WORKERS", "2"))
+BUILD_AHEAD = int(os.environ.get("MAVERIC_BUILD_AHEAD", "2"))
+# Room -j runs always leave free. Simulations and simulator builds are only
+# started while measured free memory and free space in build/, less these
+# reserves and the footprints of work already running, fit their own
+# footprint. Footprints are learned per test (build/timing.json); tests with
+# no history are assumed to be average, or the defaults below.
+MEMORY_RESERVE_BYTES = int(
+    os.environ.get("MAVERIC_MEMORY_RESERVE_BYTES", str(1024 * 1024 * 1024))
+)
+DISK_RESERVE_BYTES = int(
+    os.environ.get("MAVERIC_DISK_RESERVE_BYTES", str(2 * 1024 * 1024 * 1024))
+)
+DEFAULT_TEST_MEMORY_BYTES = 512 * 1024 * 1024
+DEFAULT_TEST_DISK_BYTES = 64 * 1024 * 1024
+DEFAULT_BUILD_DISK_BYTES = 256 * 1024 * 1024
+# How often a throttled admission measures free memory and disk again.
+RESOURCE_POLL_SECONDS = 1.0
 
 # Artifact locations used before the build/ tree existed; removed by -c so a
 # checkout carrying them transitions cleanly.
@@ -88,6 +212,12 @@ DEFAULT_ASSOCIATIVITY = 4
 
 CACHE_SWEEP_BLOCK_WIDTHS = (128, 256, 512, 1024)
 CACHE_SWEEP_SET_COUNTS = (2, 4, 8, 16)
+# grid runs every test at every sweep point. halving runs every point on a
+# small, cheap subset of the tests and promotes the best 1/MAVERIC_SWEEP_ETA
+# of them (by geomean CPI) to MAVERIC_SWEEP_ETA times as many tests, until the
+# last few points run the whole selection.
+SWEEP_STRATEGIES = ("grid", "halving")
+SWEEP_HALVING_ETA = int(os.environ.get("MAVERIC_SWEEP_ETA", "2"))
 
 COMMAND_TIMEOUT_SECONDS = int(os.environ.get("MAVERIC_COMMAND_TIMEOUT_SEC", "600"))
 SIMULATION_TIMEOUT_SECONDS = int(os.environ.get("MAVERIC_SIM_TIMEOUT_SEC", "180"))
@@ -95,6 +225,8 @@ SIMULATION_IDLE_TIMEOUT_SECONDS = int(
     os.environ.get("MAVERIC_SIM_IDLE_TIMEOUT_SEC", "20")
 )
 TRACE_TIMEOUT_SECONDS = int(os.environ.get("MAVERIC_TRACE_TIMEOUT_SEC", "20"))
+# How often a blocking command checks whether it has been cancelled.
+CANCEL_POLL_SECONDS = 0.2
 # Simulation log files (RTL trace, PMEM writes) that grow past this size stop
 # the run with a LOG-LIMIT outcome instead of filling the disk.
 TRACE_MAX_BYTES = int(
@@ -108,9 +240,73 @@ DEFAULT_MAX_SIM_TIME = 20_000_000
 XV6_MAX_SIM_TIME = 20_000_000_000
 SELF_LOOP_CONTINUE_SIM_TIME = 20_000_000
 
+# mem_simulated indexes its word array with addr[29:2] (test/tb/mem_pages.c).
+MEM_WORD_INDEX_MASK = 0x0FFFFFFF
+ELF_PT_LOAD = 1
+
 OUTPUT_TAIL_BYTES = 8192
 VERILATOR_WARNING_RE = re.compile(r"^%Warning(?:-[A-Za-z0-9_]+)?:", re.MULTILINE)
 STATUS_COLOR_RE = re.compile(r"\b(PASS|FAIL|N/A|Skipped)\b")
+# Section headers of results/result.txt (format_cache_header).
+CACHE_HEADER_RE = re.compile(r"(\n\nCACHE_LINE_WIDTH: [^\n]*\n)")
+# Printed by test/tb/log_trace.c when a lockstep comparison against a cached
+# Spike trace ends the simulation at the first mismatch.
+TRACE_MISMATCH_MARKER = "[tracecomp] MISMATCH"
+# Printed by test/tb/tb_test_env.cpp once the simulation loop ends.
+SIM_SPEED_RE = re.compile(r"^Simulated (\d+) cycles in ([0-9.]+) s$", re.MULTILINE)
+PEAK_MEMORY_RE = re.compile(r"^Peak memory: (\d+) KiB$", re.MULTILINE)
+# Printed by test/tb/report_perf.c from the final block of rtl/perf_counters.sv.
+PERF_RECORD_RE = re.compile(r"^Perf record: (.*)$", re.MULTILINE)
+PERF_COUNTER_NAMES = (
+    "cycles",
+    "instret",
+    "stall_cache",
+    "stall_mmu",
+    "stall_mdu",
+    "stall_serialize",
+    "flush_branch",
+    "stall_load_use",
+    "icache_hits",
+    "icache_misses",
+    "dcache_hits",
+    "dcache_misses",
+    "branches",
+    "branch_mispredicts",
+)
+# Printed by test/tb/dromajo_cosim.cpp in sampled runs.
+PROGRAM_LENGTH_RE = re.compile(r"^Program length: (\d+) instructions$", re.MULTILINE)
+SAMPLE_WINDOW_RE = re.compile(
+    r"^Sample window at instruction (\d+): (\d+) instructions in (\d+) cycles;"
+    r"(.*)$",
+    re.MULTILINE,
+)
+# Counters each sample window reports the change of, and the ratios of them
+# estimated next to CPI (SampleWindow properties).
+SAMPLE_COUNTER_NAMES = (
+    "icache_hits",
+    "icache_misses",
+    "dcache_hits",
+    "dcache_misses",
+    "branches",
+    "branch_mispredicts",
+)
+SAMPLE_RATIOS = ("icache_hit_rate", "dcache_hit_rate", "branch_accuracy")
+# Verilator model build profiles (--sim-profile). "debug" is the historical
+# single-threaded build; "fast" adds Verilator and C++ optimizations; "mt:N"
+# is "fast" with an N-thread model.
+SIM_PROFILE_RE = re.compile(r"^(debug|fast|mt:([1-9][0-9]*))$")
+FAST_PROFILE_VERILATOR_ARGUMENTS = (
+    "-O3",
+    "--x-assign",
+    "fast",
+    "--x-initial",
+    "fast",
+    "--output-split",
+    "20000",
+    "--output-split-cfuncs",
+    "20000",
+)
+FAST_PROFILE_MAKE_ARGUMENTS = ("OPT_FAST=-O3", "OPT_SLOW=-O1", "OPT_GLOBAL=-O2")
 ANSI_GREEN = "\033[32m"
 ANSI_RED = "\033[31m"
 ANSI_YELLOW = "\033[33m"
@@ -144,7 +340,8 @@ HELP_MSG_SINGLE_DESCRIPTION = (
 )
 HELP_MSG_GROUP_DESCRIPTION = (
     f"Run a group of tests. Available groups: {', '.join(GROUP_NAMES)}. "
-    f"Sub-groups: {', '.join(SUBGROUP_NAMES)}."
+    f"Sub-groups: {', '.join(SUBGROUP_NAMES)}. {SMOKE_COV_GROUP} runs the "
+    "smallest set of tests that keeps the coverage of the last -a coverage run."
 )
 HELP_MSG_LINT_DESCRIPTION = "Run Verilator lint-only check for an RTL module."
 HELP_MSG_CLEAN_DESCRIPTION = (
@@ -153,6 +350,13 @@ HELP_MSG_CLEAN_DESCRIPTION = (
 )
 HELP_MSG_TRACE_DESCRIPTION = "Generate a waveform dump for the executed tests."
 HELP_MSG_VARYING_DESCRIPTION = "Sweep BLOCK_WIDTH from 128 b to 1024 b and SET_COUNT from 2 to 16, holding D-cache associativity at the saved default (N=4). Applies to the default run, -s, -g, or -a."
+HELP_MSG_SWEEP_STRATEGY_DESCRIPTION = (
+    "How -v searches the cache sweep: grid (default) runs every test at all "
+    "16 points; halving runs all points on a cheap subset of the tests and "
+    "promotes only the best ones to more tests, ending with a few points on "
+    "the full selection (MAVERIC_SWEEP_ETA, default 2, sets the cut per "
+    "round). The rounds are logged to results/sweep_search.json."
+)
 HELP_MSG_COVERAGE_ALL_DESCRIPTION = "Generate both line and toggle coverage."
 HELP_MSG_COVERAGE_LINE_DESCRIPTION = "Generate line coverage only."
 HELP_MSG_COVERAGE_TOGGLE_DESCRIPTION = "Generate toggle coverage only."
@@ -177,8 +381,9 @@ HELP_MSG_NO_SELF_CHECK_DESCRIPTION = (
     "Do not enforce the a0 self-check; report it as N/A instead of PASS/FAIL."
 )
 HELP_MSG_JOBS_DESCRIPTION = (
-    "Run up to N tests concurrently (default: 1). Each test builds its own "
-    "simulator under build/obj/<test>, so batch runs scale with N."
+    "Run up to N tests concurrently (default: 1). Tests that share a cache "
+    "configuration and build flags share one simulator, cached under "
+    "build/sim_cache/<config>-<digest>/, so batch runs scale with N."
 )
 HELP_MSG_CONTINUE_AFTER_TRAP_DESCRIPTION = (
     "Run every test past the ebreak/ecall trap instead of finishing on it "
@@ -187,6 +392,54 @@ HELP_MSG_CONTINUE_AFTER_TRAP_DESCRIPTION = (
 HELP_MSG_WARNINGS_DESCRIPTION = (
     "Show Verilator warnings and print the Verilator warning count."
 )
+HELP_MSG_KEEP_SPIKE_LOG_DESCRIPTION = (
+    "Also keep Spike's raw commit log next to the normalized reference trace "
+    "(build/spike_log_trace/<test>-spike-original.log)."
+)
+HELP_MSG_REFRESH_SPIKE_CACHE_DESCRIPTION = (
+    "Regenerate the Spike reference traces of the selected tests instead of "
+    "reusing the ones cached under build/spike_trace_cache/."
+)
+HELP_MSG_CHANGED_ONLY_DESCRIPTION = (
+    "Skip tests that passed on an earlier run with identical RTL, testbench, "
+    "ELF, and flags; results/result.txt marks them as cached."
+)
+HELP_MSG_NO_CHECKPOINT_DESCRIPTION = (
+    "Boot every xv6 test from reset instead of restoring the booted kernel "
+    "from a checkpoint shared by tests with near-identical images."
+)
+HELP_MSG_SAMPLE_DESCRIPTION = (
+    "Estimate each test's CPI from short RTL windows instead of simulating "
+    "every instruction: Dromajo fast-forwards to evenly spaced points and "
+    "hands its state to the RTL, which warms up and measures a window there "
+    "(MAVERIC_SAMPLE_WINDOWS, MAVERIC_SAMPLE_WINDOW, MAVERIC_SAMPLE_WARMUP). "
+    "Reports the CPI, cache hit rates, and branch accuracy with 95%% confidence "
+    "intervals; nothing is self-checked."
+)
+HELP_MSG_SIM_PROFILE_DESCRIPTION = (
+    "Verilator model build profile: debug (default, the plain single-threaded "
+    "build), fast (-O3, --x-assign/--x-initial fast, split output, optimized "
+    "C++), or mt:N (fast with an N-thread model; -j is lowered so the "
+    "simulations' threads fit on the available cores). Each test reports its "
+    "simulated cycles per second."
+)
+HELP_MSG_NO_LOCKSTEP_DESCRIPTION = (
+    "Always run the simulation to the end and compare traces afterwards, "
+    "instead of checking each retirement against a cached Spike trace and "
+    "stopping at the first mismatch."
+)
+HELP_MSG_TEXT_TRACE_DESCRIPTION = (
+    "Write the RTL commit trace as text instead of the compact binary records "
+    "(decode those with scripts/tracefmt.py)."
+)
+HELP_MSG_DENSE_MEM_DESCRIPTION = (
+    "Back the simulated memory with the full 1 GiB RTL array instead of the "
+    "sparse page store (MAVERIC_DENSE_MEM)."
+)
+HELP_MSG_HEX_IMAGE_DESCRIPTION = (
+    "Load tests from objdump-generated $readmemh images under build/instr/ "
+    "instead of copying the ELF segments into memory directly."
+)
 
 
 class RunTestsError(Exception):
@@ -244,24 +497,85 @@ class TraceLimitExceeded(RunTestsError):
 class ParsedSimulationOutput:
     status_text: str | None
     status_missing: bool = False
+    trace_mismatch: bool = False
+    cycles: int | None = None
+    sim_seconds: float | None = None
+    peak_memory: int | None = None
+    perf: Mapping[str, int] | None = None
 
 
 @dataclass(frozen=True)
 class TestOutcome:
     self_check: str
     tracecomp: str
+    # Reported from the outcome cache (--changed-only) without running.
+    cached: bool = False
+
+
+@dataclass(frozen=True)
+class SimulatorConfig:
+    """Build-time inputs that distinguish one Verilator model from another.
+
+    The test program is loaded at run time (test/tb/mem_image.c), so every
+    test with the same configuration runs on the same simulator binary."""
+
+    block_width: int
+    set_count: int
+    continue_after_trap: bool
+    self_loop_continue: bool
+    dromajo_cosim: bool
+    rtl_trace: bool
+    coverage_mode: str | None
+    waveform: bool
+    dense_mem: bool
+    profile: str
+    # Built with --savable for boot checkpoints (MAVERIC_CHECKPOINT).
+    savable: bool = False
+
+    @property
+    def name(self) -> str:
+        parts = [f"bw{self.block_width}", f"sc{self.set_count}"]
+        if self.continue_after_trap:
+            parts.append("trap-continue")
+        if self.self_loop_continue:
+            parts.append("self-loop-continue")
+        if self.dromajo_cosim:
+            parts.append("cosim")
+        if self.rtl_trace:
+            parts.append("rtl-trace")
+        if self.coverage_mode is not None:
+            parts.append(f"cov-{self.coverage_mode}")
+        if self.waveform:
+            parts.append("fst")
+        if self.dense_mem:
+            parts.append("dense-mem")
+        if self.profile != "debug":
+            parts.append(self.profile.replace(":", ""))
+        if self.savable:
+            parts.append("savable")
+        return "-".join(parts)
+
+
+@dataclass
+class SimulatorBuild:
+    """One cached simulator build shared by every test of its configuration."""
+
+    obj_dir: Path
+    lock: threading.Lock
+    built: bool = False
+
+    @property
+    def sim_binary(self) -> Path:
+        return self.obj_dir / "Vtest_env"
 
 
 @dataclass(frozen=True)
 class TestPaths:
     """Per-test artifact locations inside the build/ tree."""
 
-    obj_dir: Path
-    sim_binary: Path
     run_dir: Path
     res_file: Path
     trace_diff_file: Path
-    spike_scratch_log: Path
     coverage_file: Path
     rtl_trace_file: Path
     spike_trace_file: Path
@@ -270,6 +584,197 @@ class TestPaths:
     waveform_file: Path
 
 
+@dataclass(frozen=True)
+class LoadSegment:
+    """A PT_LOAD segment of a test ELF."""
+
+    address: int
+    data: bytes
+    memory_size: int
+
+
+@dataclass(frozen=True)
+class BootCheckpoint:
+    """Booted state shared by tests whose images differ only in `guard`, a
+    [lo, hi) range of mem_simulated word indices.
+
+    The run with index `saver_index` saves it while it boots; the others
+    restore it once it is there, or boot themselves once the saver is done
+    without one."""
+
+    directory: Path
+    guard: tuple[int, int]
+    saver_index: int
+    members: int
+    saver_done: threading.Event = field(default_factory=threading.Event, compare=False)
+
+
+@dataclass(frozen=True)
+class SampleWindow:
+    """One measured window of a sampled run (--sample)."""
+
+    # Instructions Dromajo retired before handing over to the RTL.
+    start: int
+    instructions: int
+    cycles: int
+    # Changes of the rtl/perf_counters.sv counters over the window, by
+    # SAMPLE_COUNTER_NAMES.
+    counters: Mapping[str, int]
+
+    @property
+    def icache_hit_rate(self) -> float | None:
+        return PerfRecord._ratio(
+            self.counters["icache_hits"],
+            self.counters["icache_hits"] + self.counters["icache_misses"],
+        )
+
+    @property
+    def dcache_hit_rate(self) -> float | None:
+        return PerfRecord._ratio(
+            self.counters["dcache_hits"],
+            self.counters["dcache_hits"] + self.counters["dcache_misses"],
+        )
+
+    @property
+    def branch_accuracy(self) -> float | None:
+        return PerfRecord._ratio(
+            self.counters["branches"] - self.counters["branch_mispredicts"],
+            self.counters["branches"],
+        )
+
+
+@dataclass(frozen=True)
+class SampleStatistic:
+    """Mean of a per-window figure."""
+
+    mean: float
+    # Half width of the 95% confidence interval; None with a single window
+    # (a program too short to sample is measured whole).
+    half_width: float | None
+    windows: int
+
+
+@dataclass(frozen=True)
+class SampleEstimate:
+    """CPI, cache hit rates, and branch accuracy of a whole program estimated
+    from its sample windows."""
+
+    cpi: SampleStatistic
+    # By SAMPLE_RATIOS name; a ratio no window had accesses or branches for
+    # is left out.
+    ratios: Mapping[str, SampleStatistic]
+    program_length: int
+
+
+@dataclass(frozen=True)
+class PerfRecord:
+    """Performance counters of one passing run (rtl/perf_counters.sv)."""
+
+    test_name: str
+    block_width: int
+    set_count: int
+    associativity: int
+    counters: Mapping[str, int]
+    recorded: str
+
+    @property
+    def key(self) -> tuple[str, int, int]:
+        return (self.test_name, self.block_width, self.set_count)
+
+    @property
+    def cpi(self) -> float | None:
+        return self._ratio(self.counters["cycles"], self.counters["instret"])
+
+    @property
+    def pipeline_cpi(self) -> float | None:
+        """CPI without the cycles spent waiting on memory."""
+        return self._ratio(
+            self.counters["cycles"] - self.counters["stall_cache"],
+            self.counters["instret"],
+        )
+
+    @property
+    def icache_hit_rate(self) -> float | None:
+        return self._ratio(
+            self.counters["icache_hits"],
+            self.counters["icache_hits"] + self.counters["icache_misses"],
+        )
+
+    @property
+    def dcache_hit_rate(self) -> float | None:
+        return self._ratio(
+            self.counters["dcache_hits"],
+            self.counters["dcache_hits"] + self.counters["dcache_misses"],
+        )
+
+    @property
+    def branch_accuracy(self) -> float | None:
+        return self._ratio(
+            self.counters["branches"] - self.counters["branch_mispredicts"],
+            self.counters["branches"],
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "test": self.test_name,
+                "block_width": self.block_width,
+                "set_count": self.set_count,
+                "associativity": self.associativity,
+                "recorded": self.recorded,
+                **{name: self.counters[name] for name in PERF_COUNTER_NAMES},
+            }
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "PerfRecord":
+        data = json.loads(line)
+        return cls(
+            test_name=str(data["test"]),
+            block_width=int(data["block_width"]),
+            set_count=int(data["set_count"]),
+            associativity=int(data["associativity"]),
+            counters={name: int(data[name]) for name in PERF_COUNTER_NAMES},
+            recorded=str(data["recorded"]),
+        )
+
+    @staticmethod
+    def _ratio(numerator: int, denominator: int) -> float | None:
+        return numerator / denominator if denominator > 0 else None
+
+
+@dataclass
+class TestRun:
+    """One test at one cache configuration on its way through the build,
+    simulate, and check stages."""
+
+    test_name: str
+    entry: TestEntry
+    paths: TestPaths
+    config: SimulatorConfig
+    block_width: int
+    set_count: int
+    associativity: int
+    index: int
+    total: int
+    console: TestConsole
+    record_outcome: Callable[[str, TestOutcome], None]
+    timings: dict[str, float] = field(default_factory=dict)
+    start_time: float = 0.0
+    # Spike reference trace, generated next to the simulation;
+    # reference_cancel stops it early once the test no longer needs it.
+    reference: Future[float] | None = None
+    reference_cancel: threading.Event = field(default_factory=threading.Event)
+    trace_limit: TraceLimitExceeded | None = None
+    # Measured peak memory and artifact size in bytes, for ResourceGate.
+    footprint: dict[str, float] = field(default_factory=dict)
+    checkpoint: BootCheckpoint | None = None
+    # Sampled runs (--sample): the program's length in retired instructions
+    # and the windows measured so far.
+    program_length: int | None = None
+    sample_windows: list[SampleWindow] = field(default_factory=list)
+
+
 def format_command(command: Sequence[str]) -> str:
     return shlex.join(str(part) for part in command)
 
@@ -281,10 +786,70 @@ def format_repo_path(path: Path) -> str:
         return path.as_posix()
 
 
+def format_cache_header(block_width: int, set_count: int, associativity: int) -> str:
+    return (
+        f"\n\nCACHE_LINE_WIDTH: {block_width} bits, "
+        f"SET_COUNT: {set_count}, ASSOCIATIVITY: {associativity}-way\n"
+    )
+
+
+def merge_result_sections(text: str) -> str:
+    """`text` of results/result.txt with repeated sections of one cache
+    configuration (see format_cache_header) merged into the first."""
+    preamble, *parts = CACHE_HEADER_RE.split(text)
+    sections: dict[str, list[str]] = {}
+    for header, rows in zip(parts[::2], parts[1::2]):
+        sections.setdefault(header, []).append(rows)
+    return preamble + "".join(
+        header + "".join(rows) for header, rows in sections.items()
+    )
+
+
+PERF_TABLE_HEADER = (
+    "Test                          | Branch Acc |       CPI |  Pipe CPI |"
+    "   I$ Hit |   D$ Hit\n"
+    "------------------------------+------------+-----------+-----------+"
+    "----------+---------\n"
+)
+
+
+def format_perf_row(record: PerfRecord) -> str:
+    def percent(value: float | None, width: int) -> str:
+        text = f"{100 * value:.2f}%" if value is not None else "N/A"
+        return text.rjust(width)
+
+    def cpi(value: float | None) -> str:
+        return f"{value:9.4f}" if value is not None else f"{'N/A':>9}"
+
+    return (
+        f"{record.test_name:<30}| {percent(record.branch_accuracy, 10)} | "
+        f"{cpi(record.cpi)} | {cpi(record.pipeline_cpi)} | "
+        f"{percent(record.icache_hit_rate, 8)} | "
+        f"{percent(record.dcache_hit_rate, 8)}\n"
+    )
+
+
+def parse_perf_record(text: str) -> dict[str, int] | None:
+    """Counters of the last "Perf record:" line in simulator output."""
+    matches = PERF_RECORD_RE.findall(text)
+    if not matches:
+        return None
+    counters = {}
+    for field_text in matches[-1].split():
+        name, _, value = field_text.partition("=")
+        if value.isdigit():
+            counters[name] = int(value)
+    if any(name not in counters for name in PERF_COUNTER_NAMES):
+        return None
+    return counters
+
+
 def format_result_row(test_name: str, outcome: TestOutcome) -> str:
+    cached = "    [cached]" if outcome.cached else ""
     return (
         f"{test_name + ': ':<29}"
-        f"Self Check: {outcome.self_check}    Tracecomp: {outcome.tracecomp}\n"
+        f"Self Check: {outcome.self_check}    Tracecomp: {outcome.tracecomp}"
+        f"{cached}\n"
     )
 
 
@@ -319,6 +884,178 @@ def colorize_status_text(text: str) -> str:
     return STATUS_COLOR_RE.sub(colorize, text)
 
 
+def format_count(value: float) -> str:
+    for threshold, suffix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if value >= threshold:
+            return f"{value / threshold:.1f}{suffix}"
+    return f"{value:.0f}"
+
+
+def format_bytes(value: float) -> str:
+    for threshold, suffix in ((1 << 30, "GiB"), (1 << 20, "MiB"), (1 << 10, "KiB")):
+        if value >= threshold:
+            return f"{value / threshold:.1f} {suffix}"
+    return f"{value:.0f} B"
+
+
+def describe_exit(returncode: int) -> str:
+    if returncode >= 0:
+        return f"exited with status {returncode}"
+    try:
+        name = signal.Signals(-returncode).name
+    except ValueError:
+        name = f"signal {-returncode}"
+    if -returncode == signal.SIGKILL:
+        # What the kernel's OOM killer sends.
+        return f"was killed by {name} (out of memory?)"
+    return f"was killed by {name}"
+
+
+def available_memory() -> int | None:
+    """Memory the kernel can hand out without swapping, or None when it
+    cannot be measured."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def read_load_segments(path: Path) -> list[LoadSegment] | None:
+    """The non-empty PT_LOAD segments of a little-endian ELF32/ELF64 file, as
+    test/tb/mem_image.c loads them, or None when `path` is not one."""
+    data = path.read_bytes()
+    is_elf = data[:4] == b"\x7fELF" and data[5:6] == b"\x01"
+    if not is_elf or data[4:5] not in (b"\x01", b"\x02"):
+        return None
+    if data[4] == 2:
+        phoff, = struct.unpack_from("<Q", data, 32)
+        phentsize, phnum = struct.unpack_from("<HH", data, 54)
+        header = struct.Struct("<IIQQQQQ")
+    else:
+        phoff, = struct.unpack_from("<I", data, 28)
+        phentsize, phnum = struct.unpack_from("<HH", data, 42)
+        header = struct.Struct("<IIIIIII")
+    segments = []
+    for index in range(phnum):
+        fields = header.unpack_from(data, phoff + index * phentsize)
+        if data[4] == 2:
+            kind, _, offset, _, address, file_size, memory_size = fields
+        else:
+            kind, offset, _, address, file_size, memory_size, _ = fields
+        if kind == ELF_PT_LOAD and memory_size:
+            segments.append(
+                LoadSegment(address, data[offset : offset + file_size], memory_size)
+            )
+    return segments
+
+
+def difference_span(first: bytes, second: bytes) -> tuple[int, int] | None:
+    """[start, end) offsets spanning every byte in which two equally long
+    buffers differ, or None when they are identical."""
+    if first == second:
+        return None
+    chunk = 4096
+    start = 0
+    while first[start : start + chunk] == second[start : start + chunk]:
+        start += chunk
+    while first[start] == second[start]:
+        start += 1
+    end = len(first)
+    while True:
+        low = max(end - chunk, start)
+        if first[low:end] != second[low:end]:
+            break
+        end = low
+    while first[end - 1] == second[end - 1]:
+        end -= 1
+    return start, end
+
+
+def plan_sample_windows(
+    length: int, windows: int, warmup: int, window: int
+) -> list[tuple[int, int, int]]:
+    """(start, warm-up, window) instruction counts of `windows` sample windows
+    spread evenly over a program of `length` instructions, each centred in its
+    share of the program. A program too short for that is measured whole."""
+    stride = length // max(windows, 1)
+    if windows < 2 or stride < warmup + window:
+        return [(0, 0, length)]
+    offset = (stride - warmup - window) // 2
+    return [(index * stride + offset, warmup, window) for index in range(windows)]
+
+
+def estimate_samples(
+    windows: Sequence[SampleWindow], length: int
+) -> SampleEstimate:
+    """Mean CPI and SAMPLE_RATIOS of the windows. Windows that retired
+    nothing do not count; a window without accesses or branches does not
+    count towards that ratio."""
+    measured = [window for window in windows if window.instructions]
+    if not measured:
+        raise SimulationOutputError("No sample window retired any instructions.")
+    ratios = {}
+    for name in SAMPLE_RATIOS:
+        samples = [
+            ratio
+            for window in measured
+            if (ratio := getattr(window, name)) is not None
+        ]
+        if samples:
+            ratios[name] = sample_statistic(samples)
+    return SampleEstimate(
+        cpi=sample_statistic(
+            [window.cycles / window.instructions for window in measured]
+        ),
+        ratios=ratios,
+        program_length=length,
+    )
+
+
+def sample_statistic(samples: Sequence[float]) -> SampleStatistic:
+    """Mean of `samples` with the half width of its 95% confidence interval
+    (Student t)."""
+    mean = sum(samples) / len(samples)
+    if len(samples) == 1:
+        return SampleStatistic(mean, None, 1)
+    degrees = len(samples) - 1
+    variance = sum((sample - mean) ** 2 for sample in samples) / degrees
+    quantile = (
+        T_QUANTILES_95[degrees - 1]
+        if degrees <= len(T_QUANTILES_95)
+        else NORMAL_QUANTILE_95
+    )
+    half_width = quantile * math.sqrt(variance / len(samples))
+    return SampleStatistic(mean, half_width, len(samples))
+
+
+def sim_profile_threads(profile: str) -> int:
+    match = SIM_PROFILE_RE.match(profile)
+    if match is None or match.group(2) is None:
+        return 1
+    return int(match.group(2))
+
+
+def estimate_makespan(
+    durations: Sequence[float], workers: int, busy: Sequence[float] = ()
+) -> float:
+    """Finish time of `durations`, dispatched in the given order to whichever
+    of `workers` frees up first; `busy` holds the remaining time of jobs
+    already running."""
+    loads = sorted(busy)[:workers]
+    loads.extend([0.0] * (workers - len(loads)))
+    heapq.heapify(loads)
+    for duration in durations:
+        heapq.heappush(loads, heapq.heappop(loads) + duration)
+    return max(loads, default=0.0)
+
+
 def format_duration(seconds: float) -> str:
     minutes, secs = divmod(seconds, 60)
     hours, minutes = divmod(int(minutes), 60)
@@ -350,30 +1087,36 @@ class TestConsole:
 
 
 class PmemWriteStreamer:
-    """Echo MMIO PMEM writes to stdout as the simulation produces them."""
+    """Echo MMIO PMEM writes to stdout as the simulation produces them.
+
+    The simulator flushes its PMEM output a line at a time (pmem_write.c); the
+    file is kept open and each pump reads whatever was appended since the last
+    one."""
 
     HEADER = "  PMEM MMIO write:"
     INDENT = "    "
 
     def __init__(self, path: Path) -> None:
         self._path = path
-        self._offset = 0
+        self._handle: BinaryIO | None = None
         self._pending = bytearray()
         self._header_printed = False
 
     def pump(self) -> None:
-        try:
-            with self._path.open("rb") as handle:
-                handle.seek(self._offset)
-                chunk = handle.read()
-                self._offset = handle.tell()
-        except FileNotFoundError:
-            return
+        if self._handle is None:
+            try:
+                self._handle = self._path.open("rb")
+            except FileNotFoundError:
+                return
+        chunk = self._handle.read()
         if chunk:
             self._consume(chunk)
 
     def finalize(self) -> None:
         self.pump()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
         if self._pending:
             self._emit_line(bytes(self._pending))
             self._pending.clear()
@@ -395,6 +1138,496 @@ class PmemWriteStreamer:
         print(f"{self.INDENT}{line.decode('utf-8', errors='replace')}", flush=True)
 
 
+class TimingDatabase:
+    """Per-test phase durations (seconds) and footprints (bytes) recorded by
+    earlier runs.
+
+    Each run folds its measurements into a moving average, so expectations
+    follow the RTL and the machine as they change. Phases are "verilate" and
+    "make" (only for the test that built its simulator), "simulate", "spike",
+    "compare", and "total"; footprints are the simulator's peak "memory" and
+    the "disk" its artifacts take."""
+
+    VERSION = 1
+    SMOOTHING = 0.5
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._tests: dict[str, dict[str, float]] = {}
+        self._dirty = False
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        tests = data.get("tests")
+        if isinstance(tests, dict):
+            with self._lock:
+                self._tests = {
+                    name: dict(phases)
+                    for name, phases in tests.items()
+                    if isinstance(phases, dict)
+                }
+
+    def expected_seconds(self, test_name: str) -> float | None:
+        return self.expected(test_name, "total")
+
+    def expected(self, test_name: str, key: str) -> float | None:
+        with self._lock:
+            return self._tests.get(test_name, {}).get(key)
+
+    def average(self, key: str) -> float | None:
+        with self._lock:
+            values = [phases[key] for phases in self._tests.values() if key in phases]
+        return sum(values) / len(values) if values else None
+
+    def record(self, test_name: str, phases: Mapping[str, float]) -> None:
+        with self._lock:
+            history = self._tests.setdefault(test_name, {})
+            for phase, seconds in phases.items():
+                previous = history.get(phase)
+                history[phase] = (
+                    seconds
+                    if previous is None
+                    else previous + self.SMOOTHING * (seconds - previous)
+                )
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(
+                {"version": self.VERSION, "tests": self._tests},
+                indent=1,
+                sort_keys=True,
+            )
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        staging_path = self.path.with_name(f"{self.path.name}.tmp-{os.getpid()}")
+        staging_path.write_text(payload + "\n")
+        os.replace(staging_path, self.path)
+
+
+class ResourceGate:
+    """Admits work while there is memory and build/ disk space for it.
+
+    Each decision measures what is free right now and subtracts the reserve
+    that is always left free plus the footprints of admitted work, which may
+    not have grown into them yet. Admitted work holds its footprint until it
+    is released. Work is always admitted when nothing else holds a footprint,
+    so a test bigger than the machine still runs instead of waiting forever."""
+
+    def __init__(self, path: Path, memory_reserve: int, disk_reserve: int) -> None:
+        self.path = path
+        self.memory_reserve = memory_reserve
+        self.disk_reserve = disk_reserve
+        self._condition = threading.Condition()
+        self._memory_held = 0
+        self._disk_held = 0
+        self._holders = 0
+        self._throttled = False
+
+    def admit(
+        self, label: str, memory: int, disk: int, cancel_event: threading.Event
+    ) -> bool:
+        """Wait until `memory` and `disk` bytes fit and hold them; False when
+        cancel_event is set first."""
+        with self._condition:
+            while not cancel_event.is_set():
+                shortage = self._shortage(memory, disk)
+                if shortage is None or self._holders == 0:
+                    if self._throttled:
+                        self._throttled = False
+                        print(f"Resuming: starting {label}.", flush=True)
+                    self._memory_held += memory
+                    self._disk_held += disk
+                    self._holders += 1
+                    return True
+                if not self._throttled:
+                    self._throttled = True
+                    print(
+                        f"Throttling: {label} needs {shortage}; waiting for "
+                        f"running work to finish.",
+                        flush=True,
+                    )
+                self._condition.wait(RESOURCE_POLL_SECONDS)
+            return False
+
+    def release(self, memory: int, disk: int) -> None:
+        with self._condition:
+            self._memory_held -= memory
+            self._disk_held -= disk
+            self._holders -= 1
+            self._condition.notify_all()
+
+    def _shortage(self, memory: int, disk: int) -> str | None:
+        # Called with _condition held.
+        free_memory = available_memory()
+        if free_memory is not None:
+            room = free_memory - self.memory_reserve - self._memory_held
+            if memory > room:
+                return (
+                    f"{format_bytes(memory)} of memory, "
+                    f"{format_bytes(max(0, room))} spare"
+                )
+        self.path.mkdir(parents=True, exist_ok=True)
+        room = shutil.disk_usage(self.path).free - self.disk_reserve - self._disk_held
+        if disk > room:
+            return (
+                f"{format_bytes(disk)} of disk in {format_repo_path(self.path)}/, "
+                f"{format_bytes(max(0, room))} spare"
+            )
+        return None
+
+
+class CoverageMerger:
+    """Fold per-test coverage files into partial merges as tests finish.
+
+    Merges are pairwise, like the carries of a binary counter: two results
+    that are each the merge of 2**k files are merged into one of 2**(k+1),
+    on a pool of verilator_coverage processes. At most about log2(tests)
+    partial merges are left for finish() to combine. Whenever the pool goes
+    idle, the partial merges are also combined into `snapshot`, so the
+    coverage of the tests finished so far can be inspected mid-run."""
+
+    def __init__(
+        self, runner: CommandRunner, work_dir: Path, snapshot: Path, workers: int
+    ) -> None:
+        self._runner = runner
+        self._work_dir = work_dir
+        self._snapshot = snapshot
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Merge results waiting for a partner, by level (log2 of the number
+        # of test files behind them).
+        self._levels: dict[int, list[Path]] = {}
+        self._merging = 0
+        self._snapshotting = False
+        self._snapshot_stale = False
+        self._closing = False
+        self._serial = 0
+        self._error: BaseException | None = None
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+    def add(self, path: Path) -> None:
+        with self._lock:
+            self._offer(0, path)
+            self._start_snapshot()
+
+    def finish(self, output: Path) -> None:
+        """Wait for the running merges and write the total to `output`."""
+        with self._lock:
+            self._closing = True
+            while self._merging or self._snapshotting:
+                self._idle.wait()
+            if self._error is not None:
+                raise self._error
+            inputs = [
+                path for level in sorted(self._levels) for path in self._levels[level]
+            ]
+        if not inputs:
+            raise SimulationOutputError("No coverage files were merged.")
+        self._runner.run(
+            ["verilator_coverage", "--write", format_repo_path(output)]
+            + [format_repo_path(path) for path in inputs],
+            description="Merge coverage files",
+        )
+        self.close()
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closing = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _offer(self, level: int, path: Path) -> None:
+        waiting = self._levels.setdefault(level, [])
+        waiting.append(path)
+        self._snapshot_stale = True
+        if len(waiting) < 2 or self._closing:
+            return
+        inputs = [waiting.pop(), waiting.pop()]
+        self._serial += 1
+        output = self._work_dir / f"merge-{level + 1}-{self._serial}.dat"
+        self._merging += 1
+        self._executor.submit(self._merge, level + 1, inputs, output)
+
+    def _merge(self, level: int, inputs: list[Path], output: Path) -> None:
+        try:
+            self._write(output, inputs)
+        except BaseException as exc:
+            with self._lock:
+                self._error = self._error or exc
+                self._merging -= 1
+                self._idle.notify_all()
+            return
+        # The test files themselves stay in build/cov/.
+        for path in inputs:
+            if path.parent == self._work_dir:
+                path.unlink(missing_ok=True)
+        with self._lock:
+            self._merging -= 1
+            self._offer(level, output)
+            self._start_snapshot()
+            self._idle.notify_all()
+
+    def _start_snapshot(self) -> None:
+        if (
+            self._merging
+            or self._snapshotting
+            or self._closing
+            or not self._snapshot_stale
+        ):
+            return
+        self._snapshotting = True
+        self._snapshot_stale = False
+        inputs = [path for paths in self._levels.values() for path in paths]
+        self._executor.submit(self._write_snapshot, inputs)
+
+    def _write_snapshot(self, inputs: list[Path]) -> None:
+        staging = self._snapshot.with_name(f"{self._snapshot.name}.tmp")
+        try:
+            self._write(staging, inputs)
+            os.replace(staging, self._snapshot)
+        except (CommandError, OSError):
+            # A merge started after the snapshot may have consumed one of its
+            # inputs; the next idle moment takes a fresh one.
+            with self._lock:
+                self._snapshot_stale = True
+        with self._lock:
+            self._snapshotting = False
+            self._start_snapshot()
+            self._idle.notify_all()
+
+    def _write(self, output: Path, inputs: Sequence[Path]) -> None:
+        self._runner.run(
+            ["verilator_coverage", "--write", format_repo_path(output)]
+            + [format_repo_path(path) for path in inputs],
+            description="Merge coverage files",
+        )
+
+
+class TestPipeline:
+    """Build, simulate, and check stages of a -j run, each with its own pool.
+
+    A build is a short `make -j` burst over many cores, a simulation one long
+    process per test, so the two are scheduled apart: the build workers split
+    the cores between them, and each simulation worker takes the
+    highest-priority test whose simulator is ready. Spike references and
+    trace comparisons run in the check pool. The build stage waits while
+    BUILD_AHEAD models it built still have tests queued, so it stays just
+    ahead of the simulations instead of building models that will not run
+    for a while."""
+
+    STAGES = ("build", "simulate", "check")
+
+    def __init__(
+        self,
+        runner: TestRunner,
+        runs: Sequence[TestRun],
+        *,
+        build_workers: int,
+        sim_workers: int,
+        on_finished: Callable[[TestRun, TestFailure | None], None],
+    ) -> None:
+        self.runner = runner
+        self.on_finished = on_finished
+        self.workers = {
+            "build": build_workers,
+            "simulate": sim_workers,
+            "check": sim_workers,
+        }
+        self.busy = dict.fromkeys(self.STAGES, 0.0)
+        self.elapsed = 0.0
+        self._condition = threading.Condition()
+        # Tests not yet picked up by a simulation worker, highest priority
+        # first, and the models they need in order of first use.
+        self._queued = list(runs)
+        self._build_queue = list(dict.fromkeys(run.config for run in runs))
+        self._queued_per_config: dict[SimulatorConfig, int] = {}
+        for run in runs:
+            self._queued_per_config[run.config] = (
+                self._queued_per_config.get(run.config, 0) + 1
+            )
+        # None while the model is being built.
+        self._builds: dict[SimulatorConfig, SimulatorBuild | None] = {}
+        self._unfinished = len(runs)
+        self._error: BaseException | None = None
+        self._check_pool: ThreadPoolExecutor | None = None
+
+    def run(self) -> None:
+        """Run every test; raises the first infrastructure error after
+        stopping the others. Test failures go to on_finished."""
+        start_time = time.monotonic()
+        stage_pool = ThreadPoolExecutor(
+            max_workers=self.workers["build"] + self.workers["simulate"]
+        )
+        self._check_pool = ThreadPoolExecutor(max_workers=self.workers["check"])
+        try:
+            for _ in range(self.workers["build"]):
+                stage_pool.submit(self._build_worker)
+            for _ in range(self.workers["simulate"]):
+                stage_pool.submit(self._simulate_worker)
+            with self._condition:
+                while self._unfinished and self._error is None:
+                    self._condition.wait()
+                if self._error is not None:
+                    raise self._error
+        except BaseException:
+            # Infrastructure error or Ctrl-C: stop in-flight commands and
+            # leave queued tests unstarted.
+            self.runner.cancel_event.set()
+            with self._condition:
+                self._condition.notify_all()
+            raise
+        finally:
+            stage_pool.shutdown(wait=True)
+            self._check_pool.shutdown(wait=True)
+            self.elapsed = time.monotonic() - start_time
+
+    def _build_worker(self) -> None:
+        while True:
+            picked = self._next_build()
+            if picked is None:
+                return
+            config, first_run = picked
+            start_time = time.monotonic()
+            try:
+                build = self.runner._simulator_for(config, first_run.timings)
+            except BaseException as exc:
+                self._fail(exc)
+                return
+            finally:
+                self._add_busy("build", time.monotonic() - start_time)
+            with self._condition:
+                self._builds[config] = build
+                self._condition.notify_all()
+
+    def _next_build(self) -> tuple[SimulatorConfig, TestRun] | None:
+        """The next model to build and the test its build time is charged
+        to (the first one that needs it), or None when the stage is done."""
+        with self._condition:
+            while self._build_queue and not self._stopped():
+                ahead = sum(
+                    1 for config in self._builds if self._queued_per_config[config]
+                )
+                if ahead < max(BUILD_AHEAD, 1):
+                    config = self._build_queue.pop(0)
+                    self._builds[config] = None
+                    first_run = next(
+                        run for run in self._queued if run.config == config
+                    )
+                    return config, first_run
+                self._condition.wait()
+            return None
+
+    def _simulate_worker(self) -> None:
+        while True:
+            picked = self._next_simulation()
+            if picked is None:
+                return
+            run, build = picked
+            memory, disk = self.runner._expected_footprint(run.test_name)
+            gate = self.runner._resource_gate
+            if not gate.admit(run.test_name, memory, disk, self.runner.cancel_event):
+                self._finish(run, None)
+                continue
+            self.runner._begin_test(run)
+            self.runner._start_trace_reference(run, self._check_pool)
+            start_time = time.monotonic()
+            try:
+                self.runner._simulate_test(run, build)
+            except BaseException as exc:
+                self._add_busy("simulate", time.monotonic() - start_time)
+                gate.release(memory, disk)
+                self._finish(run, exc)
+                continue
+            self._add_busy("simulate", time.monotonic() - start_time)
+            # The simulator has exited and its artifacts are on disk, where
+            # the next measurement sees them.
+            gate.release(memory, disk)
+            if run.reference is None:
+                self._queue_check(run)
+            else:
+                # Queue the comparison only once Spike is done, so a check
+                # worker never sits waiting on a reference.
+                run.reference.add_done_callback(
+                    lambda _, run=run: self._queue_check(run)
+                )
+
+    def _next_simulation(self) -> tuple[TestRun, SimulatorBuild] | None:
+        with self._condition:
+            while self._queued and not self._stopped():
+                for position, run in enumerate(self._queued):
+                    build = self._builds.get(run.config)
+                    if build is not None and self.runner._checkpoint_ready(run):
+                        del self._queued[position]
+                        self._queued_per_config[run.config] -= 1
+                        # The last queued test of a model frees a build slot.
+                        self._condition.notify_all()
+                        return run, build
+                # Nothing signals a boot checkpoint being published, so tests
+                # waiting on one are looked at again after a while.
+                waiting = any(run.checkpoint is not None for run in self._queued)
+                self._condition.wait(CHECKPOINT_POLL_SECONDS if waiting else None)
+            return None
+
+    def _queue_check(self, run: TestRun) -> None:
+        try:
+            self._check_pool.submit(self._check, run)
+        except RuntimeError:
+            # The pool is shutting down after an error; nothing waits for
+            # this test any more.
+            self._finish(run, None)
+
+    def _check(self, run: TestRun) -> None:
+        if self._stopped():
+            self._finish(run, None)
+            return
+        start_time = time.monotonic()
+        try:
+            self.runner._check_test(run)
+        except BaseException as exc:
+            self._add_busy("check", time.monotonic() - start_time)
+            self._finish(run, exc)
+            return
+        self._add_busy(
+            "check", time.monotonic() - start_time + run.timings.get("spike", 0.0)
+        )
+        self._finish(run, None)
+
+    def _finish(self, run: TestRun, exc: BaseException | None) -> None:
+        try:
+            self.runner._finish_test(run)
+        finally:
+            if exc is not None and not isinstance(exc, TestFailure):
+                self._fail(exc)
+            self.on_finished(run, exc if isinstance(exc, TestFailure) else None)
+            with self._condition:
+                self._unfinished -= 1
+                self._condition.notify_all()
+
+    def _fail(self, exc: BaseException) -> None:
+        with self._condition:
+            if self._error is None:
+                self._error = exc
+            self._condition.notify_all()
+        self.runner.cancel_event.set()
+
+    def _stopped(self) -> bool:
+        return self._error is not None or self.runner.cancel_event.is_set()
+
+    def _add_busy(self, stage: str, seconds: float) -> None:
+        with self._condition:
+            self.busy[stage] += seconds
+
+
 class CommandRunner:
     def __init__(self, cwd: Path) -> None:
         self.cwd = cwd
@@ -406,18 +1639,27 @@ class CommandRunner:
         description: str,
         timeout: int | None = COMMAND_TIMEOUT_SECONDS,
         echo_output: bool = False,
+        env: Mapping[str, str] | None = None,
+        cancel_events: Sequence[threading.Event] = (),
     ) -> subprocess.CompletedProcess[str]:
         normalized = [str(part) for part in command]
+        full_env = None if env is None else {**os.environ, **env}
         try:
-            result = subprocess.run(
-                normalized,
-                cwd=self.cwd,
-                stdin=subprocess.DEVNULL,
-                text=True,
-                capture_output=True,
-                timeout=timeout,
-                check=False,
-            )
+            if cancel_events:
+                result = self._run_cancellable(
+                    normalized, description, timeout, full_env, cancel_events
+                )
+            else:
+                result = subprocess.run(
+                    normalized,
+                    cwd=self.cwd,
+                    stdin=subprocess.DEVNULL,
+                    env=full_env,
+                    text=True,
+                    capture_output=True,
+                    timeout=timeout,
+                    check=False,
+                )
         except FileNotFoundError as exc:
             raise CommandError(
                 description, normalized, "command was not found"
@@ -435,7 +1677,7 @@ class CommandRunner:
             raise CommandError(
                 description,
                 normalized,
-                f"exited with status {result.returncode}",
+                describe_exit(result.returncode),
                 stdout_tail=tail_text(result.stdout),
                 stderr_tail=tail_text(result.stderr),
             )
@@ -446,6 +1688,50 @@ class CommandRunner:
                 print(result.stderr, end="", file=sys.stderr)
         return result
 
+    def _run_cancellable(
+        self,
+        normalized: list[str],
+        description: str,
+        timeout: int | None,
+        env: Mapping[str, str] | None,
+        cancel_events: Sequence[threading.Event],
+    ) -> subprocess.CompletedProcess[str]:
+        # subprocess.run cannot be interrupted from another thread, so poll
+        # communicate() and stop the process as soon as any event is set.
+        process = subprocess.Popen(
+            normalized,
+            cwd=self.cwd,
+            stdin=subprocess.DEVNULL,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                if any(event.is_set() for event in cancel_events):
+                    raise CommandError(description, normalized, "cancelled")
+                if deadline is not None and time.monotonic() > deadline:
+                    self._terminate_process(process)
+                    stdout, stderr = process.communicate()
+                    raise subprocess.TimeoutExpired(
+                        normalized, timeout, output=stdout, stderr=stderr
+                    )
+                try:
+                    stdout, stderr = process.communicate(
+                        timeout=CANCEL_POLL_SECONDS
+                    )
+                except subprocess.TimeoutExpired:
+                    continue
+                return subprocess.CompletedProcess(
+                    normalized, process.returncode, stdout, stderr
+                )
+        finally:
+            if process.poll() is None:
+                self._terminate_process(process)
+                process.communicate()
+
     def run_streaming_to_file(
         self,
         command: Sequence[str],
@@ -458,7 +1744,7 @@ class CommandRunner:
         progress_paths: Sequence[Path] = (),
         size_limits: Sequence[tuple[Path, int]] = (),
         poll_callback: Callable[[], None] | None = None,
-        cancel_event: threading.Event | None = None,
+        cancel_events: Sequence[threading.Event] = (),
     ) -> None:
         normalized = [str(part) for part in command]
         stdout_tail = bytearray()
@@ -519,7 +1805,7 @@ class CommandRunner:
                                 limit_path, limit_size, limit_bytes
                             )
 
-                    if cancel_event is not None and cancel_event.is_set():
+                    if any(event.is_set() for event in cancel_events):
                         self._terminate_process(process)
                         raise CommandError(description, normalized, "cancelled")
 
@@ -581,7 +1867,7 @@ class CommandRunner:
             raise CommandError(
                 description,
                 normalized,
-                f"exited with status {process.returncode}",
+                describe_exit(process.returncode),
                 stdout_tail=decode_tail(stdout_tail),
                 stderr_tail=decode_tail(stderr_tail),
             )
@@ -630,6 +1916,8 @@ class TestCatalog:
 
     def resolve_group(self, group_name: str) -> tuple[list[str], list[str]]:
         members = self.groups.get(group_name)
+        if group_name == SMOKE_COV_GROUP:
+            members = self._smoke_cov_tests()
         if members is None:
             for group_subgroups in self.subgroups.values():
                 if group_name in group_subgroups:
@@ -656,6 +1944,22 @@ class TestCatalog:
                 missing_tests.append(test_name)
         return available_tests, missing_tests
 
+    @staticmethod
+    def _smoke_cov_tests() -> list[str]:
+        try:
+            selection = json.loads(SMOKE_COV_FILE.read_text())
+            return [str(test["name"]) for test in selection["tests"]]
+        except FileNotFoundError:
+            raise ConfigurationError(
+                f"Group '{SMOKE_COV_GROUP}' is picked from coverage data, and "
+                f"{format_repo_path(SMOKE_COV_FILE)} does not exist yet; run "
+                "python3 run_tests.py -a --coverage-all first."
+            ) from None
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise ConfigurationError(
+                f"{format_repo_path(SMOKE_COV_FILE)} is unreadable: {exc}"
+            ) from exc
+
 
 class TestRunner:
     def __init__(self, catalog: TestCatalog, args: argparse.Namespace) -> None:
@@ -669,14 +1973,50 @@ class TestRunner:
         self.no_self_check = args.no_self_check
         self.dromajo_cosim = not args.no_cosim
         self.jobs = args.jobs
+        self.sim_profile = args.sim_profile
+        self.sweep_strategy = args.sweep_strategy
+        self.test_workers = self._test_workers()
         # Upper bound used only for workspace prep; per-test trace logging is
         # resolved by _rtl_trace_enabled().
         self.tracecomp_possible = not (args.cosim_only or args.no_tracecomp)
         self.force_continue_after_trap = args.continue_after_trap
         self.cancel_event = threading.Event()
         self._result_lock = threading.Lock()
+        self._simulators: dict[SimulatorConfig, SimulatorBuild] = {}
+        self._simulators_lock = threading.Lock()
+        self._build_inputs: str | None = None
+        self._build_inputs_lock = threading.Lock()
+        self._sim_cache_hits = 0
+        self._sim_cache_misses = 0
+        self._spike_cache_lock = threading.Lock()
+        self._spike_reference_locks: dict[Path, threading.Lock] = {}
+        self._spike_traces_generated: set[Path] = set()
+        self._spike_cache_hits = 0
+        self._spike_cache_misses = 0
+        self._sim_cycles = 0
+        self._sim_seconds = 0.0
+        self._checkpoint_restores = 0
+        self._objcache = shutil.which(OBJCACHE) if OBJCACHE else None
+        self._objcache_hits = 0
+        self._objcache_misses = 0
+        self._timing_db = TimingDatabase(TIMING_DB_FILE)
+        # Concurrent simulator builds; the -j pipeline raises it while it runs.
+        self._build_workers = 1
+        self._stage_busy: dict[str, float] = {}
+        self._stage_capacity: dict[str, float] = {}
+        self._resource_gate = ResourceGate(
+            BUILD_DIR, MEMORY_RESERVE_BYTES, DISK_RESERVE_BYTES
+        )
         self._suite_ran = 0
         self._suite_failed = 0
+        self._suite_cached = 0
+        self._coverage_merger: CoverageMerger | None = None
+        self._perf_records: dict[tuple[str, int, int], PerfRecord] = {}
+        # (test, BLOCK_WIDTH, SET_COUNT) runs of this suite that failed, whose
+        # earlier records are dropped, and that --changed-only found
+        # unchanged, whose earlier records still stand.
+        self._perf_failed: set[tuple[str, int, int]] = set()
+        self._perf_cached: set[tuple[str, int, int]] = set()
         # Per-test default flags (see COSIM_ONLY_TESTS / NO_TRACECOMP_TESTS)
         # apply in -g, -a, and the no-arg default run, but not single (-s).
         default_run = not any(
@@ -694,6 +2034,14 @@ class TestRunner:
             args.compile_group is not None or args.compile_all or default_run
         )
         self.show_warnings = args.warnings
+        self.hex_image = args.hex_image
+        self.dense_mem = args.dense_mem
+        self.refresh_spike_cache = args.refresh_spike_cache
+        self.changed_only = args.changed_only
+        self.checkpoints = not args.no_checkpoint
+        self.sample = args.sample
+        self.lockstep = not args.no_lockstep
+        self.rtl_trace_format = "text" if args.text_trace else "binary"
         self.default_block_width = DEFAULT_BLOCK_WIDTH
         self.default_set_count = DEFAULT_SET_COUNT
         self.default_associativity = DEFAULT_ASSOCIATIVITY
@@ -889,12 +2237,226 @@ class TestRunner:
         # SET_COUNT are swept (see CACHE_SWEEP_* notes above).
         associativity = self.default_associativity
 
+        points = [
+            (block_width, set_count)
+            for block_width in CACHE_SWEEP_BLOCK_WIDTHS
+            for set_count in CACHE_SWEEP_SET_COUNTS
+        ]
+        # A halving search narrows this to the points of its last rung.
+        report_points = list(points)
+
         def work() -> None:
-            for block_width in CACHE_SWEEP_BLOCK_WIDTHS:
-                for set_count in CACHE_SWEEP_SET_COUNTS:
-                    self._run_tests(tests, block_width, set_count, associativity)
+            if self.sweep_strategy == "halving":
+                # Every rung writes a section per point; fold them together.
+                section_start = RESULT_FILE.stat().st_size
+                try:
+                    self._run_halving_search(tests, report_points, associativity)
+                finally:
+                    self._merge_result_sections(section_start)
+            else:
+                self._run_matrix(tests, points, associativity)
 
-        self._run_suite(work, tests)
+        try:
+            self._run_suite(work, tests)
+        finally:
+            # Failed tests have no record; the report covers the rest.
+            if not self.cancel_event.is_set():
+                self._write_sweep_report(tests, report_points)
+
+    def _run_halving_search(
+        self,
+        tests: list[str],
+        points: list[tuple[int, int]],
+        associativity: int,
+    ) -> None:
+        """Successive halving over the sweep points (--sweep-strategy halving).
+
+        Each rung runs its points on a longer prefix of the tests (see
+        _halving_test_order) and promotes the best 1/SWEEP_HALVING_ETA of them
+        by geomean CPI over that prefix. The prefixes are nested, so promoted
+        points only run the tests they have not run yet. `points` is narrowed
+        in place to the points of the last rung. As in _run_matrix, failures
+        do not stop the search and are reported together at the end."""
+        order = self._halving_test_order(tests)
+        schedule = sweepreport.halving_schedule(
+            len(points), len(order), SWEEP_HALVING_ETA
+        )
+        grid_simulations = len(points) * len(order)
+        failures = []
+        rungs: list[dict[str, object]] = []
+        simulations = 0
+        tests_done = 0
+        for rung, (_, test_count) in enumerate(schedule, start=1):
+            if self.cancel_event.is_set():
+                break
+            new_tests = order[tests_done:test_count]
+            print(
+                f"Sweep rung {rung}/{len(schedule)}: {len(points)} points on "
+                f"{test_count} of {len(order)} tests ({len(new_tests)} new)",
+                flush=True,
+            )
+            if new_tests:
+                try:
+                    self._run_matrix(new_tests, points, associativity)
+                except TestFailure as exc:
+                    failures.append(str(exc))
+            simulations += len(new_tests) * len(points)
+            tests_done = test_count
+
+            ranking = sweepreport.build_report(
+                self._sweep_results(order[:test_count]),
+                {},
+                [sweepreport.SweepPoint(*point) for point in points],
+            ).rankings.get(sweepreport.ALL_GROUP, ())
+            if not ranking:
+                print(
+                    "Sweep search stopped: no test passed at every point.",
+                    file=sys.stderr,
+                )
+                break
+            keep = schedule[rung][0] if rung < len(schedule) else len(ranking)
+            promoted = [
+                (result.point.block_width, result.point.set_count)
+                for result in ranking[:keep]
+            ]
+            rungs.append(
+                {
+                    "tests": order[:test_count],
+                    "points": [
+                        sweepreport.group_result_to_json(result)
+                        for result in ranking
+                    ],
+                    "promoted": [result.point.label for result in ranking[:keep]],
+                }
+            )
+            print(
+                f"  best {ranking[0].point.label} (geomean CPI "
+                f"{ranking[0].geomean_cpi:.4f} over {ranking[0].tests} tests); "
+                + (
+                    f"promoted {', '.join(rungs[-1]['promoted'])}"
+                    if rung < len(schedule)
+                    else "final"
+                ),
+                flush=True,
+            )
+            points[:] = promoted
+            self._write_sweep_search(rungs, simulations, grid_simulations)
+
+        print(
+            f"Sweep search: {simulations} simulations, against "
+            f"{grid_simulations} for the full grid",
+            flush=True,
+        )
+        if failures:
+            raise TestFailure("\n\n".join(failures))
+
+    def _merge_result_sections(self, section_start: int) -> None:
+        """Fold the sections written to RESULT_FILE past `section_start` into
+        one per cache configuration, rows in the order they were written."""
+        with self._result_lock:
+            with RESULT_FILE.open("r+b") as result_file:
+                result_file.seek(section_start)
+                text = result_file.read().decode()
+                result_file.seek(section_start)
+                result_file.truncate()
+                result_file.write(merge_result_sections(text).encode())
+
+    def _halving_test_order(self, tests: list[str]) -> list[str]:
+        """`tests` in the order the halving rungs take them: round-robin over
+        the catalog groups, cheapest first within each, so even the first
+        rung's few tests sample every workload."""
+        expected = self._expected_durations(tests)
+        group_of = {
+            test: name
+            for name, members in self.catalog.groups.items()
+            for test in members
+        }
+        queues: dict[str | None, list[str]] = {}
+        for test in sorted(tests, key=lambda test: (expected[test], test)):
+            queues.setdefault(group_of.get(test), []).append(test)
+        order = []
+        while any(queues.values()):
+            for queue in queues.values():
+                if queue:
+                    order.append(queue.pop(0))
+        return order
+
+    @staticmethod
+    def _write_sweep_search(
+        rungs: list[dict[str, object]], simulations: int, grid_simulations: int
+    ) -> None:
+        SWEEP_SEARCH_FILE.parent.mkdir(parents=True, exist_ok=True)
+        SWEEP_SEARCH_FILE.write_text(
+            json.dumps(
+                {
+                    "strategy": "halving",
+                    "eta": SWEEP_HALVING_ETA,
+                    "simulations": simulations,
+                    "grid_simulations": grid_simulations,
+                    "best": rungs[-1]["promoted"][0],
+                    "rungs": rungs,
+                },
+                indent=1,
+            )
+            + "\n"
+        )
+
+    def _write_sweep_report(
+        self, tests: list[str], points: Sequence[tuple[int, int]]
+    ) -> None:
+        selected = set(tests)
+        report = sweepreport.build_report(
+            self._sweep_results(tests),
+            {
+                name: [test for test in members if test in selected]
+                for name, members in self.catalog.groups.items()
+            },
+            [sweepreport.SweepPoint(*point) for point in points],
+        )
+        if not report.complete_tests:
+            return
+        SWEEP_REPORT_FILE.write_text(sweepreport.format_report(report))
+        SWEEP_REPORT_CSV_FILE.write_text(sweepreport.report_csv(report))
+        print(sweepreport.format_highlights(report))
+        print(
+            f"Sweep report: {format_repo_path(SWEEP_REPORT_FILE)}, "
+            f"{format_repo_path(SWEEP_REPORT_CSV_FILE)}",
+            flush=True,
+        )
+
+    def _sweep_results(
+        self, tests: Sequence[str]
+    ) -> dict[tuple[str, sweepreport.SweepPoint], sweepreport.TestResult]:
+        """Counters of `tests` as this suite measured them: the runs that
+        passed, plus the last record of the runs --changed-only found
+        unchanged. Failed runs have neither, whatever an earlier run left in
+        PERF_RECORDS_FILE."""
+        wanted = set(tests)
+        results = {}
+        if self._perf_cached:
+            try:
+                stored = sweepreport.load_results(PERF_RECORDS_FILE, wanted)
+            except sweepreport.RecordFormatError:
+                stored = {}
+            for (test_name, point), result in stored.items():
+                key = (test_name, point.block_width, point.set_count)
+                if key in self._perf_cached:
+                    results[(test_name, point)] = result
+        for record in self._perf_records.values():
+            if record.test_name not in wanted:
+                continue
+            point = sweepreport.SweepPoint(record.block_width, record.set_count)
+            results[(record.test_name, point)] = sweepreport.TestResult(
+                test_name=record.test_name,
+                point=point,
+                cycles=record.counters["cycles"],
+                instret=record.counters["instret"],
+                icache_hits=record.counters["icache_hits"],
+                icache_misses=record.counters["icache_misses"],
+                dcache_hits=record.counters["dcache_hits"],
+                dcache_misses=record.counters["dcache_misses"],
+            )
+        return results
 
     def clean(self) -> None:
         self._remove_path(BUILD_DIR)
@@ -908,6 +2470,7 @@ class TestRunner:
                 "git",
                 "restore",
                 format_repo_path(RESULT_FILE),
+                format_repo_path(PERF_RESULT_FILE),
             ],
             description="Restore tracked generated files",
         )
@@ -915,13 +2478,50 @@ class TestRunner:
     def _run_suite(self, work: Callable[[], None], tests: list[str]) -> None:
         self._suite_ran = 0
         self._suite_failed = 0
+        self._suite_cached = 0
+        self._sim_cache_hits = 0
+        self._sim_cache_misses = 0
+        self._spike_cache_hits = 0
+        self._spike_cache_misses = 0
+        self._sim_cycles = 0
+        self._sim_seconds = 0.0
+        self._checkpoint_restores = 0
+        self._objcache_hits = 0
+        self._objcache_misses = 0
+        self._stage_busy.clear()
+        self._stage_capacity.clear()
+        self._perf_records.clear()
+        self._perf_failed.clear()
+        self._perf_cached.clear()
         start_time = time.monotonic()
+        objcache_before = self._objcache_stats()
+        self._timing_db.load()
         try:
             self._prepare_workspace(tests)
+            if self.coverage_mode is not None:
+                self._coverage_merger = CoverageMerger(
+                    self.command_runner,
+                    COVERAGE_MERGE_DIR,
+                    COVERAGE_PARTIAL_FILE,
+                    COVERAGE_MERGE_WORKERS,
+                )
             work()
             if self.coverage_mode is not None:
                 self._finalize_coverage()
         finally:
+            if self._coverage_merger is not None:
+                self._coverage_merger.close()
+                self._coverage_merger = None
+            with self._simulators_lock:
+                self._simulators.clear()
+            self._evict_simulator_cache()
+            self._evict_checkpoints()
+            self._timing_db.save()
+            self._save_perf_records()
+            objcache_after = self._objcache_stats()
+            if objcache_before is not None and objcache_after is not None:
+                self._objcache_hits = objcache_after[0] - objcache_before[0]
+                self._objcache_misses = objcache_after[1] - objcache_before[1]
             # Report even when failures propagate: the summary lands on stdout
             # right after the per-test output, before main() prints the details.
             self._print_suite_summary(time.monotonic() - start_time)
@@ -931,121 +2531,336 @@ class TestRunner:
             return
         passed = self._suite_ran - self._suite_failed
         counts = f"{passed}/{self._suite_ran} passed"
+        if self._suite_cached:
+            counts += f" ({self._suite_cached} cached)"
         if self._suite_failed:
             counts = f"{ANSI_RED}{counts}, {self._suite_failed} failed{ANSI_RESET}"
         else:
             counts = f"{ANSI_GREEN}{counts}{ANSI_RESET}"
+        spike_cache = ""
+        if self._spike_cache_hits or self._spike_cache_misses:
+            spike_cache = (
+                f"; Spike trace cache: {self._spike_cache_hits} hits, "
+                f"{self._spike_cache_misses} misses"
+            )
+        sim_speed = ""
+        if self._sim_seconds > 0:
+            sim_speed = (
+                f"; {self.sim_profile} model: {format_count(self._sim_cycles)} "
+                f"cycles at {format_count(self._sim_cycles / self._sim_seconds)}"
+                " cycles/s"
+            )
+        checkpoints = ""
+        if self._checkpoint_restores:
+            checkpoints = f"; boot checkpoint restored {self._checkpoint_restores}x"
+        objcache = ""
+        objcache_total = self._objcache_hits + self._objcache_misses
+        if objcache_total:
+            objcache = (
+                f"; objects reused: {self._objcache_hits}/{objcache_total} "
+                f"({100 * self._objcache_hits // objcache_total}%)"
+            )
         print(
-            f"Summary: {counts} (elapsed {format_duration(elapsed_seconds)})",
+            f"Summary: {counts} (elapsed {format_duration(elapsed_seconds)}; "
+            f"simulator cache: {self._sim_cache_hits} hits, "
+            f"{self._sim_cache_misses} misses{objcache}{spike_cache}{checkpoints}"
+            f"{sim_speed})",
             flush=True,
         )
+        utilization = [
+            f"{stage} {100 * self._stage_busy[stage] / capacity:.0f}%"
+            for stage, capacity in self._stage_capacity.items()
+            if capacity > 0
+        ]
+        if utilization:
+            print(f"Stage utilization: {', '.join(utilization)}", flush=True)
+
+    def _record_sim_speed(self, cycles: int, seconds: float) -> None:
+        with self._result_lock:
+            self._sim_cycles += cycles
+            self._sim_seconds += seconds
 
     def _run_tests(
         self, tests: list[str], block_width: int, set_count: int, associativity: int
     ) -> None:
-        self._append_cache_header(block_width, set_count, associativity)
-        if self.jobs > 1 and len(tests) > 1:
-            failures = self._run_tests_parallel(
-                tests, block_width, set_count, associativity
-            )
+        self._run_matrix(tests, [(block_width, set_count)], associativity)
+
+    def _run_matrix(
+        self,
+        tests: list[str],
+        points: Sequence[tuple[int, int]],
+        associativity: int,
+    ) -> None:
+        """Run every test at every (BLOCK_WIDTH, SET_COUNT) point.
+
+        With -j the whole matrix is one work queue, so workers never wait for
+        a sweep point to drain before the next one starts. Results are still
+        written per point in sweep order, and every point runs even when an
+        earlier one fails; the failures are reported together at the end."""
+        if self.test_workers > 1 and len(tests) * len(points) > 1:
+            failures = self._run_tests_parallel(tests, points, associativity)
         else:
-            failures = self._run_tests_serial(
-                tests, block_width, set_count, associativity
-            )
+            failures = self._run_tests_serial(tests, points, associativity)
 
-        self._suite_ran += len(tests)
+        self._suite_ran += len(tests) * len(points)
         self._suite_failed += len(failures)
 
         if failures:
             raise TestFailure("\n\n".join(failures))
 
+    @staticmethod
+    def _sweep_variant(
+        points: Sequence[tuple[int, int]], block_width: int, set_count: int
+    ) -> str | None:
+        # Sweep points get their own artifact directories so that runs of one
+        # test at different points never share files.
+        if len(points) == 1:
+            return None
+        return f"bw{block_width}-sc{set_count}"
+
+    @staticmethod
+    def _failure_text(
+        test_name: str,
+        points: Sequence[tuple[int, int]],
+        block_width: int,
+        set_count: int,
+        exc: TestFailure,
+    ) -> str:
+        if len(points) == 1:
+            return f"{test_name}:\n{exc}"
+        return (
+            f"{test_name} (BLOCK_WIDTH={block_width}, SET_COUNT={set_count}):"
+            f"\n{exc}"
+        )
+
     def _run_tests_serial(
-        self, tests: list[str], block_width: int, set_count: int, associativity: int
+        self,
+        tests: list[str],
+        points: Sequence[tuple[int, int]],
+        associativity: int,
     ) -> list[str]:
-        total = len(tests)
+        total = len(tests) * len(points)
         failures: list[str] = []
-        for index, test_name in enumerate(tests, start=1):
-            console = TestConsole(buffered=False)
-            try:
-                self._run_single_test(
-                    test_name,
-                    block_width,
-                    set_count,
-                    associativity,
-                    index,
-                    total,
-                    console,
-                    self._record_test_outcome,
+        index = 0
+        reference_executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            for block_width, set_count in points:
+                self._append_cache_header(block_width, set_count, associativity)
+                runs = []
+                for test_name in tests:
+                    index += 1
+                    run = self._new_test_run(
+                        test_name,
+                        block_width,
+                        set_count,
+                        associativity,
+                        index,
+                        total,
+                        TestConsole(buffered=False),
+                        self._record_test_outcome,
+                        variant=self._sweep_variant(points, block_width, set_count),
+                    )
+                    runs.append((run, self._cached_outcome(run)))
+                self._plan_checkpoints(
+                    [run for run, cached_outcome in runs if cached_outcome is None]
                 )
-            except TestFailure as exc:
-                failures.append(f"{test_name}:\n{exc}")
+                for run, cached_outcome in runs:
+                    test_name = run.test_name
+                    if cached_outcome is not None:
+                        self._report_cached(run, cached_outcome)
+                        continue
+                    try:
+                        self._begin_test(run)
+                        self._start_trace_reference(run, reference_executor)
+                        try:
+                            build = self._simulator_for(run.config, run.timings)
+                            self._simulate_test(run, build)
+                            self._check_test(run)
+                        finally:
+                            self._finish_test(run)
+                    except TestFailure as exc:
+                        self._record_perf_failure(run)
+                        failures.append(
+                            self._failure_text(
+                                test_name, points, block_width, set_count, exc
+                            )
+                        )
+        finally:
+            reference_executor.shutdown(wait=True)
         return failures
 
     def _run_tests_parallel(
-        self, tests: list[str], block_width: int, set_count: int, associativity: int
+        self,
+        tests: list[str],
+        points: Sequence[tuple[int, int]],
+        associativity: int,
     ) -> list[str]:
-        total = len(tests)
-        outcomes: dict[str, TestOutcome] = {}
-        failure_texts: dict[str, str] = {}
+        jobs = [
+            (block_width, set_count, test_name)
+            for block_width, set_count in points
+            for test_name in tests
+        ]
+        total = len(jobs)
+        outcomes: dict[tuple[int, int, str], TestOutcome] = {}
+        failure_texts: dict[tuple[int, int, str], str] = {}
         output_lock = threading.Lock()
         section_start = RESULT_FILE.stat().st_size
 
-        def record_outcome(test_name: str, outcome: TestOutcome) -> None:
-            # Rewrite this configuration's section of results/result.txt in
-            # catalog order on every completion, so the file stays ordered and
-            # current while tests finish out of order.
-            with self._result_lock:
-                outcomes[test_name] = outcome
-                with RESULT_FILE.open("r+") as result_file:
-                    result_file.seek(section_start)
-                    result_file.truncate()
+        def write_results() -> None:
+            # Rewrite this run's part of results/result.txt on every
+            # completion: one section per point in sweep order, rows in
+            # catalog order, so the file stays ordered and current while
+            # tests finish out of order. Called with _result_lock held.
+            with RESULT_FILE.open("r+") as result_file:
+                result_file.seek(section_start)
+                result_file.truncate()
+                for block_width, set_count in points:
+                    result_file.write(
+                        format_cache_header(block_width, set_count, associativity)
+                    )
                     for name in tests:
-                        if name in outcomes:
-                            result_file.write(format_result_row(name, outcomes[name]))
+                        outcome = outcomes.get((block_width, set_count, name))
+                        if outcome is not None:
+                            result_file.write(format_result_row(name, outcome))
 
-        def run_one(index: int, test_name: str) -> tuple[str, str | None]:
-            console = TestConsole(buffered=True)
-            failure_text: str | None = None
-            try:
-                if not self.cancel_event.is_set():
-                    self._run_single_test(
-                        test_name,
-                        block_width,
-                        set_count,
-                        associativity,
-                        index,
-                        total,
-                        console,
-                        record_outcome,
-                    )
-            except TestFailure as exc:
-                failure_text = f"{test_name}:\n{exc}"
-            finally:
-                with output_lock:
-                    console.flush()
-            return test_name, failure_text
+        with self._result_lock:
+            write_results()
+
+        def outcome_recorder(
+            block_width: int, set_count: int
+        ) -> Callable[[str, TestOutcome], None]:
+            def record_outcome(name: str, outcome: TestOutcome) -> None:
+                with self._result_lock:
+                    outcomes[(block_width, set_count, name)] = outcome
+                    write_results()
+
+            return record_outcome
+
+        # Longest expected first, so a long test does not start last and run
+        # on alone after every other worker has gone idle. Tests without
+        # history count as average; ties keep sweep and catalog order.
+        expected = self._expected_durations(tests)
+        dispatch_order = sorted(
+            enumerate(jobs, start=1), key=lambda item: -expected[item[1][2]]
+        )
+        runs = [
+            self._new_test_run(
+                test_name,
+                block_width,
+                set_count,
+                associativity,
+                index,
+                total,
+                TestConsole(buffered=True),
+                outcome_recorder(block_width, set_count),
+                variant=self._sweep_variant(points, block_width, set_count),
+            )
+            for index, (block_width, set_count, test_name) in dispatch_order
+        ]
+        finished: set[int] = set()
+        uncached_runs = []
+        for run in runs:
+            cached_outcome = self._cached_outcome(run)
+            if cached_outcome is None:
+                uncached_runs.append(run)
+                continue
+            self._report_cached(run, cached_outcome)
+            finished.add(run.index)
+            run.console.flush()
+        runs = uncached_runs
+        self._plan_checkpoints(runs)
+
+        build_workers = max(
+            1, min(BUILD_WORKERS, len({run.config for run in runs}))
+        )
+        if runs and any(expected.values()):
+            eta = estimate_makespan(
+                [expected[run.test_name] for run in runs], self.test_workers
+            )
+            print(
+                f"Dispatching longest expected tests first on {self.test_workers} "
+                f"simulation workers ({build_workers} building); expected "
+                f"duration {format_duration(eta)}.",
+                flush=True,
+            )
 
-        executor = ThreadPoolExecutor(max_workers=self.jobs)
-        try:
-            futures = [
-                executor.submit(run_one, index, test_name)
-                for index, test_name in enumerate(tests, start=1)
+        def progress_note() -> str:
+            # Called with output_lock held.
+            if not any(expected.values()):
+                return ""
+            now = time.monotonic()
+            busy = [
+                max(0.0, expected[run.test_name] - (now - run.start_time))
+                for run in runs
+                if run.start_time and run.index not in finished
             ]
-            for future in as_completed(futures):
-                test_name, failure_text = future.result()
-                if failure_text is not None:
-                    failure_texts[test_name] = failure_text
-        except BaseException:
-            # Infrastructure error or Ctrl-C: stop in-flight simulations and
-            # drop queued tests before propagating.
-            self.cancel_event.set()
-            executor.shutdown(wait=True, cancel_futures=True)
-            raise
-        executor.shutdown(wait=True)
+            pending = [expected[run.test_name] for run in runs if not run.start_time]
+            eta = estimate_makespan(pending, self.test_workers, busy)
+            return f"  [{len(finished)}/{total} done, ETA {format_duration(eta)}]"
+
+        def on_finished(run: TestRun, exc: TestFailure | None) -> None:
+            with output_lock:
+                if exc is not None:
+                    self._record_perf_failure(run)
+                    failure_texts[(run.block_width, run.set_count, run.test_name)] = (
+                        self._failure_text(
+                            run.test_name, points, run.block_width, run.set_count, exc
+                        )
+                    )
+                finished.add(run.index)
+                note = progress_note()
+                if note:
+                    run.console.emit(note)
+                run.console.flush()
+
+        pipeline = TestPipeline(
+            self,
+            runs,
+            build_workers=build_workers,
+            sim_workers=self.test_workers,
+            on_finished=on_finished,
+        )
+        # Builds split the cores between the build workers, not the tests.
+        self._build_workers = build_workers
+        try:
+            pipeline.run()
+        finally:
+            self._build_workers = 1
+            with self._result_lock:
+                for stage in TestPipeline.STAGES:
+                    self._stage_busy[stage] = (
+                        self._stage_busy.get(stage, 0.0) + pipeline.busy[stage]
+                    )
+                    self._stage_capacity[stage] = (
+                        self._stage_capacity.get(stage, 0.0)
+                        + pipeline.workers[stage] * pipeline.elapsed
+                    )
 
-        return [failure_texts[name] for name in tests if name in failure_texts]
+        return [failure_texts[job] for job in jobs if job in failure_texts]
 
-    def _run_single_test(
+    def _expected_durations(self, tests: list[str]) -> dict[str, float]:
+        known = {
+            name: seconds
+            for name in tests
+            if (seconds := self._timing_db.expected_seconds(name)) is not None
+        }
+        default = sum(known.values()) / len(known) if known else 0.0
+        return {name: known.get(name, default) for name in tests}
+
+    def _expected_footprint(self, test_name: str) -> tuple[int, int]:
+        """(memory, disk) bytes `test_name` is expected to need."""
+        footprint = []
+        for key, default in (
+            ("memory", DEFAULT_TEST_MEMORY_BYTES),
+            ("disk", DEFAULT_TEST_DISK_BYTES),
+        ):
+            expected = self._timing_db.expected(test_name, key)
+            if expected is None:
+                expected = self._timing_db.average(key)
+            footprint.append(int(expected if expected is not None else default))
+        return footprint[0], footprint[1]
+
+    def _new_test_run(
         self,
         test_name: str,
         block_width: int,
@@ -1055,107 +2870,546 @@ class TestRunner:
         total: int,
         console: TestConsole,
         record_outcome: Callable[[str, TestOutcome], None],
-    ) -> None:
-        entry = self.catalog.require_test(test_name)
-        paths = self._paths_for(test_name)
-        flag_notes = self._effective_flag_notes(test_name)
+        *,
+        variant: str | None = None,
+    ) -> TestRun:
+        return TestRun(
+            test_name=test_name,
+            entry=self.catalog.require_test(test_name),
+            paths=self._paths_for(test_name, variant),
+            config=self._simulator_config(test_name, block_width, set_count),
+            block_width=block_width,
+            set_count=set_count,
+            associativity=associativity,
+            index=index,
+            total=total,
+            console=console,
+            record_outcome=record_outcome,
+        )
+
+    def _begin_test(self, run: TestRun) -> None:
+        flag_notes = self._effective_flag_notes(run.test_name)
         flag_suffix = f" [flags: {' '.join(flag_notes)}]" if flag_notes else ""
-        console.emit(
-            f"[{index}/{total}] Running {test_name} "
-            f"(BLOCK_WIDTH={block_width}, SET_COUNT={set_count}, ASSOCIATIVITY={associativity}-way)"
-            f"{flag_suffix}"
+        run.console.emit(
+            f"[{run.index}/{run.total}] Running {run.test_name} "
+            f"(BLOCK_WIDTH={run.block_width}, SET_COUNT={run.set_count}, "
+            f"ASSOCIATIVITY={run.associativity}-way){flag_suffix}"
         )
+        run.start_time = time.monotonic()
+
+    def _start_trace_reference(self, run: TestRun, executor: Executor) -> None:
+        # Spike needs only the ELF, so its reference trace is generated in the
+        # background while the simulator runs; _check_test waits for it.
+        # reference_cancel stops it early when the test no longer needs it,
+        # cancel_event when the whole run is stopped.
+        if self._rtl_trace_enabled(run.test_name) and self._spike_compare_enabled(
+            run.test_name
+        ):
+            run.reference = executor.submit(
+                self._run_trace_reference,
+                run.test_name,
+                run.entry,
+                run.paths,
+                run.reference_cancel,
+            )
 
+    def _simulate_test(self, run: TestRun, build: SimulatorBuild) -> None:
+        if self.sample:
+            self._simulate_samples(run, build)
+            return
+        # A Spike trace that is already cached is also handed to the
+        # simulator, which then compares every retirement as it happens and
+        # stops at the first mismatch.
+        lockstep_trace: Path | None = None
+        if run.reference is not None and self.lockstep:
+            lockstep_trace = self._cached_spike_trace(run.test_name, run.entry)
+        checkpoint_env = self._checkpoint_env(run)
+        simulation_start = time.monotonic()
         try:
-            self._build_simulator(test_name, entry, paths, block_width, set_count)
+            self._run_simulation(
+                run.test_name,
+                run.entry,
+                run.paths,
+                build.sim_binary,
+                run.console,
+                reference_trace=lockstep_trace,
+                checkpoint_env=checkpoint_env,
+            )
+        except TraceLimitExceeded as exc:
+            run.trace_limit = exc
+            run.console.emit(f"  {exc}")
+        finally:
+            if "MAVERIC_CHECKPOINT_SAVE" in checkpoint_env:
+                run.checkpoint.saver_done.set()
+        if "MAVERIC_CHECKPOINT_SAVE" in checkpoint_env and self._checkpoint_saved(
+            run.checkpoint
+        ):
+            run.console.emit(
+                f"  Saved the boot checkpoint shared by {run.checkpoint.members} tests"
+            )
+        run.timings["simulate"] = time.monotonic() - simulation_start
+        run.footprint["disk"] = sum(
+            path.stat().st_size
+            for path in (
+                run.paths.res_file,
+                run.paths.rtl_trace_file,
+                run.paths.pmem_write_file,
+                run.paths.waveform_file,
+                run.paths.coverage_file,
+            )
+            if path.exists()
+        )
 
-            trace_limit: TraceLimitExceeded | None = None
-            try:
-                self._run_simulation(test_name, entry, paths, console)
-            except TraceLimitExceeded as exc:
-                trace_limit = exc
-                console.emit(f"  {exc}")
-
-            skips_self_check = (
-                self._cosim_only(test_name)
-                or self._skips_self_check(test_name)
-                or self.no_self_check
-            )
-            require_status = not skips_self_check and trace_limit is None
-            parsed_output = self._parse_simulation_output(
-                test_name, paths, require_status=require_status
-            )
-
-            if skips_self_check:
-                self_check = "N/A"
-                self_check_failed = False
-            elif trace_limit is not None:
-                # The simulation was killed at the log cap; the test fails via
-                # the LOG-LIMIT outcome, so report whatever status made it out.
-                self_check = parsed_output.status_text or "N/A"
-                self_check_failed = False
-            else:
-                self_check = (
-                    "Missing"
-                    if parsed_output.status_missing
-                    else (parsed_output.status_text or "Unknown")
+    def _simulate_samples(self, run: TestRun, build: SimulatorBuild) -> None:
+        """Count the program's instructions in Dromajo, then simulate each
+        sample window in a simulator of its own."""
+        simulation_start = time.monotonic()
+        for stale in run.paths.run_dir.glob("sample-*.txt"):
+            stale.unlink()
+        self._run_simulation(
+            run.test_name,
+            run.entry,
+            run.paths,
+            build.sim_binary,
+            run.console,
+            sample_env={"MAVERIC_SAMPLE_COUNT": "1"},
+        )
+        length = PROGRAM_LENGTH_RE.search(run.paths.res_file.read_text())
+        if length is None:
+            raise SimulationOutputError(
+                f"Dromajo did not report the length of {run.test_name}. "
+                f"See {format_repo_path(run.paths.res_file)}."
+            )
+        run.program_length = int(length.group(1))
+        plan = plan_sample_windows(
+            run.program_length,
+            SAMPLE_WINDOWS,
+            SAMPLE_WARMUP_INSTRUCTIONS,
+            SAMPLE_WINDOW_INSTRUCTIONS,
+        )
+        run.console.emit(
+            f"  {format_count(run.program_length)} instructions; simulating "
+            + (
+                f"{len(plan)} sample windows"
+                if len(plan) > 1
+                else "the whole program as one window"
+            )
+        )
+        for number, (start, warmup, window) in enumerate(plan, 1):
+            paths = replace(
+                run.paths, res_file=run.paths.run_dir / f"sample-{number}.txt"
+            )
+            self._run_simulation(
+                run.test_name,
+                run.entry,
+                paths,
+                build.sim_binary,
+                run.console,
+                sample_env={
+                    "MAVERIC_SAMPLE_START": str(start),
+                    "MAVERIC_SAMPLE_WARMUP": str(warmup),
+                    "MAVERIC_SAMPLE_WINDOW": str(window),
+                },
+            )
+            match = SAMPLE_WINDOW_RE.search(paths.res_file.read_text())
+            if match is None:
+                raise SimulationOutputError(
+                    f"Sample window {number} of {run.test_name} reported no "
+                    f"measurement. See {format_repo_path(paths.res_file)}."
                 )
-                self_check_failed = not self._self_check_passed(
-                    parsed_output.status_text
+            counters = dict.fromkeys(SAMPLE_COUNTER_NAMES, 0)
+            for field_text in match.group(4).split():
+                name, _, value = field_text.partition("=")
+                if name in counters and value.isdigit():
+                    counters[name] = int(value)
+            run.sample_windows.append(
+                SampleWindow(
+                    start=int(match.group(1)),
+                    instructions=int(match.group(2)),
+                    cycles=int(match.group(3)),
+                    counters=counters,
                 )
+            )
+        run.timings["simulate"] = time.monotonic() - simulation_start
+        run.footprint["disk"] = sum(
+            path.stat().st_size
+            for path in run.paths.run_dir.glob("*.txt")
+            if path.is_file()
+        )
 
-            trace_preview = ""
-            if trace_limit is not None:
-                tracecomp_status = "LOG-LIMIT"
-            elif not self._rtl_trace_enabled(test_name):
-                tracecomp_status = "Skipped"
-            elif not self._spike_compare_enabled(test_name):
-                tracecomp_status = "N/A"
-            else:
-                self._run_trace_reference(test_name, entry, paths)
-                tracecomp_status, trace_preview = self._compare_traces(test_name, paths)
-
-            outcome = TestOutcome(self_check=self_check, tracecomp=tracecomp_status)
-            record_outcome(test_name, outcome)
+    def _check_test(self, run: TestRun) -> None:
+        if self.sample:
+            self._check_samples(run)
+            return
+        test_name = run.test_name
+        paths = run.paths
+        trace_limit = run.trace_limit
+        skips_self_check = (
+            self._cosim_only(test_name)
+            or self._skips_self_check(test_name)
+            or self.no_self_check
+        )
+        require_status = not skips_self_check and trace_limit is None
+        parsed_output = self._parse_simulation_output(
+            test_name, paths, require_status=require_status
+        )
 
-            failures = []
-            if trace_limit is not None:
+        if skips_self_check:
+            self_check = "N/A"
+            self_check_failed = False
+        elif trace_limit is not None or parsed_output.trace_mismatch:
+            # The simulation was killed at the log cap or stopped at the
+            # first trace mismatch; the test fails via LOG-LIMIT or the
+            # trace comparison, so report whatever status made it out.
+            self_check = parsed_output.status_text or "N/A"
+            self_check_failed = False
+        else:
+            self_check = (
+                "Missing"
+                if parsed_output.status_missing
+                else (parsed_output.status_text or "Unknown")
+            )
+            self_check_failed = not self._self_check_passed(parsed_output.status_text)
+
+        trace_preview = ""
+        if trace_limit is not None:
+            tracecomp_status = "LOG-LIMIT"
+        elif not self._rtl_trace_enabled(test_name):
+            tracecomp_status = "Skipped"
+        elif run.reference is None:
+            tracecomp_status = "N/A"
+        else:
+            run.timings["spike"] = run.reference.result()
+            compare_start = time.monotonic()
+            tracecomp_status, trace_preview = self._compare_traces(test_name, paths)
+            run.timings["compare"] = time.monotonic() - compare_start
+
+        outcome = TestOutcome(self_check=self_check, tracecomp=tracecomp_status)
+        run.record_outcome(test_name, outcome)
+
+        failures = []
+        if trace_limit is not None:
+            failures.append(
+                f"RTL log for {test_name} exceeded the {trace_limit.limit}-byte "
+                f"cap and the simulation was stopped. "
+                f"See {format_repo_path(trace_limit.path)}."
+            )
+        if self_check_failed:
+            if parsed_output.status_missing:
                 failures.append(
-                    f"RTL log for {test_name} exceeded the {trace_limit.limit}-byte "
-                    f"cap and the simulation was stopped. "
-                    f"See {format_repo_path(trace_limit.path)}."
+                    f"Self Check missing for {test_name}. See {format_repo_path(paths.res_file)}."
                 )
-            if self_check_failed:
-                if parsed_output.status_missing:
-                    failures.append(
-                        f"Self Check missing for {test_name}. See {format_repo_path(paths.res_file)}."
-                    )
-                else:
-                    failures.append(
-                        f"Self Check failed for {test_name}: {self_check}. See {format_repo_path(paths.res_file)}."
-                    )
-            if tracecomp_status == "FAIL":
+            else:
                 failures.append(
-                    f"Tracecomp failed for {test_name}. Diff preview:\n{trace_preview}"
-                )
-            console.emit(
-                colorize_status_text(
-                    f"  Self Check: {outcome.self_check}; Tracecomp: {outcome.tracecomp}"
+                    f"Self Check failed for {test_name}: {self_check}. See {format_repo_path(paths.res_file)}."
                 )
+        if tracecomp_status == "FAIL":
+            failures.append(
+                f"Tracecomp failed for {test_name}. Diff preview:\n{trace_preview}"
+            )
+        speed = ""
+        if parsed_output.peak_memory is not None:
+            run.footprint["memory"] = parsed_output.peak_memory
+        if parsed_output.cycles is not None and parsed_output.sim_seconds:
+            self._record_sim_speed(parsed_output.cycles, parsed_output.sim_seconds)
+            speed = (
+                f"; {format_count(parsed_output.cycles)} cycles at "
+                f"{format_count(parsed_output.cycles / parsed_output.sim_seconds)}"
+                " cycles/s"
+            )
+        perf_record = None
+        if parsed_output.perf is not None:
+            perf_record = PerfRecord(
+                test_name=test_name,
+                block_width=run.block_width,
+                set_count=run.set_count,
+                associativity=run.associativity,
+                counters=parsed_output.perf,
+                recorded=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
             )
-            if failures:
-                raise TestFailure("\n".join(failures))
+            if perf_record.cpi is not None:
+                speed += f"; CPI {perf_record.cpi:.4f}"
+        run.console.emit(
+            colorize_status_text(
+                f"  Self Check: {outcome.self_check}; "
+                f"Tracecomp: {outcome.tracecomp}{speed}"
+            )
+        )
+        if failures:
+            raise TestFailure("\n".join(failures))
 
-            if self.coverage_mode is not None:
-                self._stash_coverage_file(
-                    test_name, paths, block_width, set_count, associativity
-                )
-        except BaseException:
-            # Keep the per-test build for post-mortem on any failure; it is
-            # rebuilt from scratch on the next run and removed by -c.
-            raise
+        self._store_outcome(run, outcome)
+        if perf_record is not None:
+            with self._result_lock:
+                self._perf_records[perf_record.key] = perf_record
+        if self.coverage_mode is not None:
+            self._stash_coverage_file(
+                test_name, paths, run.block_width, run.set_count, run.associativity
+            )
+
+    def _check_samples(self, run: TestRun) -> None:
+        """Report the CPI, hit rates, and branch accuracy estimated from a
+        sampled run's windows, and keep them next to the windows in
+        samples.json."""
+        assert run.program_length is not None
+        estimate = estimate_samples(run.sample_windows, run.program_length)
+        outcome = TestOutcome(self_check="N/A", tracecomp="Skipped")
+        run.record_outcome(run.test_name, outcome)
+        if estimate.cpi.half_width is None:
+            cpi = f"CPI {estimate.cpi.mean:.3f} (whole program)"
         else:
-            self._clean_test_artifacts(paths)
+            cpi = (
+                f"CPI {estimate.cpi.mean:.3f} ± {estimate.cpi.half_width:.3f} "
+                f"(95% confidence, {estimate.cpi.windows} windows)"
+            )
+        ratios = "".join(
+            f"; {label} {100 * statistic.mean:.2f}%"
+            + (
+                f" ± {100 * statistic.half_width:.2f}%"
+                if statistic.half_width is not None
+                else ""
+            )
+            for label, name in (
+                ("I$ hit", "icache_hit_rate"),
+                ("D$ hit", "dcache_hit_rate"),
+                ("branch accuracy", "branch_accuracy"),
+            )
+            if (statistic := estimate.ratios.get(name)) is not None
+        )
+        run.console.emit(
+            colorize_status_text(
+                f"  Self Check: {outcome.self_check}; "
+                f"Tracecomp: {outcome.tracecomp}; {cpi}; ~"
+                f"{format_count(estimate.cpi.mean * estimate.program_length)} "
+                f"cycles{ratios}"
+            )
+        )
+        (run.paths.run_dir / "samples.json").write_text(
+            json.dumps(
+                {
+                    "program_length": estimate.program_length,
+                    **{
+                        name: {
+                            "mean": statistic.mean,
+                            "half_width": statistic.half_width,
+                            "windows": statistic.windows,
+                        }
+                        for name, statistic in {
+                            "cpi": estimate.cpi,
+                            **estimate.ratios,
+                        }.items()
+                    },
+                    "windows": [
+                        {
+                            "start": window.start,
+                            "instructions": window.instructions,
+                            "cycles": window.cycles,
+                            **window.counters,
+                        }
+                        for window in run.sample_windows
+                    ],
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+
+    def _finish_test(self, run: TestRun) -> None:
+        if run.reference is not None:
+            run.reference_cancel.set()
+            run.reference.cancel()
+            wait([run.reference])
+        # Only complete runs are representative; an interrupted suite or a
+        # failed build would skew the history.
+        if "simulate" in run.timings and not self.cancel_event.is_set():
+            run.timings["total"] = time.monotonic() - run.start_time
+            self._timing_db.record(run.test_name, {**run.timings, **run.footprint})
+
+    def _outcome_cache_file(self, run: TestRun) -> Path:
+        digest = hashlib.sha256()
+        digest.update(self._simulator_cache_key(run.config).encode())
+        # The Spike trace key covers the ELF contents and the reference's
+        # ISA and normalization.
+        digest.update(
+            self._spike_trace_cache_file(run.test_name, run.entry).name.encode()
+        )
+        run_flags = [
+            *self._effective_flag_notes(run.test_name),
+            f"cosim-only={self._cosim_only(run.test_name)}",
+            f"no-self-check={self.no_self_check}",
+            f"hex-image={self.hex_image}",
+            f"max-sim-time={self._max_sim_time(run.test_name, run.entry)}",
+        ]
+        for flag in run_flags:
+            digest.update(f"\0{flag}".encode())
+        return OUTCOME_CACHE_DIR / f"{run.test_name}-{digest.hexdigest()[:16]}.json"
+
+    def _cached_outcome(self, run: TestRun) -> TestOutcome | None:
+        """The outcome of an earlier passing run with the same inputs, when
+        --changed-only lets it stand in for running the test."""
+        if not self.changed_only:
+            return None
+        try:
+            data = json.loads(self._outcome_cache_file(run).read_text())
+            return TestOutcome(
+                self_check=str(data["self_check"]),
+                tracecomp=str(data["tracecomp"]),
+                cached=True,
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _store_outcome(self, run: TestRun, outcome: TestOutcome) -> None:
+        cache_file = self._outcome_cache_file(run)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        staging_file = cache_file.with_name(
+            f"{cache_file.name}.tmp-{os.getpid()}-{threading.get_ident()}"
+        )
+        staging_file.write_text(
+            json.dumps(
+                {"self_check": outcome.self_check, "tracecomp": outcome.tracecomp}
+            )
+            + "\n"
+        )
+        os.replace(staging_file, cache_file)
+
+    def _report_cached(self, run: TestRun, outcome: TestOutcome) -> None:
+        run.console.emit(
+            f"[{run.index}/{run.total}] {run.test_name} "
+            f"(BLOCK_WIDTH={run.block_width}, SET_COUNT={run.set_count}, "
+            f"ASSOCIATIVITY={run.associativity}-way) is unchanged since it passed"
+        )
+        run.console.emit(
+            colorize_status_text(
+                f"  Self Check: {outcome.self_check}; "
+                f"Tracecomp: {outcome.tracecomp} (cached)"
+            )
+        )
+        run.record_outcome(run.test_name, outcome)
+        with self._result_lock:
+            self._suite_cached += 1
+            self._perf_cached.add((run.test_name, run.block_width, run.set_count))
+
+    def _record_perf_failure(self, run: TestRun) -> None:
+        with self._result_lock:
+            self._perf_failed.add((run.test_name, run.block_width, run.set_count))
+
+    def _plan_checkpoints(self, runs: Sequence[TestRun]) -> None:
+        """Let runs that boot the same kernel share one boot checkpoint.
+
+        Runs on the same savable simulator whose images have the same layout
+        and differ in at most CHECKPOINT_MAX_GUARD_BYTES form a class. The
+        bytes they differ in are its guard range: the simulation that saves
+        the checkpoint publishes its latest one when the program first
+        touches that range, so everything before it is the same for every
+        member. The first run of a class in `runs` order saves it; the others
+        restore it and patch in their own guard bytes. Checkpoints are kept
+        under build/checkpoints/, so later runs restore from the start."""
+        classes: dict[
+            tuple[object, ...], list[tuple[TestRun, list[LoadSegment]]]
+        ] = {}
+        for run in runs:
+            if not run.config.savable:
+                continue
+            segments = read_load_segments(ROOT / run.entry.elf_path)
+            if not segments:
+                continue
+            layout = tuple(
+                (segment.address, len(segment.data), segment.memory_size)
+                for segment in segments
+            )
+            classes.setdefault((run.config, layout), []).append((run, segments))
+
+        for (config, layout), members in classes.items():
+            reference = members[0][1]
+            sharing: list[TestRun] = []
+            low: int | None = None
+            high: int | None = None
+            for run, segments in members:
+                spans = [
+                    (first.address + span[0], first.address + span[1])
+                    for first, second in zip(reference, segments)
+                    if (span := difference_span(first.data, second.data)) is not None
+                ]
+                if spans:
+                    run_low = min(start for start, _ in spans)
+                    run_high = max(end for _, end in spans)
+                    span_low = run_low if low is None else min(low, run_low)
+                    span_high = run_high if high is None else max(high, run_high)
+                    if span_high - span_low > CHECKPOINT_MAX_GUARD_BYTES:
+                        continue
+                    low, high = span_low, span_high
+                sharing.append(run)
+            if len(sharing) < 2 or low is None or high is None:
+                # Without a difference there is no telling where a test's own
+                # part of the run starts.
+                continue
+
+            digest = hashlib.sha256()
+            digest.update(self._simulator_cache_key(config).encode())
+            digest.update(repr((layout, low, high)).encode())
+            for segment in reference:
+                # The image every member shares: the reference with its guard
+                # bytes cleared.
+                data = bytearray(segment.data)
+                start = max(low - segment.address, 0)
+                end = min(high - segment.address, len(data))
+                if start < end:
+                    data[start:end] = bytes(end - start)
+                digest.update(data)
+            guard = (
+                (low >> 2) & MEM_WORD_INDEX_MASK,
+                (((high - 1) >> 2) & MEM_WORD_INDEX_MASK) + 1,
+            )
+            checkpoint = BootCheckpoint(
+                directory=CHECKPOINT_DIR / f"{config.name}-{digest.hexdigest()[:16]}",
+                guard=guard,
+                saver_index=sharing[0].index,
+                members=len(sharing),
+            )
+            for run in sharing:
+                run.checkpoint = checkpoint
+
+    def _checkpoint_ready(self, run: TestRun) -> bool:
+        """Whether `run` can start: it saves or restores no checkpoint, or the
+        one it restores is there or will not be."""
+        checkpoint = run.checkpoint
+        return (
+            checkpoint is None
+            or run.index == checkpoint.saver_index
+            or checkpoint.saver_done.is_set()
+            or self._checkpoint_saved(checkpoint)
+        )
+
+    @staticmethod
+    def _checkpoint_saved(checkpoint: BootCheckpoint) -> bool:
+        # The simulator publishes the directory with a single rename.
+        return (checkpoint.directory / "state").exists()
+
+    def _checkpoint_env(self, run: TestRun) -> dict[str, str]:
+        checkpoint = run.checkpoint
+        if checkpoint is None:
+            return {}
+        low, high = checkpoint.guard
+        env = {"MAVERIC_CHECKPOINT_GUARD": f"{low}:{high}"}
+        if self._checkpoint_saved(checkpoint):
+            try:
+                # The state file's mtime is the entry's LRU timestamp.
+                os.utime(checkpoint.directory / "state")
+            except OSError:
+                # Evicted by a concurrent driver; boot instead.
+                return {}
+            env["MAVERIC_CHECKPOINT_RESTORE"] = str(checkpoint.directory)
+            run.console.emit(
+                f"  Restoring the boot checkpoint shared by {checkpoint.members} tests"
+            )
+            with self._result_lock:
+                self._checkpoint_restores += 1
+        elif run.index == checkpoint.saver_index:
+            CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+            env["MAVERIC_CHECKPOINT_SAVE"] = str(checkpoint.directory)
+            env["MAVERIC_CHECKPOINT_INTERVAL"] = str(CHECKPOINT_INTERVAL_CYCLES)
+        return env
 
     def _prepare_workspace(self, tests: list[str]) -> None:
         BUILD_DIR.mkdir(parents=True, exist_ok=True)
@@ -1176,10 +3430,13 @@ class TestRunner:
         self._prepare_test_inputs(tests)
 
     def _prepare_test_inputs(self, tests: list[str]) -> None:
-        """Generate disassembly and memory images for the selected tests only.
+        """Check the selected tests' ELFs and, with --hex-image, generate their
+        disassembly and memory images.
 
-        Outputs are cached in build/: a file is regenerated only when it is
-        missing or older than its source (ELF -> dis-asm -> instr)."""
+        The simulator loads ELF segments itself (test/tb/mem_image.c), so by
+        default there is nothing to generate. Hex images are cached in build/:
+        a file is regenerated only when it is missing or older than its source
+        (ELF -> dis-asm -> instr)."""
         generated = 0
         cached = 0
         for test_name in tests:
@@ -1189,6 +3446,8 @@ class TestRunner:
                 raise ConfigurationError(
                     f"Expected ELF file not found: {format_repo_path(elf_path)}"
                 )
+            if not self.hex_image:
+                continue
             disasm_path = ROOT / entry.disasm_path
             instr_path = ROOT / entry.instr_path
 
@@ -1217,7 +3476,8 @@ class TestRunner:
             else:
                 cached += 1
 
-        print(f"Test inputs: {generated} generated, {cached} cached.")
+        if self.hex_image:
+            print(f"Test inputs: {generated} generated, {cached} cached.")
 
     @staticmethod
     def _is_stale(output_path: Path, source_path: Path) -> bool:
@@ -1225,63 +3485,274 @@ class TestRunner:
             return True
         return output_path.stat().st_mtime < source_path.stat().st_mtime
 
-    def _build_simulator(
+    def _simulator_config(
+        self, test_name: str, block_width: int, set_count: int
+    ) -> SimulatorConfig:
+        return SimulatorConfig(
+            block_width=block_width,
+            set_count=set_count,
+            continue_after_trap=self._continues_after_trap(test_name),
+            self_loop_continue=self._self_loop_continues(test_name),
+            dromajo_cosim=self._dromajo_cosim_enabled(test_name),
+            rtl_trace=self._rtl_trace_enabled(test_name),
+            coverage_mode=self.coverage_mode,
+            waveform=self.args.trace,
+            dense_mem=self.dense_mem,
+            profile=self.sim_profile,
+            savable=self._checkpoint_eligible(test_name),
+        )
+
+    def _simulator_for(
+        self, config: SimulatorConfig, timings: dict[str, float] | None = None
+    ) -> SimulatorBuild:
+        """Return the simulator for `config`, building it on first use.
+
+        Builds live in the persistent cache under build/sim_cache/, keyed by a
+        digest of every build input, so a configuration is only verilated and
+        compiled again when the RTL, testbench, toolchain, or flags change.
+        Concurrent tests that need the same configuration wait on the build's
+        lock."""
+        key = self._simulator_cache_key(config)
+        with self._simulators_lock:
+            build = self._simulators.get(config)
+            if build is None:
+                build = SimulatorBuild(
+                    obj_dir=SIM_CACHE_DIR / key, lock=threading.Lock()
+                )
+                self._simulators[config] = build
+        with build.lock:
+            if build.built:
+                return build
+            marker = build.obj_dir / SIM_CACHE_MARKER
+            # -w wants to see the Verilator diagnostics, so it always rebuilds.
+            if (
+                not self.show_warnings
+                and marker.exists()
+                and build.sim_binary.exists()
+            ):
+                # The marker's mtime is the entry's LRU timestamp.
+                os.utime(marker)
+                with self._simulators_lock:
+                    self._sim_cache_hits += 1
+            else:
+                with self._simulators_lock:
+                    self._sim_cache_misses += 1
+                self._build_cached_simulator(config, build.obj_dir, timings)
+            build.built = True
+        return build
+
+    def _build_cached_simulator(
         self,
-        test_name: str,
-        entry: TestEntry,
-        paths: TestPaths,
-        block_width: int,
-        set_count: int,
+        config: SimulatorConfig,
+        obj_dir: Path,
+        timings: dict[str, float] | None = None,
     ) -> None:
-        dromajo_cosim_enabled = self._dromajo_cosim_enabled(test_name)
-        rtl_trace_enabled = self._rtl_trace_enabled(test_name)
-        c_defines = (
-            ["-DMAVERIC_CONTINUE_AFTER_TRAP"]
-            if self._continues_after_trap(test_name)
-            else []
+        # Build into a private directory and move it into place once it is
+        # complete, so an interrupted build or a concurrent driver can never
+        # leave a half-built entry behind under the final name.
+        staging_dir = obj_dir.with_name(
+            f"{obj_dir.name}.tmp-{os.getpid()}-{threading.get_ident()}"
         )
+        disk = self._expected_build_size()
+        if not self._resource_gate.admit(
+            f"the {config.name} simulator build", 0, disk, self.cancel_event
+        ):
+            raise RunTestsError(f"Simulator build for {config.name} was cancelled.")
+        try:
+            self._build_simulator(config, staging_dir, timings)
+            size = self._directory_size(staging_dir)
+            (staging_dir / SIM_CACHE_MARKER).write_text(f"{size}\n")
+            self._remove_path(obj_dir)
+            try:
+                staging_dir.rename(obj_dir)
+            except OSError:
+                # Another driver published the same entry first; it was built
+                # from identical inputs, so use that one.
+                if not (obj_dir / SIM_CACHE_MARKER).exists():
+                    raise
+        finally:
+            self._resource_gate.release(0, disk)
+            self._remove_path(staging_dir)
 
-        self._remove_path(paths.obj_dir)
-        # Verilator creates only the final component of --Mdir itself.
-        paths.obj_dir.parent.mkdir(parents=True, exist_ok=True)
+    @staticmethod
+    def _expected_build_size() -> int:
+        # Average size of the builds in the cache.
+        sizes = []
+        for marker in SIM_CACHE_DIR.glob(f"*/{SIM_CACHE_MARKER}"):
+            try:
+                sizes.append(int(marker.read_text().strip() or 0))
+            except (OSError, ValueError):
+                continue
+        return sum(sizes) // len(sizes) if sizes else DEFAULT_BUILD_DISK_BYTES
+
+    def _simulator_cache_key(self, config: SimulatorConfig) -> str:
+        digest = hashlib.sha256()
+        digest.update(self._build_input_digest().encode())
+        for argument in self._verilator_arguments(config):
+            digest.update(argument.encode() + b"\0")
+        for argument in self._make_arguments(config):
+            digest.update(argument.encode() + b"\0")
+        return f"{config.name}-{digest.hexdigest()[:16]}"
+
+    def _build_input_digest(self) -> str:
+        """Digest of the RTL and testbench sources and the Verilator version.
+
+        Computed once per driver run; the inputs do not change mid-run."""
+        with self._build_inputs_lock:
+            if self._build_inputs is None:
+                self._build_inputs = self._compute_build_input_digest()
+            return self._build_inputs
+
+    def _compute_build_input_digest(self) -> str:
+        digest = hashlib.sha256()
+        sources = sorted(
+            [*(ROOT / "rtl").glob("*.sv"), *(ROOT / "test/tb").iterdir()]
+        )
+        for path in sources:
+            if not path.is_file():
+                continue
+            digest.update(format_repo_path(path).encode() + b"\0")
+            digest.update(path.read_bytes())
+        if DROMAJO_LIB.exists():
+            stat = DROMAJO_LIB.stat()
+            digest.update(f"{DROMAJO_LIB}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        version = self.command_runner.run(
+            ["verilator", "--version"], description="Query Verilator version"
+        )
+        digest.update(version.stdout.encode())
+        return digest.hexdigest()
+
+    def _evict_simulator_cache(self) -> None:
+        """Trim build/sim_cache/ to SIM_CACHE_MAX_BYTES, least recently used
+        first. Entries used by the current suite are only evicted once it is
+        done."""
+        if not SIM_CACHE_DIR.is_dir():
+            return
+        entries: list[tuple[float, int, Path]] = []
+        for path in SIM_CACHE_DIR.iterdir():
+            if ".tmp-" in path.name:
+                # Staging directory of a driver that died mid-build.
+                pid = path.name.split(".tmp-", 1)[1].split("-", 1)[0]
+                if not self._process_alive(int(pid)):
+                    self._remove_path(path)
+                continue
+            marker = path / SIM_CACHE_MARKER
+            try:
+                last_used = marker.stat().st_mtime
+                size = int(marker.read_text().strip() or 0)
+            except (OSError, ValueError):
+                # Incomplete entry (e.g. from before the marker existed).
+                self._remove_path(path)
+                continue
+            entries.append((last_used, size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= SIM_CACHE_MAX_BYTES:
+                break
+            self._remove_path(path)
+            total -= size
 
-        verilator_command = [
-            "verilator",
+    def _evict_checkpoints(self) -> None:
+        """Trim build/checkpoints/ to CHECKPOINT_MAX_BYTES, least recently
+        used first."""
+        if not CHECKPOINT_DIR.is_dir():
+            return
+        entries: list[tuple[float, int, Path]] = []
+        for path in CHECKPOINT_DIR.iterdir():
+            if ".tmp-" in path.name:
+                # Staging directory of a simulator that died mid-save.
+                pid = path.name.split(".tmp-", 1)[1].split("-", 1)[0]
+                if not self._process_alive(int(pid)):
+                    self._remove_path(path)
+                continue
+            try:
+                last_used = (path / "state").stat().st_mtime
+            except OSError:
+                self._remove_path(path)
+                continue
+            entries.append((last_used, self._directory_size(path), path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= CHECKPOINT_MAX_BYTES:
+                break
+            self._remove_path(path)
+            total -= size
+
+    @staticmethod
+    def _process_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    def _directory_size(path: Path) -> int:
+        return sum(
+            entry.stat().st_size for entry in path.rglob("*") if entry.is_file()
+        )
+
+    def _verilator_arguments(self, config: SimulatorConfig) -> list[str]:
+        """Every Verilator argument except --Mdir, which depends on the cache
+        entry the build lands in."""
+        dromajo_cosim_enabled = config.dromajo_cosim
+        rtl_trace_enabled = config.rtl_trace
+        c_defines = (
+            ["-DMAVERIC_CONTINUE_AFTER_TRAP"] if config.continue_after_trap else []
+        )
+        if config.savable:
+            c_defines.append("-DMAVERIC_CHECKPOINT")
+
+        verilator_arguments = [
             "--assert",
             "-I./rtl",
             "--Wall",
             "-Wno-fatal",
-            "--Mdir",
-            format_repo_path(paths.obj_dir),
             "--cc",
             format_repo_path(ROOT / "rtl/test_env.sv"),
-            # Per-test configuration is passed to the build instead of editing
-            # the RTL sources in place, so concurrent builds cannot conflict.
-            f"-GBLOCK_WIDTH={block_width}",
-            f"+define+MAVERIC_DCACHE_SET_COUNT={set_count}",
-            f'+define+PATH_TO_MEM="{(ROOT / entry.instr_path).as_posix()}"',
+            # Cache configuration is passed to the build instead of editing the
+            # RTL sources in place, so concurrent builds cannot conflict. The
+            # test program itself is chosen at run time (mem_image.c).
+            f"-GBLOCK_WIDTH={config.block_width}",
+            f"+define+MAVERIC_DCACHE_SET_COUNT={config.set_count}",
         ]
-        if self.coverage_mode == "all":
-            verilator_command.append("--coverage")
-        elif self.coverage_mode == "line":
-            verilator_command.append("--coverage-line")
-        elif self.coverage_mode == "toggle":
-            verilator_command.append("--coverage-toggle")
-        if self.args.trace:
-            verilator_command.extend(["--trace-fst", "--trace-structs"])
-        if self._continues_after_trap(test_name):
-            verilator_command.append("-DMAVERIC_CONTINUE_AFTER_TRAP")
-        if self._self_loop_continues(test_name):
-            verilator_command.append("-DMAVERIC_SELF_LOOP_CONTINUE")
+        if config.coverage_mode == "all":
+            verilator_arguments.append("--coverage")
+        elif config.coverage_mode == "line":
+            verilator_arguments.append("--coverage-line")
+        elif config.coverage_mode == "toggle":
+            verilator_arguments.append("--coverage-toggle")
+        if config.waveform:
+            verilator_arguments.extend(["--trace-fst", "--trace-structs"])
+        if config.continue_after_trap:
+            verilator_arguments.append("-DMAVERIC_CONTINUE_AFTER_TRAP")
+        if config.self_loop_continue:
+            verilator_arguments.append("-DMAVERIC_SELF_LOOP_CONTINUE")
+        if config.dense_mem:
+            verilator_arguments.append("-DMAVERIC_DENSE_MEM")
         if dromajo_cosim_enabled:
-            verilator_command.append("-DDROMAJO_COSIM")
+            verilator_arguments.append("-DDROMAJO_COSIM")
+        if config.profile != "debug":
+            verilator_arguments.extend(FAST_PROFILE_VERILATOR_ARGUMENTS)
+        threads = sim_profile_threads(config.profile)
+        if threads > 1:
+            verilator_arguments.extend(["--threads", str(threads)])
+        if config.savable:
+            verilator_arguments.append("--savable")
         if not rtl_trace_enabled:
-            verilator_command.append("-DNO_TRACECOMP")
+            verilator_arguments.append("-DNO_TRACECOMP")
 
         verilator_sources = [
             format_repo_path(ROOT / "test/tb/tb_test_env.cpp"),
             format_repo_path(ROOT / "test/tb/check.c"),
             format_repo_path(ROOT / "test/tb/pmem_write.c"),
+            format_repo_path(ROOT / "test/tb/mem_image.c"),
+            format_repo_path(ROOT / "test/tb/mem_pages.c"),
+            format_repo_path(ROOT / "test/tb/report_perf.c"),
         ]
         if rtl_trace_enabled:
             verilator_sources.append(format_repo_path(ROOT / "test/tb/log_trace.c"))
@@ -1298,10 +3769,36 @@ class TestRunner:
         if dromajo_cosim_enabled:
             cflags.extend([f"-I{DROMAJO_INCLUDE}", "-DDROMAJO_COSIM"])
         if cflags:
-            verilator_command.extend(["-CFLAGS", " ".join(cflags)])
+            verilator_arguments.extend(["-CFLAGS", " ".join(cflags)])
 
-        verilator_command.extend(["--exe", *verilator_sources])
+        verilator_arguments.extend(["--exe", *verilator_sources])
+        return verilator_arguments
+
+    @staticmethod
+    def _make_arguments(config: SimulatorConfig) -> list[str]:
+        """make arguments that affect the build output (not -j)."""
+        arguments = ["-f", "Vtest_env.mk"]
+        if config.profile != "debug":
+            arguments.extend(FAST_PROFILE_MAKE_ARGUMENTS)
+        return arguments
 
+    def _build_simulator(
+        self,
+        config: SimulatorConfig,
+        obj_dir: Path,
+        timings: dict[str, float] | None = None,
+    ) -> None:
+        self._remove_path(obj_dir)
+        # Verilator creates only the final component of --Mdir itself.
+        obj_dir.parent.mkdir(parents=True, exist_ok=True)
+
+        verilator_command = [
+            "verilator",
+            "--Mdir",
+            format_repo_path(obj_dir),
+            *self._verilator_arguments(config),
+        ]
+        verilate_start = time.monotonic()
         verilator_result = self.command_runner.run(
             verilator_command,
             description="Run Verilator",
@@ -1312,36 +3809,103 @@ class TestRunner:
                 verilator_result.stdout + verilator_result.stderr
             )
             print(f"Verilator warnings: {warning_count}", file=sys.stderr)
+        make_start = time.monotonic()
+        # OBJCACHE only changes how objects are produced, not what they
+        # contain, so it stays out of _make_arguments() and the cache key.
+        objcache_arguments = (
+            [f"OBJCACHE={self._objcache}"] if self._objcache is not None else []
+        )
         self.command_runner.run(
             [
                 "make",
                 "-C",
-                format_repo_path(paths.obj_dir),
-                "-f",
-                "Vtest_env.mk",
+                format_repo_path(obj_dir),
+                *self._make_arguments(config),
+                *objcache_arguments,
                 f"-j{self._make_jobs()}",
             ],
             description="Build generated simulator",
+            env=self._objcache_env() if self._objcache is not None else None,
+        )
+        if timings is not None:
+            timings["verilate"] = make_start - verilate_start
+            timings["make"] = time.monotonic() - make_start
+
+    @staticmethod
+    def _objcache_env() -> dict[str, str]:
+        # Every build compiles in its own staging directory under
+        # build/sim_cache/; make paths relative to the checkout and leave the
+        # working directory out of the hash so those builds share objects.
+        return {
+            "CCACHE_DIR": str(OBJCACHE_DIR),
+            "CCACHE_BASEDIR": str(ROOT),
+            "CCACHE_NOHASHDIR": "1",
+            "CCACHE_MAXSIZE": OBJCACHE_MAX_SIZE,
+        }
+
+    def _objcache_stats(self) -> tuple[int, int] | None:
+        """(hits, misses) counted by the object cache so far, or None when
+        there is no object cache or it cannot report them (ccache < 3.7)."""
+        if self._objcache is None:
+            return None
+        try:
+            result = self.command_runner.run(
+                [self._objcache, "--print-stats"],
+                description="Query object cache statistics",
+                env=self._objcache_env(),
+            )
+        except CommandError:
+            return None
+        counters: dict[str, int] = {}
+        for line in result.stdout.splitlines():
+            name, _, value = line.partition("\t")
+            if value.strip().isdigit():
+                counters[name] = int(value)
+        hits = counters.get("direct_cache_hit", 0) + counters.get(
+            "preprocessed_cache_hit", 0
         )
+        return hits, counters.get("cache_miss", 0)
 
     def _make_jobs(self) -> int:
-        # Split the cores between concurrent test builds so `-j N` test-level
-        # parallelism does not oversubscribe the machine.
-        return max(1, (os.cpu_count() or 1) // max(1, self.jobs))
+        # Split the cores between concurrent builds so that they do not
+        # oversubscribe the machine.
+        return max(1, (os.cpu_count() or 1) // self._build_workers)
+
+    def _test_workers(self) -> int:
+        """Tests run at once: -j, capped so that the simulations' model
+        threads (--sim-profile mt:N) fit on the machine's cores."""
+        threads = sim_profile_threads(self.sim_profile)
+        if threads == 1:
+            return self.jobs
+        return max(1, min(self.jobs, (os.cpu_count() or 1) // threads))
 
     def _run_simulation(
         self,
         test_name: str,
         entry: TestEntry,
         paths: TestPaths,
+        sim_binary: Path,
         console: TestConsole,
+        *,
+        reference_trace: Path | None = None,
+        checkpoint_env: Mapping[str, str] | None = None,
+        sample_env: Mapping[str, str] | None = None,
     ) -> None:
         paths.run_dir.mkdir(parents=True, exist_ok=True)
         self._remove_path(paths.res_file)
         paths.pmem_write_file.parent.mkdir(parents=True, exist_ok=True)
         paths.pmem_write_file.write_bytes(b"")
 
-        simulation_env = {"MAVERIC_PMEM_WRITE_FILE": str(paths.pmem_write_file)}
+        simulation_env = {
+            # Empty unless --hex-image: the simulator then loads the ELF it is
+            # given on the command line (mem_image.c).
+            "MAVERIC_MEM_IMAGE_FILE": (
+                str(ROOT / entry.instr_path) if self.hex_image else ""
+            ),
+            "MAVERIC_PMEM_WRITE_FILE": str(paths.pmem_write_file),
+            **(checkpoint_env or {}),
+            **(sample_env or {}),
+        }
         progress_paths: list[Path] = []
         size_limits: list[tuple[Path, int]] = []
 
@@ -1349,8 +3913,11 @@ class TestRunner:
             paths.rtl_trace_file.parent.mkdir(parents=True, exist_ok=True)
             paths.rtl_trace_file.write_text("")
             simulation_env["MAVERIC_RTL_TRACE_FILE"] = str(paths.rtl_trace_file)
+            simulation_env["MAVERIC_RTL_TRACE_FORMAT"] = self.rtl_trace_format
             progress_paths.append(paths.rtl_trace_file)
             size_limits.append((paths.rtl_trace_file, TRACE_MAX_BYTES))
+            if reference_trace is not None:
+                simulation_env["MAVERIC_REFERENCE_TRACE_FILE"] = str(reference_trace)
         progress_paths.append(paths.pmem_write_file)
         size_limits.append((paths.pmem_write_file, TRACE_MAX_BYTES))
 
@@ -1383,7 +3950,7 @@ class TestRunner:
         )
         try:
             self.command_runner.run_streaming_to_file(
-                [str(paths.sim_binary), str(ROOT / entry.elf_path)],
+                [str(sim_binary), str(ROOT / entry.elf_path)],
                 description=f"Run RTL simulation for {test_name}",
                 output_path=paths.res_file,
                 timeout=simulation_timeout,
@@ -1392,7 +3959,7 @@ class TestRunner:
                 progress_paths=progress_paths,
                 size_limits=size_limits,
                 poll_callback=pmem_streamer.pump if pmem_streamer is not None else None,
-                cancel_event=self.cancel_event,
+                cancel_events=(self.cancel_event,),
             )
         finally:
             if pmem_streamer is not None:
@@ -1413,21 +3980,66 @@ class TestRunner:
             console.emit(f"{PmemWriteStreamer.INDENT}{line}")
 
     def _run_trace_reference(
-        self, test_name: str, entry: TestEntry, paths: TestPaths
-    ) -> None:
+        self,
+        test_name: str,
+        entry: TestEntry,
+        paths: TestPaths,
+        cancel_event: threading.Event,
+    ) -> float:
+        """Produce the Spike trace for `test_name`; returns the seconds it
+        took."""
+        start_time = time.monotonic()
         self._remove_path(paths.spike_trace_file)
         self._remove_path(paths.spike_original_file)
         paths.run_dir.mkdir(parents=True, exist_ok=True)
+        cache_file = self._spike_trace_cache_file(test_name, entry)
+        # One generation per cache entry at a time: the other sweep points of
+        # the same test wait for it and then link the cached trace.
+        with self._spike_reference_lock(cache_file):
+            if self._spike_cache_usable(cache_file):
+                paths.spike_trace_file.parent.mkdir(parents=True, exist_ok=True)
+                self._link_or_copy(cache_file, paths.spike_trace_file)
+                with self._spike_cache_lock:
+                    self._spike_cache_hits += 1
+                return time.monotonic() - start_time
+            with self._spike_cache_lock:
+                self._spike_cache_misses += 1
+
+            self._generate_spike_trace(test_name, entry, paths, cancel_event)
+            # Publish under a private name first so a concurrent reader never
+            # sees a partial entry.
+            SPIKE_TRACE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            staging_file = cache_file.with_name(
+                f"{cache_file.name}.tmp-{os.getpid()}-{threading.get_ident()}"
+            )
+            try:
+                self._link_or_copy(paths.spike_trace_file, staging_file)
+                os.replace(staging_file, cache_file)
+            finally:
+                self._remove_path(staging_file)
+            with self._spike_cache_lock:
+                self._spike_traces_generated.add(cache_file)
+        return time.monotonic() - start_time
+
+    def _generate_spike_trace(
+        self,
+        test_name: str,
+        entry: TestEntry,
+        paths: TestPaths,
+        cancel_event: threading.Event,
+    ) -> None:
         tracecomp_command = [
             sys.executable,
             format_repo_path(SCRIPT_TRACECOMP),
             test_name,
             str(ROOT / entry.elf_path),
             "--out-dir",
-            str(SPIKE_LOG_TRACE_DIR),
-            "--scratch-log",
-            str(paths.spike_scratch_log),
+            str(paths.spike_trace_file.parent),
         ]
+        # tracecomp normalizes Spike's output as it streams in; the raw log is
+        # only written when asked for.
+        if self.args.keep_spike_log:
+            tracecomp_command.extend(["--raw-log", str(paths.spike_original_file)])
         # Keep the Spike trace's stop point aligned with the RTL simulation: when
         # the run continues past ebreak/ecall (either from -C or the per-test
         # default), tracecomp must continue too.
@@ -1445,8 +4057,57 @@ class TestRunner:
             tracecomp_command,
             description=f"Generate Spike trace for {test_name}",
             timeout=outer_timeout,
+            cancel_events=(self.cancel_event, cancel_event),
+        )
+
+    def _spike_reference_lock(self, cache_file: Path) -> threading.Lock:
+        with self._spike_cache_lock:
+            return self._spike_reference_locks.setdefault(
+                cache_file, threading.Lock()
+            )
+
+    def _spike_cache_usable(self, cache_file: Path) -> bool:
+        # --keep-spike-log asks for Spike's raw output, which is not cached;
+        # --refresh-spike-cache regenerates each entry once per run.
+        with self._spike_cache_lock:
+            generated = cache_file in self._spike_traces_generated
+        return cache_file.exists() and (
+            generated
+            or (not self.refresh_spike_cache and not self.args.keep_spike_log)
         )
 
+    def _cached_spike_trace(self, test_name: str, entry: TestEntry) -> Path | None:
+        """The cached Spike trace for `test_name`, or None when it has to be
+        generated first (or is empty, i.e. there is nothing to compare)."""
+        cache_file = self._spike_trace_cache_file(test_name, entry)
+        if not self._spike_cache_usable(cache_file):
+            return None
+        if cache_file.stat().st_size == 0:
+            return None
+        return cache_file
+
+    def _spike_trace_cache_file(self, test_name: str, entry: TestEntry) -> Path:
+        digest = hashlib.sha256()
+        with (ROOT / entry.elf_path).open("rb") as elf_file:
+            for block in iter(lambda: elf_file.read(1024 * 1024), b""):
+                digest.update(block)
+        continue_after_trap = int(self._continues_after_trap(test_name))
+        digest.update(
+            f"\0{tracefmt.SPIKE_ISA}\0{continue_after_trap}"
+            f"\0{tracefmt.SPIKE_TRACE_VERSION}".encode()
+        )
+        return SPIKE_TRACE_CACHE_DIR / f"{test_name}-{digest.hexdigest()[:16]}.log"
+
+    @staticmethod
+    def _link_or_copy(source: Path, destination: Path) -> None:
+        # A hard link saves copying large traces. It is safe because neither
+        # side is ever written in place: tracecomp writes a new file and
+        # renames it over its output, and cache entries are only replaced.
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
     def _parse_simulation_output(
         self, test_name: str, paths: TestPaths, *, require_status: bool = True
     ) -> ParsedSimulationOutput:
@@ -1455,32 +4116,61 @@ class TestRunner:
                 f"Simulation output file {format_repo_path(paths.res_file)} was not created for {test_name}."
             )
 
-        match = STATUS_COLOR_RE.search(paths.res_file.read_text())
+        res_text = paths.res_file.read_text()
+        trace_mismatch = TRACE_MISMATCH_MARKER in res_text
+        speed = SIM_SPEED_RE.search(res_text)
+        cycles = int(speed.group(1)) if speed is not None else None
+        sim_seconds = float(speed.group(2)) if speed is not None else None
+        peak_memory_match = PEAK_MEMORY_RE.search(res_text)
+        peak_memory = (
+            int(peak_memory_match.group(1)) * 1024
+            if peak_memory_match is not None
+            else None
+        )
+        perf = parse_perf_record(res_text)
+        match = STATUS_COLOR_RE.search(res_text)
         if match is not None:
-            return ParsedSimulationOutput(status_text=match.group(1))
+            return ParsedSimulationOutput(
+                status_text=match.group(1),
+                trace_mismatch=trace_mismatch,
+                cycles=cycles,
+                sim_seconds=sim_seconds,
+                peak_memory=peak_memory,
+                perf=perf,
+            )
 
-        if self._skips_self_check(test_name) or not require_status:
-            return ParsedSimulationOutput(status_text=None)
+        return ParsedSimulationOutput(
+            status_text=None,
+            status_missing=not (
+                self._skips_self_check(test_name)
+                or not require_status
+                or trace_mismatch
+            ),
+            trace_mismatch=trace_mismatch,
+            cycles=cycles,
+            sim_seconds=sim_seconds,
+            peak_memory=peak_memory,
+            perf=perf,
+        )
 
-        return ParsedSimulationOutput(status_text=None, status_missing=True)
+    def _paths_for(self, test_name: str, variant: str | None = None) -> TestPaths:
+        def place(directory: Path) -> Path:
+            return directory / variant if variant is not None else directory
 
-    @staticmethod
-    def _paths_for(test_name: str) -> TestPaths:
-        obj_dir = BUILD_OBJ_DIR / test_name
-        run_dir = BUILD_RUN_DIR / test_name
+        run_dir = place(BUILD_RUN_DIR) / test_name
+        rtl_trace_suffix = "bin" if self.rtl_trace_format == "binary" else "log"
         return TestPaths(
-            obj_dir=obj_dir,
-            sim_binary=obj_dir / "Vtest_env",
             run_dir=run_dir,
             res_file=run_dir / "res.txt",
             trace_diff_file=run_dir / "tracediff.txt",
-            spike_scratch_log=run_dir / "spike-raw.log",
             coverage_file=run_dir / "coverage.dat",
-            rtl_trace_file=LOG_TRACE_DIR / f"{test_name}-log-trace.log",
-            spike_trace_file=SPIKE_LOG_TRACE_DIR / f"{test_name}-log-trace.log",
-            spike_original_file=SPIKE_LOG_TRACE_DIR / f"{test_name}-spike-original.log",
-            pmem_write_file=PMEM_WRITE_DIR / f"{test_name}-pmem-write.log",
-            waveform_file=WAVEFORM_DIR / f"{test_name}_waveform.fst",
+            rtl_trace_file=place(LOG_TRACE_DIR)
+            / f"{test_name}-log-trace.{rtl_trace_suffix}",
+            spike_trace_file=place(SPIKE_LOG_TRACE_DIR) / f"{test_name}-log-trace.log",
+            spike_original_file=place(SPIKE_LOG_TRACE_DIR)
+            / f"{test_name}-spike-original.log",
+            pmem_write_file=place(PMEM_WRITE_DIR) / f"{test_name}-pmem-write.log",
+            waveform_file=place(WAVEFORM_DIR) / f"{test_name}_waveform.fst",
         )
 
     def _compare_traces(self, test_name: str, paths: TestPaths) -> tuple[str, str]:
@@ -1496,34 +4186,92 @@ class TestRunner:
                 f"Spike trace file {format_repo_path(spike_trace_file)} was not produced for {test_name}."
             )
 
-        rtl_lines = rtl_trace_file.read_text().splitlines(keepends=True)
-        spike_lines = spike_trace_file.read_text().splitlines(keepends=True)
-
-        if not spike_lines:
+        if spike_trace_file.stat().st_size == 0:
             self._remove_path(paths.trace_diff_file)
             return "N/A", ""
 
-        diff_preview_lines = list(
-            islice(
-                difflib.unified_diff(
-                    rtl_lines,
-                    spike_lines,
-                    fromfile=format_repo_path(rtl_trace_file),
-                    tofile=format_repo_path(spike_trace_file),
-                    n=2,
-                ),
-                10,
+        # Streams both traces in lockstep, so memory stays flat however long
+        # the run was.
+        try:
+            divergence = tracediff.first_divergence(
+                rtl_trace_file,
+                spike_trace_file,
+                fromfile=format_repo_path(rtl_trace_file),
+                tofile=format_repo_path(spike_trace_file),
             )
-        )
+        except tracefmt.TraceFormatError as exc:
+            raise SimulationOutputError(str(exc)) from exc
 
-        if not diff_preview_lines:
+        if divergence is None:
             self._remove_path(paths.trace_diff_file)
             return "PASS", ""
 
-        preview = "".join(diff_preview_lines).strip()
         paths.trace_diff_file.parent.mkdir(parents=True, exist_ok=True)
-        paths.trace_diff_file.write_text(preview + "\n")
-        return "FAIL", preview
+        paths.trace_diff_file.write_text(divergence.preview + "\n")
+        summary = (
+            f"First divergence at record {divergence.record_index} "
+            f"(RTL trace: {divergence.rtl_records} records, "
+            f"Spike trace: {divergence.spike_records} records)."
+        )
+        return "FAIL", f"{divergence.preview}\n{summary}"
+
+    def _save_perf_records(self) -> None:
+        """Merge this suite's perf records into PERF_RECORDS_FILE, replacing
+        earlier records of the same test and cache configuration, and render
+        PERF_RESULT_FILE from the merged set: one table per configuration,
+        rows in catalog order. Records of runs that failed in this suite are
+        dropped, so they cannot stand in for the current RTL."""
+        if not self._perf_records and not self._perf_failed:
+            return
+        records: dict[tuple[str, int, int], PerfRecord] = {}
+        try:
+            lines = PERF_RECORDS_FILE.read_text().splitlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                record = PerfRecord.from_json(line)
+            except (ValueError, KeyError, TypeError):
+                continue
+            records[record.key] = record
+        for key in self._perf_failed:
+            records.pop(key, None)
+        records.update(self._perf_records)
+
+        catalog_order = {
+            name: index for index, name in enumerate(self.catalog.all_tests())
+        }
+        ordered = sorted(
+            records.values(),
+            key=lambda record: (
+                record.block_width,
+                record.set_count,
+                catalog_order.get(record.test_name, len(catalog_order)),
+                record.test_name,
+            ),
+        )
+        PERF_RECORDS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        staging_file = PERF_RECORDS_FILE.with_name(
+            f"{PERF_RECORDS_FILE.name}.tmp-{os.getpid()}"
+        )
+        staging_file.write_text(
+            "".join(f"{record.to_json()}\n" for record in ordered)
+        )
+        os.replace(staging_file, PERF_RECORDS_FILE)
+
+        table = []
+        point = None
+        for record in ordered:
+            if (record.block_width, record.set_count) != point:
+                point = (record.block_width, record.set_count)
+                table.append(
+                    format_cache_header(
+                        record.block_width, record.set_count, record.associativity
+                    )
+                )
+                table.append(PERF_TABLE_HEADER)
+            table.append(format_perf_row(record))
+        PERF_RESULT_FILE.write_text("".join(table))
 
     def _record_test_outcome(self, test_name: str, outcome: TestOutcome) -> None:
         with self._result_lock:
@@ -1533,12 +4281,10 @@ class TestRunner:
     def _append_cache_header(
         self, block_width: int, set_count: int, associativity: int
     ) -> None:
-        message = (
-            f"\n\nCACHE_LINE_WIDTH: {block_width} bits, "
-            f"SET_COUNT: {set_count}, ASSOCIATIVITY: {associativity}-way\n"
-        )
         with RESULT_FILE.open("a") as result_file:
-            result_file.write(message)
+            result_file.write(
+                format_cache_header(block_width, set_count, associativity)
+            )
 
     def _stash_coverage_file(
         self,
@@ -1559,6 +4305,8 @@ class TestRunner:
         )
         destination.parent.mkdir(parents=True, exist_ok=True)
         paths.coverage_file.replace(destination)
+        if self._coverage_merger is not None:
+            self._coverage_merger.add(destination)
 
     def _finalize_coverage(self) -> None:
         coverage_inputs = sorted(COV_DIR.glob("*.dat"))
@@ -1568,11 +4316,10 @@ class TestRunner:
             )
 
         COVERAGE_OUT_DIR.mkdir(parents=True, exist_ok=True)
-        self.command_runner.run(
-            ["verilator_coverage", "--write", format_repo_path(MERGED_COVERAGE_FILE)]
-            + [format_repo_path(path) for path in coverage_inputs],
-            description="Merge coverage files",
-        )
+        # Most of the merging happened while the tests ran.
+        assert self._coverage_merger is not None
+        self._coverage_merger.finish(MERGED_COVERAGE_FILE)
+        COVERAGE_PARTIAL_FILE.unlink(missing_ok=True)
 
         result = self.command_runner.run(
             [
@@ -1584,8 +4331,38 @@ class TestRunner:
             description="Annotate coverage results",
         )
         COVERAGE_RESULTS_FILE.write_text(result.stdout + result.stderr)
+        if self.args.compile_all:
+            self._select_smoke_cov(coverage_inputs)
         self._remove_path(COV_DIR)
 
+    def _select_smoke_cov(self, coverage_inputs: Sequence[Path]) -> None:
+        """Pick -g smoke-cov again from a whole-suite coverage run."""
+        seconds = {}
+        for test_name in self.catalog.all_tests():
+            expected = self._timing_db.expected_seconds(test_name)
+            if expected is not None:
+                seconds[test_name] = expected
+        try:
+            coverage = covselect.load_test_coverage(coverage_inputs, seconds)
+        except covselect.CoverageFormatError as exc:
+            raise SimulationOutputError(str(exc)) from exc
+        selection = covselect.select_tests(
+            coverage, target=SMOKE_COV_TARGET, weighted=SMOKE_COV_WEIGHTED
+        )
+        SMOKE_COV_FILE.parent.mkdir(parents=True, exist_ok=True)
+        SMOKE_COV_FILE.write_text(
+            covselect.selection_to_json(
+                selection,
+                coverage_mode=self.coverage_mode,
+                target=SMOKE_COV_TARGET,
+                weighted=SMOKE_COV_WEIGHTED,
+            )
+        )
+        print(
+            f"{SMOKE_COV_GROUP}: {covselect.describe_selection(selection)}; "
+            f"saved to {format_repo_path(SMOKE_COV_FILE)}"
+        )
+
     @staticmethod
     def _remove_path(path: Path) -> None:
         if path.is_dir():
@@ -1593,12 +4370,6 @@ class TestRunner:
         else:
             path.unlink(missing_ok=True)
 
-    def _clean_test_artifacts(self, paths: TestPaths) -> None:
-        # The per-test Verilator build is ~150 MB; drop it as soon as the test
-        # is done. Run outputs (res.txt, traces, diffs) stay for inspection and
-        # are removed by -c.
-        self._remove_path(paths.obj_dir)
-
     @staticmethod
     def _is_snippy(test_name: str) -> bool:
         return test_name.startswith("snippy-")
@@ -1644,13 +4415,31 @@ class TestRunner:
         return self.cosim_only or (self.batch_mode and test_name in COSIM_ONLY_TESTS)
 
     def _rtl_trace_enabled(self, test_name: str) -> bool:
-        if self._cosim_only(test_name) or self.no_tracecomp:
+        # A sampled run retires only its windows, so there is no trace to
+        # compare against Spike's.
+        if self._cosim_only(test_name) or self.no_tracecomp or self.sample:
             return False
         return not (self.batch_mode and test_name in NO_TRACECOMP_TESTS)
 
     def _spike_compare_enabled(self, test_name: str) -> bool:
         return self._rtl_trace_enabled(test_name) and not self.no_spiketrace
 
+    def _checkpoint_eligible(self, test_name: str) -> bool:
+        """Whether `test_name` may boot from a shared checkpoint. A restored
+        run has no RTL trace, waveform, or coverage of the boot, and the
+        checkpoint holds the sparse page store, so those modes boot."""
+        return (
+            self.checkpoints
+            and self.catalog.require_test(test_name).group in CHECKPOINT_GROUPS
+            and not self._rtl_trace_enabled(test_name)
+            and self.coverage_mode is None
+            and not self.args.trace
+            and not self.dense_mem
+            and not self.hex_image
+            and not self.sample
+            and sim_profile_threads(self.sim_profile) == 1
+        )
+
     def _effective_flag_notes(self, test_name: str) -> list[str]:
         # Effective per-test state of the important modifier flags, whether set
         # on the CLI or coming from a per-test (batch) default.
@@ -1663,6 +4452,8 @@ class TestRunner:
             flags.append("--no-spiketrace")
         if self._continues_after_trap(test_name):
             flags.append("-C")
+        if self.sample:
+            flags.append("--sample")
         return flags
 
     @staticmethod
@@ -1737,6 +4528,12 @@ def build_argument_parser() -> argparse.ArgumentParser:
         action="store_true",
         help=HELP_MSG_VARYING_DESCRIPTION,
     )
+    parser.add_argument(
+        "--sweep-strategy",
+        default="grid",
+        metavar="STRATEGY",
+        help=HELP_MSG_SWEEP_STRATEGY_DESCRIPTION,
+    )
     parser.add_argument(
         "-t", "--trace", action="store_true", help=HELP_MSG_TRACE_DESCRIPTION
     )
@@ -1780,6 +4577,47 @@ def build_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "-w", "--warnings", action="store_true", help=HELP_MSG_WARNINGS_DESCRIPTION
     )
+    parser.add_argument(
+        "--hex-image", action="store_true", help=HELP_MSG_HEX_IMAGE_DESCRIPTION
+    )
+    parser.add_argument(
+        "--dense-mem", action="store_true", help=HELP_MSG_DENSE_MEM_DESCRIPTION
+    )
+    parser.add_argument(
+        "--text-trace", action="store_true", help=HELP_MSG_TEXT_TRACE_DESCRIPTION
+    )
+    parser.add_argument(
+        "--sim-profile",
+        default="debug",
+        metavar="PROFILE",
+        help=HELP_MSG_SIM_PROFILE_DESCRIPTION,
+    )
+    parser.add_argument(
+        "--no-lockstep", action="store_true", help=HELP_MSG_NO_LOCKSTEP_DESCRIPTION
+    )
+    parser.add_argument(
+        "--sample", action="store_true", help=HELP_MSG_SAMPLE_DESCRIPTION
+    )
+    parser.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help=HELP_MSG_NO_CHECKPOINT_DESCRIPTION,
+    )
+    parser.add_argument(
+        "--changed-only",
+        action="store_true",
+        help=HELP_MSG_CHANGED_ONLY_DESCRIPTION,
+    )
+    parser.add_argument(
+        "--refresh-spike-cache",
+        action="store_true",
+        help=HELP_MSG_REFRESH_SPIKE_CACHE_DESCRIPTION,
+    )
+    parser.add_argument(
+        "--keep-spike-log",
+        action="store_true",
+        help=HELP_MSG_KEEP_SPIKE_LOG_DESCRIPTION,
+    )
 
     coverage_group = parser.add_mutually_exclusive_group()
     coverage_group.add_argument(
@@ -1825,6 +4663,17 @@ def validate_arguments(args: argparse.Namespace) -> None:
 
     if args.compile_varying_cache and not is_test_run:
         raise ConfigurationError("--compile-varying-cache (-v) requires a test run.")
+    if args.sweep_strategy not in SWEEP_STRATEGIES:
+        raise ConfigurationError(
+            f"--sweep-strategy must be {' or '.join(SWEEP_STRATEGIES)} "
+            f"(got {args.sweep_strategy!r})."
+        )
+    if args.sweep_strategy != "grid" and not args.compile_varying_cache:
+        raise ConfigurationError(
+            "--sweep-strategy can only be used with --compile-varying-cache (-v)."
+        )
+    if args.sweep_strategy == "halving" and SWEEP_HALVING_ETA < 2:
+        raise ConfigurationError("MAVERIC_SWEEP_ETA must be at least 2.")
     if args.trace and not is_test_run:
         raise ConfigurationError(
             "--trace can only be used with a test-running command."
@@ -1859,6 +4708,73 @@ def validate_arguments(args: argparse.Namespace) -> None:
         raise ConfigurationError(
             "--continue-after-trap can only be used with a test-running command."
         )
+    if args.keep_spike_log and not is_test_run:
+        raise ConfigurationError(
+            "--keep-spike-log can only be used with a test-running command."
+        )
+    if SIM_PROFILE_RE.match(args.sim_profile) is None:
+        raise ConfigurationError(
+            f"--sim-profile must be debug, fast, or mt:N (got {args.sim_profile!r})."
+        )
+    if args.sim_profile != "debug" and not is_test_run:
+        raise ConfigurationError(
+            "--sim-profile can only be used with a test-running command."
+        )
+    if args.no_lockstep and not is_test_run:
+        raise ConfigurationError(
+            "--no-lockstep can only be used with a test-running command."
+        )
+    if args.refresh_spike_cache and not is_test_run:
+        raise ConfigurationError(
+            "--refresh-spike-cache can only be used with a test-running command."
+        )
+    if args.no_checkpoint and not is_test_run:
+        raise ConfigurationError(
+            "--no-checkpoint can only be used with a test-running command."
+        )
+    if args.changed_only and not is_test_run:
+        raise ConfigurationError(
+            "--changed-only can only be used with a test-running command."
+        )
+    if args.changed_only and (coverage_requested or args.trace):
+        raise ConfigurationError(
+            "--changed-only skips tests, but coverage and waveform runs need "
+            "every test to run; remove --changed-only."
+        )
+    if args.sample and not is_test_run:
+        raise ConfigurationError(
+            "--sample can only be used with a test-running command."
+        )
+    if args.sample and args.no_cosim:
+        raise ConfigurationError(
+            "--sample fast-forwards with Dromajo; remove --no-cosim."
+        )
+    if args.sample and (coverage_requested or args.trace):
+        raise ConfigurationError(
+            "--sample simulates only short windows, but coverage and waveform "
+            "runs need whole simulations; remove --sample."
+        )
+    if args.sample and args.dense_mem:
+        raise ConfigurationError(
+            "--sample hands memory over through the sparse page store; "
+            "remove --dense-mem."
+        )
+    if args.sample and args.changed_only:
+        raise ConfigurationError(
+            "--sample measures every selected test; remove --changed-only."
+        )
+    if args.text_trace and not is_test_run:
+        raise ConfigurationError(
+            "--text-trace can only be used with a test-running command."
+        )
+    if args.dense_mem and not is_test_run:
+        raise ConfigurationError(
+            "--dense-mem can only be used with a test-running command."
+        )
+    if args.hex_image and not is_test_run:
+        raise ConfigurationError(
+            "--hex-image can only be used with a test-running command."
+        )
     if args.cosim_only and args.no_cosim:
         raise ConfigurationError(
             "--cosim-only requires Dromajo co-simulation; remove --no-cosim."
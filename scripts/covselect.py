@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping, Sequence
+
+
+# Per-test coverage files as run_tests.py stashes them in build/cov/, one per
+# test and cache configuration:
+# coverage_<test>_<block width>_<set count>_<associativity>.dat
+COVERAGE_FILE_RE = re.compile(r"^coverage_(.+)_\d+_\d+_\d+\.dat$")
+# verilator_coverage data lines: C '<key>' <count>. The key is a list of
+# \x01<name>\x02<value> fields; "page" names the kind of point (v_line/...,
+# v_toggle/..., v_branch/...).
+POINT_LINE_RE = re.compile(r"^C '(.*)' (\d+)$")
+PAGE_FIELD = "\x01page\x02"
+TOGGLE_PAGE_PREFIX = "v_toggle"
+KINDS = ("line", "toggle")
+
+
+class CoverageFormatError(Exception):
+    """Raised when a coverage file is not in verilator_coverage format."""
+
+
+@dataclass(frozen=True)
+class TestCoverage:
+    """The points one test covered, over all its cache configurations."""
+
+    name: str
+    points: frozenset[str]
+    # Historical runtime, the cost of keeping the test in a weighted selection.
+    seconds: float = 1.0
+
+
+@dataclass(frozen=True)
+class SelectedTest:
+    name: str
+    # Points the test added to the tests picked before it, by kind.
+    gain: Mapping[str, int]
+    seconds: float
+
+
+@dataclass(frozen=True)
+class Selection:
+    """A subset of the tests that covers `target` of the points the whole
+    suite covers, in the order the greedy cover picked them."""
+
+    tests: tuple[SelectedTest, ...]
+    covered: Mapping[str, int]
+    total: Mapping[str, int]
+    # Points only one test covers, by test and kind; those tests are in every
+    # selection that keeps the full coverage.
+    unique: Mapping[str, Mapping[str, int]]
+    suite_tests: int
+    suite_seconds: float
+
+
+def point_kind(key: str) -> str:
+    """The kind of a point: toggle, or line for everything else verilator
+    counts as line coverage (lines, branches, expressions)."""
+    start = key.find(PAGE_FIELD)
+    if start >= 0 and key.startswith(TOGGLE_PAGE_PREFIX, start + len(PAGE_FIELD)):
+        return "toggle"
+    return "line"
+
+
+def covered_points(path: Path) -> set[str]:
+    """Keys of the points `path` counts as hit at least once."""
+    points = set()
+    with path.open("r", encoding="latin-1") as handle:
+        header = handle.readline()
+        if not header.startswith("# SystemC::Coverage"):
+            raise CoverageFormatError(f"{path}: not a verilator_coverage file")
+        for line in handle:
+            match = POINT_LINE_RE.match(line.rstrip("\n"))
+            if match is not None and int(match.group(2)) > 0:
+                points.add(match.group(1))
+    return points
+
+
+def load_test_coverage(
+    coverage_files: Iterable[Path], seconds: Mapping[str, float] | None = None
+) -> list[TestCoverage]:
+    """Per-test coverage from stashed coverage files; a test's cache
+    configurations are folded together. `seconds` gives each test's
+    historical runtime (tests without history cost the average)."""
+    points: dict[str, set[str]] = {}
+    for path in coverage_files:
+        match = COVERAGE_FILE_RE.match(path.name)
+        if match is None:
+            continue
+        points.setdefault(match.group(1), set()).update(covered_points(path))
+
+    known = [value for value in (seconds or {}).values() if value > 0]
+    default_seconds = sum(known) / len(known) if known else 1.0
+    return [
+        TestCoverage(
+            name,
+            frozenset(test_points),
+            (seconds or {}).get(name) or default_seconds,
+        )
+        for name, test_points in sorted(points.items())
+    ]
+
+
+def select_tests(
+    tests: Sequence[TestCoverage], *, target: float = 1.0, weighted: bool = False
+) -> Selection:
+    """Greedy set cover: repeatedly pick the test that adds the most
+    uncovered points (per second of runtime when `weighted`) until `target`
+    of the suite's points are covered. Ties go to the shorter test, then the
+    name, so the selection is stable."""
+    universe = frozenset().union(*(test.points for test in tests))
+    owners = Counter(point for test in tests for point in test.points)
+    unique = {}
+    for test in tests:
+        only_here = [point for point in test.points if owners[point] == 1]
+        if only_here:
+            unique[test.name] = _count_kinds(only_here)
+
+    needed = len(universe) * min(max(target, 0.0), 1.0)
+    covered: set[str] = set()
+    remaining = list(tests)
+    selected = []
+    while remaining and len(covered) < needed:
+        best = min(remaining, key=lambda test: _rank(test, covered, weighted))
+        new_points = best.points - covered
+        if not new_points:
+            break
+        covered |= new_points
+        remaining.remove(best)
+        selected.append(
+            SelectedTest(best.name, _count_kinds(new_points), best.seconds)
+        )
+
+    return Selection(
+        tests=tuple(selected),
+        covered=_count_kinds(covered),
+        total=_count_kinds(universe),
+        unique=unique,
+        suite_tests=len(tests),
+        suite_seconds=sum(test.seconds for test in tests),
+    )
+
+
+def selection_to_json(selection: Selection, **metadata: object) -> str:
+    return (
+        json.dumps(
+            {
+                **metadata,
+                "points": dict(selection.total),
+                "covered": dict(selection.covered),
+                "suite": {
+                    "tests": selection.suite_tests,
+                    "seconds": round(selection.suite_seconds, 1),
+                },
+                "tests": [
+                    {
+                        "name": test.name,
+                        "gain": dict(test.gain),
+                        "seconds": round(test.seconds, 1),
+                    }
+                    for test in selection.tests
+                ],
+                "unique": {
+                    name: dict(kinds) for name, kinds in selection.unique.items()
+                },
+            },
+            indent=1,
+        )
+        + "\n"
+    )
+
+
+def describe_selection(selection: Selection) -> str:
+    total = sum(selection.total.values())
+    covered = sum(selection.covered.values())
+    seconds = sum(test.seconds for test in selection.tests)
+    share = 100.0 * covered / total if total else 100.0
+    runtime = (
+        100.0 * seconds / selection.suite_seconds if selection.suite_seconds else 0.0
+    )
+    return (
+        f"{len(selection.tests)} of {selection.suite_tests} tests cover "
+        f"{share:.1f}% of the {total} points the suite covers "
+        f"({runtime:.0f}% of its runtime)"
+    )
+
+
+def _rank(
+    test: TestCoverage, covered: set[str], weighted: bool
+) -> tuple[float, float, str]:
+    gain = len(test.points - covered)
+    value = gain / test.seconds if weighted else gain
+    return (-value, test.seconds, test.name)
+
+
+def _count_kinds(points: Iterable[str]) -> dict[str, int]:
+    counts = dict.fromkeys(KINDS, 0)
+    for point in points:
+        counts[point_kind(point)] += 1
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Pick a small set of tests that keeps the coverage of the "
+        "per-test coverage files in a directory (greedy set cover)."
+    )
+    parser.add_argument(
+        "coverage_dir", type=Path, help="directory of per-test coverage files"
+    )
+    parser.add_argument(
+        "--target",
+        type=float,
+        default=1.0,
+        help="fraction of the suite's covered points to keep (default 1.0)",
+    )
+    parser.add_argument(
+        "--timing",
+        type=Path,
+        default=None,
+        metavar="file",
+        help="weight tests by the runtimes in this build/timing.json",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        metavar="file",
+        help="write the selection as JSON here",
+    )
+    args = parser.parse_args()
+
+    seconds: dict[str, float] = {}
+    if args.timing is not None:
+        tests = json.loads(args.timing.read_text()).get("tests", {})
+        seconds = {
+            name: phases["total"]
+            for name, phases in tests.items()
+            if isinstance(phases, dict) and "total" in phases
+        }
+    try:
+        coverage = load_test_coverage(
+            sorted(args.coverage_dir.glob("*.dat")), seconds
+        )
+    except CoverageFormatError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    selection = select_tests(
+        coverage, target=args.target, weighted=args.timing is not None
+    )
+    for test in selection.tests:
+        gain = ", ".join(f"{kind} +{count}" for kind, count in test.gain.items())
+        print(f"{test.name}: {gain}")
+    print(describe_selection(selection))
+    if args.output is not None:
+        args.output.write_text(
+            selection_to_json(
+                selection, target=args.target, weighted=args.timing is not None
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,448 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import math
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping, Sequence
+
+from scripts.test_catalog import GROUP_TESTS
+
+
+# Cache geometry of rtl/icache.sv and rtl/dcache.sv, for the storage cost
+# model. Both caches index 32-bit words of BLOCK_WIDTH-bit blocks on 64-bit
+# addresses; the I$ is direct-mapped with a fixed block count, the D$ is
+# 4-way with SET_COUNT sets, per-way valid and dirty bits, and a tree
+# pseudo-LRU per set.
+ADDR_WIDTH = 64
+ICACHE_BLOCK_COUNT = 16
+DCACHE_WAYS = 4
+ALL_GROUP = "all"
+# Columns of the CSV report. Test rows carry one test's figures; group rows
+# the geometric-mean CPI and pooled hit rates of the group's tests.
+CSV_COLUMNS = (
+    "kind",
+    "name",
+    "block_width",
+    "set_count",
+    "storage_bits",
+    "tests",
+    "cycles",
+    "instret",
+    "cpi",
+    "icache_hit_rate",
+    "dcache_hit_rate",
+    "pareto",
+)
+
+
+class RecordFormatError(Exception):
+    """Raised when a perf records file cannot be read."""
+
+
+@dataclass(frozen=True, order=True)
+class SweepPoint:
+    block_width: int
+    set_count: int
+
+    @property
+    def label(self) -> str:
+        return f"bw{self.block_width}-sc{self.set_count}"
+
+
+@dataclass(frozen=True)
+class TestResult:
+    """Counters of one test at one sweep point (results/perf_records.jsonl)."""
+
+    test_name: str
+    point: SweepPoint
+    cycles: int
+    instret: int
+    icache_hits: int
+    icache_misses: int
+    dcache_hits: int
+    dcache_misses: int
+
+    @property
+    def cpi(self) -> float | None:
+        return self.cycles / self.instret if self.instret > 0 else None
+
+
+@dataclass(frozen=True)
+class GroupResult:
+    """A workload group at one sweep point."""
+
+    group: str
+    point: SweepPoint
+    storage_bits: int
+    tests: int
+    cycles: int
+    instret: int
+    # Geometric mean over the group's tests, so no single long test dominates.
+    geomean_cpi: float
+    icache_hit_rate: float | None
+    dcache_hit_rate: float | None
+
+
+@dataclass(frozen=True)
+class SweepReport:
+    points: tuple[SweepPoint, ...]
+    results: Mapping[tuple[str, SweepPoint], TestResult]
+    # Tests measured at every point; only these enter the group figures, so
+    # every point is compared over the same workload.
+    complete_tests: tuple[str, ...]
+    incomplete_tests: tuple[str, ...]
+    # Per group, one result per point, best (lowest geomean CPI) first.
+    rankings: Mapping[str, tuple[GroupResult, ...]]
+    # Points no other point beats on both storage and CPI over all complete
+    # tests, smallest first.
+    frontier: tuple[GroupResult, ...]
+
+
+def cache_storage_bits(point: SweepPoint) -> int:
+    """Bits of state the I$ and D$ hold at a sweep point: data, tags, and
+    the valid, dirty, and pseudo-LRU bits."""
+    offset_bits = _log2(point.block_width // 8)
+    icache_tag_bits = ADDR_WIDTH - _log2(ICACHE_BLOCK_COUNT) - offset_bits
+    dcache_tag_bits = ADDR_WIDTH - _log2(point.set_count) - offset_bits
+    icache_bits = ICACHE_BLOCK_COUNT * (point.block_width + icache_tag_bits + 1)
+    dcache_bits = point.set_count * (
+        DCACHE_WAYS * (point.block_width + dcache_tag_bits + 2) + DCACHE_WAYS - 1
+    )
+    return icache_bits + dcache_bits
+
+
+def load_results(
+    path: Path, tests: Iterable[str] | None = None
+) -> dict[tuple[str, SweepPoint], TestResult]:
+    """Perf records of `tests` (every test when None), keyed by test and
+    sweep point. Lines that are not records are skipped."""
+    wanted = set(tests) if tests is not None else None
+    results = {}
+    try:
+        lines = path.read_text().splitlines()
+    except OSError as exc:
+        raise RecordFormatError(f"{path}: {exc.strerror or exc}") from exc
+    for line in lines:
+        try:
+            data = json.loads(line)
+            result = TestResult(
+                test_name=str(data["test"]),
+                point=SweepPoint(int(data["block_width"]), int(data["set_count"])),
+                cycles=int(data["cycles"]),
+                instret=int(data["instret"]),
+                icache_hits=int(data["icache_hits"]),
+                icache_misses=int(data["icache_misses"]),
+                dcache_hits=int(data["dcache_hits"]),
+                dcache_misses=int(data["dcache_misses"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            continue
+        if wanted is None or result.test_name in wanted:
+            results[(result.test_name, result.point)] = result
+    return results
+
+
+def build_report(
+    results: Mapping[tuple[str, SweepPoint], TestResult],
+    groups: Mapping[str, Sequence[str]],
+    points: Sequence[SweepPoint] | None = None,
+) -> SweepReport:
+    """Rank the sweep points for each group (plus ALL_GROUP, every complete
+    test) and find the storage/CPI Pareto frontier. `points` defaults to
+    every point in `results`."""
+    if points is None:
+        points = sorted({point for _, point in results})
+    points = tuple(points)
+    measured = sorted({test for test, _ in results})
+    complete = [
+        test
+        for test in measured
+        if all(
+            (test, point) in results and results[(test, point)].cpi is not None
+            for point in points
+        )
+    ]
+    incomplete = [test for test in measured if test not in complete]
+
+    complete_set = set(complete)
+    group_members = {
+        name: [test for test in members if test in complete_set]
+        for name, members in groups.items()
+    }
+    group_members[ALL_GROUP] = complete
+    rankings = {}
+    for name, members in group_members.items():
+        if not members or not points:
+            continue
+        rankings[name] = tuple(
+            sorted(
+                (_group_result(name, members, point, results) for point in points),
+                key=lambda result: (result.geomean_cpi, result.storage_bits),
+            )
+        )
+
+    frontier: list[GroupResult] = []
+    for result in sorted(
+        rankings.get(ALL_GROUP, ()),
+        key=lambda result: (result.storage_bits, result.geomean_cpi),
+    ):
+        if not frontier or result.geomean_cpi < frontier[-1].geomean_cpi:
+            frontier.append(result)
+
+    return SweepReport(
+        points=points,
+        results=results,
+        complete_tests=tuple(complete),
+        incomplete_tests=tuple(incomplete),
+        rankings=rankings,
+        frontier=tuple(frontier),
+    )
+
+
+def halving_schedule(
+    point_count: int, test_count: int, eta: int
+) -> list[tuple[int, int]]:
+    """Rungs of a successive-halving search as (points, tests) pairs. Each
+    rung keeps 1/eta of the points before it and gives them eta times the
+    tests, ending on the full suite once at most eta points are left."""
+    counts = [point_count]
+    while counts[-1] > eta:
+        counts.append(-(-counts[-1] // eta))
+    last = len(counts) - 1
+    return [
+        (points, max(1, math.ceil(test_count / eta ** (last - rung))))
+        for rung, points in enumerate(counts)
+    ]
+
+
+def group_result_to_json(result: GroupResult) -> dict[str, object]:
+    return {
+        "point": result.point.label,
+        "block_width": result.point.block_width,
+        "set_count": result.point.set_count,
+        "storage_bits": result.storage_bits,
+        "tests": result.tests,
+        "cycles": result.cycles,
+        "instret": result.instret,
+        "geomean_cpi": round(result.geomean_cpi, 6),
+        "icache_hit_rate": _json_rate(result.icache_hit_rate),
+        "dcache_hit_rate": _json_rate(result.dcache_hit_rate),
+    }
+
+
+def report_csv(report: SweepReport) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    for (test, point), result in sorted(
+        report.results.items(), key=lambda item: (item[0][1], item[0][0])
+    ):
+        if point not in report.points:
+            continue
+        writer.writerow(
+            [
+                "test",
+                test,
+                point.block_width,
+                point.set_count,
+                cache_storage_bits(point),
+                1,
+                result.cycles,
+                result.instret,
+                _csv_number(result.cpi),
+                _csv_number(_rate(result.icache_hits, result.icache_misses)),
+                _csv_number(_rate(result.dcache_hits, result.dcache_misses)),
+                "",
+            ]
+        )
+    on_frontier = {result.point for result in report.frontier}
+    for name, ranking in report.rankings.items():
+        for result in sorted(ranking, key=lambda result: result.point):
+            writer.writerow(
+                [
+                    "group",
+                    name,
+                    result.point.block_width,
+                    result.point.set_count,
+                    result.storage_bits,
+                    result.tests,
+                    result.cycles,
+                    result.instret,
+                    _csv_number(result.geomean_cpi),
+                    _csv_number(result.icache_hit_rate),
+                    _csv_number(result.dcache_hit_rate),
+                    int(name == ALL_GROUP and result.point in on_frontier),
+                ]
+            )
+    return output.getvalue()
+
+
+def format_highlights(report: SweepReport) -> str:
+    """Best point per group and the Pareto frontier, a few lines long."""
+    lines = [
+        f"Cache sweep over {len(report.points)} points: "
+        f"{len(report.complete_tests)} tests measured at every point"
+        + (
+            f" ({len(report.incomplete_tests)} more at only some)"
+            if report.incomplete_tests
+            else ""
+        )
+    ]
+    for name, ranking in report.rankings.items():
+        best = ranking[0]
+        worst = ranking[-1]
+        lines.append(
+            f"  best for {name} ({best.tests} tests): {best.point.label}, "
+            f"geomean CPI {best.geomean_cpi:.4f} "
+            f"(worst {worst.point.label}: {worst.geomean_cpi:.4f})"
+        )
+    if report.frontier:
+        lines.append(
+            "  Pareto frontier (storage bits, geomean CPI): "
+            + ", ".join(
+                f"{result.point.label} {result.storage_bits} "
+                f"{result.geomean_cpi:.4f}"
+                for result in report.frontier
+            )
+        )
+    return "\n".join(lines)
+
+
+def format_report(report: SweepReport) -> str:
+    """The highlights, then every group's full ranking."""
+    sections = [format_highlights(report)]
+    if report.incomplete_tests:
+        sections.append(
+            "Left out of the group figures (not measured at every point): "
+            + ", ".join(report.incomplete_tests)
+        )
+    on_frontier = {result.point for result in report.frontier}
+    for name, ranking in report.rankings.items():
+        best_cpi = ranking[0].geomean_cpi
+        rows = [
+            f"{name} ({ranking[0].tests} tests)",
+            "Rank | Point        | Storage bits | Geomean CPI |    vs best |"
+            "   I$ Hit |   D$ Hit |       Cycles",
+            "-----+--------------+--------------+-------------+------------+"
+            "----------+----------+-------------",
+        ]
+        for rank, result in enumerate(ranking, start=1):
+            marker = " *" if name == ALL_GROUP and result.point in on_frontier else ""
+            rows.append(
+                f"{rank:>4} | {result.point.label:<12} | {result.storage_bits:>12} | "
+                f"{result.geomean_cpi:>11.4f} | "
+                f"{100 * (result.geomean_cpi / best_cpi - 1):>+9.2f}% | "
+                f"{_percent(result.icache_hit_rate)} | "
+                f"{_percent(result.dcache_hit_rate)} | "
+                f"{result.cycles:>12}{marker}"
+            )
+        sections.append("\n".join(rows))
+    if report.frontier:
+        sections.append("* on the Pareto frontier of storage against geomean CPI")
+    return "\n\n".join(sections) + "\n"
+
+
+def _group_result(
+    name: str,
+    members: Sequence[str],
+    point: SweepPoint,
+    results: Mapping[tuple[str, SweepPoint], TestResult],
+) -> GroupResult:
+    point_results = [results[(test, point)] for test in members]
+    # Members are complete tests, so every instret is positive.
+    log_cpi = sum(
+        math.log(result.cycles / result.instret) for result in point_results
+    )
+    return GroupResult(
+        group=name,
+        point=point,
+        storage_bits=cache_storage_bits(point),
+        tests=len(point_results),
+        cycles=sum(result.cycles for result in point_results),
+        instret=sum(result.instret for result in point_results),
+        geomean_cpi=math.exp(log_cpi / len(point_results)),
+        icache_hit_rate=_rate(
+            sum(result.icache_hits for result in point_results),
+            sum(result.icache_misses for result in point_results),
+        ),
+        dcache_hit_rate=_rate(
+            sum(result.dcache_hits for result in point_results),
+            sum(result.dcache_misses for result in point_results),
+        ),
+    )
+
+
+def _rate(hits: int, misses: int) -> float | None:
+    return hits / (hits + misses) if hits + misses > 0 else None
+
+
+def _percent(value: float | None) -> str:
+    text = f"{100 * value:.2f}%" if value is not None else "N/A"
+    return text.rjust(8)
+
+
+def _csv_number(value: float | None) -> str:
+    return f"{value:.6f}" if value is not None else ""
+
+
+def _json_rate(value: float | None) -> float | None:
+    return round(value, 6) if value is not None else None
+
+
+def _log2(value: int) -> int:
+    return value.bit_length() - 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare the cache configurations of a run_tests.py -v sweep "
+        "from its perf records: per-test and per-group CPI and hit rates, the "
+        "best configuration per group, and the storage/CPI Pareto frontier."
+    )
+    parser.add_argument(
+        "records",
+        type=Path,
+        nargs="?",
+        default=Path("results/perf_records.jsonl"),
+        help="perf records file (default results/perf_records.jsonl)",
+    )
+    parser.add_argument(
+        "--csv",
+        type=Path,
+        default=None,
+        metavar="file",
+        help="write the per-test and per-group figures here as CSV",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        metavar="file",
+        help="write the full ranked report here instead of stdout",
+    )
+    args = parser.parse_args()
+
+    try:
+        results = load_results(args.records)
+    except RecordFormatError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    report = build_report(results, GROUP_TESTS)
+    if args.csv is not None:
+        args.csv.write_text(report_csv(report))
+    if args.output is not None:
+        args.output.write_text(format_report(report))
+        print(format_highlights(report))
+    else:
+        print(format_report(report), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,10 +3,12 @@ import sys
 import subprocess
 import time
 import os
+import select
 import signal
 from pathlib import Path
 
 from test_catalog import trap_continuation_tests
+from tracefmt import CSR_NAMES, SPIKE_ISA
 
 CSR_OPCODE = 0x73
 SELF_LOOP_INSTRUCTION = "0x0000006f"
@@ -34,35 +36,11 @@ TRAP_INSTRUCTION_TOKENS = {
     f"({instruction})": instruction for instruction in TRAP_MNEMONICS
 }
 TRAP_CONTINUATION_TESTS = trap_continuation_tests()
-CSR_NAMES = {
-    # M-mode CSRs.
-    0x300: "mstatus",
-    0x301: "misa",
-    0x302: "medeleg",
-    0x303: "mideleg",
-    0x304: "mie",
-    0x305: "mtvec",
-    0x340: "mscratch",
-    0x341: "mepc",
-    0x342: "mcause",
-    0x343: "mtval",
-    0x344: "mip",
-    0xF11: "mvendorid",
-    0xF12: "marchid",
-    0xF13: "mimpid",
-    0xF14: "mhartid",
-    # S-mode CSRs.
-    0x100: "sstatus",
-    0x104: "sie",
-    0x105: "stvec",
-    0x140: "sscratch",
-    0x141: "sepc",
-    0x142: "scause",
-    0x143: "stval",
-    0x144: "sip",
-    0x14D: "stimecmp",
-    0xC01: "time",
-}
+STREAM_READ_BYTES = 1024 * 1024
+STREAM_POLL_SECONDS = 0.1
+# Longest stop token (see trace_stop_found) minus one: carried over between
+# reads so a token split across two reads is still seen.
+STOP_TOKEN_OVERLAP = len(SELF_LOOP_TOKEN) - 1
 
 
 def format_64_hex(value):
@@ -146,16 +124,17 @@ def format_trace_entry(log):
     return log_line + "\n"
 
 
-def parse_log_contents(log_contents, continue_after_trap=False):
-    content = []
+def select_commit_lines(lines, continue_after_trap=False):
+    """Yield the commit lines of the traced window from Spike's raw output,
+    dropping interactive-mode noise."""
     pass_next = 0
     not_pass = 0
-    for line in log_contents.splitlines():
+    for line in lines:
         # A retired self-loop (jal x0, 0) ends the run in every mode: the RTL
         # stops the simulation there (check_self_loop) and excludes the line
         # from its trace (log_trace.c), so end the Spike trace just before it.
         if SELF_LOOP_TOKEN in line:
-            break
+            return
         # Start capturing at the reset vector. The mi/si-mode riscv-tests ELFs
         # lack the "$x<arch>" mapping symbol the base tests carry, so the reset
         # vector is the reliable, ELF-independent start of the program; the
@@ -172,14 +151,12 @@ def parse_log_contents(log_contents, continue_after_trap=False):
             trap = parse_trap_disasm(line)
             if trap is not None:
                 pc, instruction = trap
-                # Synthesize a commit-style line the parser below turns into a
+                # Synthesize a commit-style line parse_commit_lines turns into a
                 # trace entry; format_trace_entry adds the mnemonic.
-                content.append(
-                    f"core 0: - {pc} ({instruction}) {TRAP_MNEMONICS[instruction]}"
-                )
+                yield f"core 0: - {pc} ({instruction}) {TRAP_MNEMONICS[instruction]}"
                 if not continue_after_trap:
                     # The run stops at the trap: nothing after it is traced.
-                    break
+                    return
                 continue
         if not continue_after_trap and ("ecall" in line or "ebreak" in line):
             not_pass = 0
@@ -193,11 +170,14 @@ def parse_log_contents(log_contents, continue_after_trap=False):
                     pass_next = 1
                 continue
             else:
-                content.append(line)
+                yield line
         else:
             continue
-    log_data = []
-    for line in content:
+
+
+def parse_commit_lines(lines):
+    """Yield one normalized trace entry per Spike commit line."""
+    for line in lines:
         line_split = line.split()
         if len(line_split) < 5:
             continue
@@ -220,7 +200,7 @@ def parse_log_contents(log_contents, continue_after_trap=False):
         }
 
         if log["instruction"] == SELF_LOOP_INSTRUCTION:
-            break
+            return
 
         token_index = 5
         while token_index < len(line_split):
@@ -273,9 +253,7 @@ def parse_log_contents(log_contents, continue_after_trap=False):
         #     log["csr_addr"] = decoded_csr_addr
         #     log["csr_value"] = log["value"]
 
-        log_data.append(log)
-
-    return log_data
+        yield log
 
 
 def trace_stop_found(contents, continue_after_trap):
@@ -292,67 +270,109 @@ def trace_stop_found(contents, continue_after_trap):
     return "ecall" in contents or "ebreak" in contents
 
 
-# Read the log file and print its contents
-def parse_log(filename, scratch_log, continue_after_trap=False, timeout_seconds=None):
-    cmd = [
-        "spike",
-        "-d",
-        "--log-commits",
-        "--isa=rv64imafv_zicsr_zifencei_zihpm_sstc_zicntr",
-        filename,
-    ]
-
-    log_file = str(scratch_log)
-    Path(log_file).parent.mkdir(parents=True, exist_ok=True)
-    with open(log_file, "w") as log_output:
-        process = subprocess.Popen(cmd, stderr=log_output)
-
-    start_time = time.monotonic()
-    timed_out = False
-    try:
-        while True:
-            with open(log_file, "r") as f:
-                contents = f.read()
-                if trace_stop_found(contents, continue_after_trap):
-                    print("trace stop point found, stopping trace.")
-                    process.terminate()
+class SpikeStream:
+    """Spike's commit log, read from a pipe and yielded line by line.
+
+    The stop point is looked for only in newly read output (plus a short
+    overlap for tokens split across reads). Once it shows up, or the timeout
+    expires, Spike is terminated and whatever it had already written is
+    still yielded. With raw_log set, the raw output is also copied there."""
+
+    def __init__(
+        self, test_path, continue_after_trap=False, timeout_seconds=None, raw_log=None
+    ):
+        self.test_path = test_path
+        self.continue_after_trap = continue_after_trap
+        self.timeout_seconds = timeout_seconds
+        self.raw_log = raw_log
+        self.timed_out = False
+        self._process = None
+
+    def __iter__(self):
+        cmd = [
+            "spike",
+            "-d",
+            "--log-commits",
+            f"--isa={SPIKE_ISA}",
+            self.test_path,
+        ]
+        raw_output = None
+        if self.raw_log is not None:
+            Path(self.raw_log).parent.mkdir(parents=True, exist_ok=True)
+            raw_output = open(self.raw_log, "wb")
+        self._process = subprocess.Popen(cmd, stderr=subprocess.PIPE)
+        stream = self._process.stderr
+        start_time = time.monotonic()
+        stop_time = None
+        scan_tail = ""
+        pending = b""
+        try:
+            while True:
+                if (
+                    stop_time is None
+                    and self.timeout_seconds is not None
+                    and time.monotonic() - start_time > self.timeout_seconds
+                ):
+                    # Spike never reaching the stop point (e.g. the program
+                    # diverges or loops) must not run until the driver's
+                    # SIGKILL, which would discard the trace and leave spike
+                    # orphaned: stop it ourselves and keep what it logged.
+                    print(
+                        f"no trace stop point within {self.timeout_seconds} seconds, "
+                        "terminating spike and keeping the partial trace."
+                    )
+                    self.timed_out = True
+                    stop_time = self._stop()
+                if stop_time is not None and time.monotonic() - stop_time > 5:
+                    self._process.kill()
+
+                ready, _, _ = select.select([stream], [], [], STREAM_POLL_SECONDS)
+                if not ready:
+                    continue
+                chunk = os.read(stream.fileno(), STREAM_READ_BYTES)
+                if not chunk:
+                    # Spike can also end on its own -- e.g. an HTIF tohost
+                    # pass/fail write terminates the run without ever
+                    # executing an ecall/ebreak.
+                    if stop_time is None:
+                        print("spike exited on its own, stopping trace.")
                     break
-            # Spike can also end on its own -- e.g. an HTIF tohost pass/fail write
-            # terminates the run without ever executing an ecall/ebreak. Stop
-            # polling once it has exited so we parse what we have instead of
-            # spinning on a dead process until the external timeout.
-            if process.poll() is not None:
-                print("spike exited on its own, stopping trace.")
-                break
-            # Spike never reaching the stop point (e.g. the program diverges or
-            # loops) must not spin here until the driver's SIGKILL, which would
-            # discard the trace and leave spike orphaned: kill spike ourselves
-            # and keep whatever it logged so far.
-            if (
-                timeout_seconds is not None
-                and time.monotonic() - start_time > timeout_seconds
-            ):
-                print(
-                    f"no trace stop point within {timeout_seconds} seconds, "
-                    "terminating spike and keeping the partial trace."
-                )
-                timed_out = True
-                process.terminate()
-                break
-            time.sleep(0.01 if continue_after_trap else 0.1)
-    except KeyboardInterrupt:
-        print("KeyboardInterrupt received, stopping trace.")
-        process.terminate()
-
-    try:
-        process.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        process.kill()
-        process.wait()
-
-    with open(log_file, "r") as f:
-        log_contents = f.read()
-    return parse_log_contents(log_contents, continue_after_trap), timed_out
+                if raw_output is not None:
+                    raw_output.write(chunk)
+
+                if stop_time is None:
+                    window = scan_tail + chunk.decode("latin-1")
+                    if trace_stop_found(window, self.continue_after_trap):
+                        print("trace stop point found, stopping trace.")
+                        stop_time = self._stop()
+                    scan_tail = window[-STOP_TOKEN_OVERLAP:]
+
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace")
+            if pending:
+                yield pending.decode("utf-8", errors="replace")
+        finally:
+            self.close()
+            if raw_output is not None:
+                raw_output.close()
+
+    def close(self):
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.terminate()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process.stderr.close()
+
+    def _stop(self):
+        self._process.terminate()
+        return time.monotonic()
 
 
 def main(
@@ -361,44 +381,68 @@ def main(
     force_continue_after_trap=False,
     timeout_seconds=None,
     out_dir="spike_log_trace",
-    scratch_log="trace.log",
+    raw_log=None,
 ):
     trace_log_dir = Path(out_dir)
     trace_log_dir.mkdir(parents=True, exist_ok=True)
 
     trace_log_file = trace_log_dir / (test_name + "-log-trace.log")
-    original_log_file = trace_log_dir / (test_name + "-spike-original.log")
     print("Trace log file: " + str(trace_log_file))
-    print("Original Spike log file: " + str(original_log_file))
+    if raw_log is not None:
+        print("Original Spike log file: " + str(raw_log))
     # -C (forwarded by run_tests.py) or the per-test list both enable running the
     # Spike trace past the ebreak/ecall trap, matching the RTL simulation.
     continue_after_trap = (
         force_continue_after_trap or test_name in TRAP_CONTINUATION_TESTS
     )
-    trace_log, timed_out = parse_log(
-        test_path, scratch_log, continue_after_trap, timeout_seconds
+    # Spike output -> traced commit lines -> trace entries -> normalized log,
+    # one line at a time while Spike is still running.
+    stream = SpikeStream(test_path, continue_after_trap, timeout_seconds, raw_log)
+    spike_lines = iter(stream)
+    last_line = None
+    # Written under a private name and renamed over the old trace at the end:
+    # run_tests.py hard-links traces into build/spike_trace_cache/, so the
+    # file at trace_log_file may be a cache entry and must never be truncated.
+    staging_file = trace_log_file.with_name(
+        f"{trace_log_file.name}.tmp-{os.getpid()}"
     )
-    log_lines = []
-
-    for log in trace_log:
-        log_lines.append(format_trace_entry(log))
-
-    with open(trace_log_file, "w") as f_out:
-        f_out.writelines(log_lines)
-    os.replace(scratch_log, original_log_file)
-
-    if timed_out:
-        if log_lines:
-            print("last traced instruction: " + log_lines[-1].strip())
+    try:
+        with open(staging_file, "w") as f_out:
+            try:
+                for log in parse_commit_lines(
+                    select_commit_lines(spike_lines, continue_after_trap)
+                ):
+                    last_line = format_trace_entry(log)
+                    f_out.write(last_line)
+            except KeyboardInterrupt:
+                print("KeyboardInterrupt received, stopping trace.")
+            finally:
+                spike_lines.close()
+        os.replace(staging_file, trace_log_file)
+    finally:
+        if staging_file.exists():
+            staging_file.unlink()
+
+    if stream.timed_out:
+        if last_line is not None:
+            print("last traced instruction: " + last_line.strip())
+        kept = f"{trace_log_file} and {raw_log}" if raw_log is not None else trace_log_file
         print(
             f"Error: spike never reached the trace stop point; partial traces "
-            f"kept at {trace_log_file} and {original_log_file}"
+            f"kept at {kept}"
         )
         return 1
     return 0
 
 
+def exit_on_sigterm(signum, frame):
+    # run_tests.py terminates a reference run it no longer needs; unwind
+    # through SpikeStream.close() so spike is not left running.
+    sys.exit(1)
+
+
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
     parser = argparse.ArgumentParser(
         description="Generate a normalized Spike reference trace for a test."
     )
@@ -424,10 +468,10 @@ if __name__ == "__main__":
         help="directory for the normalized and raw Spike trace files",
     )
     parser.add_argument(
-        "--scratch-log",
-        default="trace.log",
+        "--raw-log",
+        default=None,
         metavar="file",
-        help="scratch file capturing Spike's stderr while it runs",
+        help="also keep Spike's raw commit log in this file",
     )
     cli_args = parser.parse_args()
 
@@ -438,6 +482,6 @@ if __name__ == "__main__":
             cli_args.continue_after_trap,
             cli_args.timeout,
             cli_args.out_dir,
-            cli_args.scratch_log,
+            cli_args.raw_log,
         )
     )
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import difflib
+import re
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
+from scripts import tracefmt
+
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+COUNT_BLOCK_BYTES = 1024 * 1024
+# Lines read past the first divergence on each side. The window has to be
+# wider than the preview so that a shifted (inserted/deleted) line realigns
+# inside it and the first hunk closes before the window edge.
+DIVERGENCE_WINDOW_LINES = 32
+
+
+@dataclass(frozen=True)
+class TraceDivergence:
+    """First mismatch between two commit traces."""
+
+    record_index: int
+    preview: str
+    rtl_records: int
+    spike_records: int
+
+
+def first_divergence(
+    rtl_trace: Path,
+    spike_trace: Path,
+    *,
+    fromfile: str,
+    tofile: str,
+    context: int = 2,
+    preview_lines: int = 10,
+) -> TraceDivergence | None:
+    """Compare two traces line by line in lockstep and return the first
+    divergence, or None when they are identical.
+
+    Memory use does not depend on trace length. Only a short window around
+    the divergence is held: the DIVERGENCE_WINDOW_LINES matching lines
+    before it, and as many lines after it. The preview is the first hunk of
+    a unified diff of that window, with line numbers rebased to the whole
+    files. Later hunks are left out, because a window cannot tell where
+    they end.
+
+    When the first hunk closes inside the window, the preview is the start
+    of the difflib diff of the full traces. The one exception is a run of
+    equal lines: difflib may mark a different line of the run as removed.
+    When the hunk runs past the window, the preview still shows its first
+    lines. Its header then counts lines only up to the window edge, or up
+    to the end of a trace that ended inside its window. The matching lines
+    before the divergence let difflib place a removed line early in a run
+    of equal lines, as it would over the full traces."""
+    rtl_lines = tracefmt.read_trace_lines(rtl_trace)
+    spike_lines = tracefmt.read_trace_lines(spike_trace)
+    recent: deque[str] = deque(maxlen=DIVERGENCE_WINDOW_LINES)
+    index = 0
+    while True:
+        rtl_line = next(rtl_lines, None)
+        spike_line = next(spike_lines, None)
+        if rtl_line is None and spike_line is None:
+            return None
+        if rtl_line != spike_line:
+            break
+        recent.append(rtl_line)
+        index += 1
+
+    rtl_tail = _window(rtl_line, rtl_lines)
+    spike_tail = _window(spike_line, spike_lines)
+    rtl_window = list(recent) + rtl_tail
+    spike_window = list(recent) + spike_tail
+    rtl_limit = None if len(rtl_tail) < DIVERGENCE_WINDOW_LINES else len(rtl_window)
+    spike_limit = (
+        None if len(spike_tail) < DIVERGENCE_WINDOW_LINES else len(spike_window)
+    )
+    diff_lines = islice(
+        _first_hunk(
+            difflib.unified_diff(
+                rtl_window,
+                spike_window,
+                fromfile=fromfile,
+                tofile=tofile,
+                n=context,
+            )
+        ),
+        preview_lines,
+    )
+    rtl_records = count_trace_records(rtl_trace)
+    spike_records = count_trace_records(spike_trace)
+    offset = index - len(recent)
+    preview = "".join(
+        _rebase_hunk(
+            line,
+            offset,
+            rtl_cut=(rtl_limit, rtl_records) if spike_limit is None else None,
+            spike_cut=(spike_limit, spike_records) if rtl_limit is None else None,
+        )
+        for line in diff_lines
+    ).strip()
+    return TraceDivergence(
+        record_index=index,
+        preview=preview,
+        rtl_records=rtl_records,
+        spike_records=spike_records,
+    )
+
+
+def count_trace_records(path: Path) -> int:
+    """Number of records (lines) in a trace, without decoding it."""
+    if tracefmt.is_binary_trace(path):
+        payload = path.stat().st_size - tracefmt.TRACE_HEADER.size
+        return max(0, payload) // tracefmt.TRACE_RECORD.size
+
+    count = 0
+    last_byte = b"\n"
+    with path.open("rb") as handle:
+        while True:
+            block = handle.read(COUNT_BLOCK_BYTES)
+            if not block:
+                break
+            count += block.count(b"\n")
+            last_byte = block[-1:]
+    return count if last_byte == b"\n" else count + 1
+
+
+def _window(first_line: str | None, lines: Iterator[str]) -> list[str]:
+    if first_line is None:
+        return []
+    return [first_line, *islice(lines, DIVERGENCE_WINDOW_LINES - 1)]
+
+
+def _first_hunk(diff_lines: Iterator[str]) -> Iterator[str]:
+    """The file header and first hunk of a unified diff."""
+    hunks = 0
+    for line in diff_lines:
+        if HUNK_HEADER_RE.match(line) is not None:
+            hunks += 1
+            if hunks > 1:
+                return
+        yield line
+
+
+def _reaches(start: str, length: str | None, limit: int | None) -> bool:
+    if limit is None:
+        return False
+    count = 1 if length is None else int(length[1:])
+    return int(start) + count - 1 >= limit
+
+
+def _rebase_hunk(
+    line: str,
+    offset: int,
+    *,
+    rtl_cut: tuple[int | None, int] | None,
+    spike_cut: tuple[int | None, int] | None,
+) -> str:
+    """Shift a window-relative hunk header to whole-file line numbers.
+
+    When one trace ended inside its window, a hunk that runs into the other
+    window's cut continues to that file's end, so its length comes from the
+    file's record count. A cut is (window limit, record count), or None when
+    the other side did not end inside its window."""
+    match = HUNK_HEADER_RE.match(line)
+    if match is None:
+        return line
+    from_start = int(match.group(1)) + offset
+    to_start = int(match.group(3)) + offset
+    from_length = match.group(2) or ""
+    to_length = match.group(4) or ""
+    if rtl_cut is not None and _reaches(match.group(1), match.group(2), rtl_cut[0]):
+        from_length = f",{rtl_cut[1] - from_start + 1}"
+    if spike_cut is not None and _reaches(match.group(3), match.group(4), spike_cut[0]):
+        to_length = f",{spike_cut[1] - to_start + 1}"
+    return f"@@ -{from_start}{from_length} +{to_start}{to_length} @@{line[match.end():]}"
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import argparse
+import struct
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple
+
+
+# Binary RTL commit trace written by test/tb/log_trace.c when
+# MAVERIC_RTL_TRACE_FORMAT=binary: a header (magic, format version, record
+# size) followed by one fixed-size little-endian record per retired
+# instruction. The layout must match struct trace_record in log_trace.c.
+TRACE_MAGIC = b"MVTRACE\0"
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct("<8sII")
+TRACE_RECORD = struct.Struct("<QQQQQIHBBB7x")
+READ_CHUNK_RECORDS = 4096
+
+# Spike reference traces written by tracecomp.py. run_tests.py caches them
+# keyed on the ISA and this version, so bump SPIKE_TRACE_VERSION whenever
+# tracecomp's normalization changes what it writes.
+SPIKE_ISA = "rv64imafv_zicsr_zifencei_zihpm_sstc_zicntr"
+SPIKE_TRACE_VERSION = 1
+
+FLAG_REG_WE = 0x1
+FLAG_MEM_ACCESS = 0x2
+FLAG_MEM_WE = 0x4
+FLAG_CSR_WE = 0x8
+
+ECALL_INSTRUCTION = 0x00000073
+EBREAK_INSTRUCTION = 0x00100073
+TRAP_MNEMONICS = {
+    ECALL_INSTRUCTION: "ecall",
+    EBREAK_INSTRUCTION: "ebreak",
+}
+CSR_NAMES = {
+    # M-mode CSRs.
+    0x300: "mstatus",
+    0x301: "misa",
+    0x302: "medeleg",
+    0x303: "mideleg",
+    0x304: "mie",
+    0x305: "mtvec",
+    0x340: "mscratch",
+    0x341: "mepc",
+    0x342: "mcause",
+    0x343: "mtval",
+    0x344: "mip",
+    0xF11: "mvendorid",
+    0xF12: "marchid",
+    0xF13: "mimpid",
+    0xF14: "mhartid",
+    # S-mode CSRs.
+    0x100: "sstatus",
+    0x104: "sie",
+    0x105: "stvec",
+    0x140: "sscratch",
+    0x141: "sepc",
+    0x142: "scause",
+    0x143: "stval",
+    0x144: "sip",
+    0x14D: "stimecmp",
+    0xC01: "time",
+}
+
+
+class TraceFormatError(Exception):
+    """Raised when a binary trace has an unknown header."""
+
+
+class TraceRecord(NamedTuple):
+    pc: int
+    reg_val: int
+    mem_addr: int
+    mem_val: int
+    csr_data: int
+    instruction: int
+    csr_addr: int
+    reg_addr: int
+    priv_mode: int
+    flags: int
+
+
+def is_binary_trace(path: Path) -> bool:
+    with path.open("rb") as handle:
+        return handle.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+
+
+def iter_records(path: Path) -> Iterator[TraceRecord]:
+    """Yield the records of a binary trace. A trailing partial record (the
+    simulation was killed mid-write) is dropped."""
+    with path.open("rb") as handle:
+        _read_header(handle, path)
+        chunk_size = TRACE_RECORD.size * READ_CHUNK_RECORDS
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                return
+            usable = len(chunk) - len(chunk) % TRACE_RECORD.size
+            for fields in TRACE_RECORD.iter_unpack(chunk[:usable]):
+                yield TraceRecord(*fields)
+            if usable != len(chunk):
+                return
+
+
+def format_record(record: TraceRecord) -> str:
+    """Render a record exactly as the text format of log_trace.c prints it."""
+    mnemonic = TRAP_MNEMONICS.get(record.instruction)
+    if mnemonic is not None:
+        return f"- PC: 0x{record.pc:016x}, INSTR: 0x{record.instruction:08x}, {mnemonic}\n"
+
+    line = f"{record.priv_mode} PC: 0x{record.pc:016x}, INSTR: 0x{record.instruction:08x}"
+    flags = record.flags
+    if flags & FLAG_REG_WE:
+        line += f", REG x{record.reg_addr}: 0x{record.reg_val:016x}"
+        if flags & FLAG_MEM_WE:
+            line += f", MEM 0x{record.mem_addr:016x}: 0x{record.mem_val:016x}"
+        elif flags & FLAG_MEM_ACCESS:
+            line += f", MEM 0x{record.mem_addr:016x}"
+        elif flags & FLAG_CSR_WE:
+            line += format_csr(record.csr_addr, record.csr_data)
+    elif flags & FLAG_MEM_WE:
+        line += f", MEM 0x{record.mem_addr:016x}: 0x{record.mem_val:016x}"
+    elif flags & FLAG_MEM_ACCESS:
+        line += f", MEM 0x{record.mem_addr:016x}"
+    elif flags & FLAG_CSR_WE:
+        line += format_csr(record.csr_addr, record.csr_data)
+    return line + "\n"
+
+
+def format_csr(csr_addr: int, csr_data: int) -> str:
+    csr_name = CSR_NAMES.get(csr_addr)
+    csr_label = f"c{csr_addr}_{csr_name}" if csr_name is not None else f"c{csr_addr}"
+    return f", {csr_label}: 0x{csr_data:016x}"
+
+
+def read_trace_lines(path: Path) -> Iterator[str]:
+    """Yield the text lines of an RTL trace in either format."""
+    if is_binary_trace(path):
+        for record in iter_records(path):
+            yield format_record(record)
+        return
+    with path.open("r") as handle:
+        yield from handle
+
+
+def _read_header(handle: BinaryIO, path: Path) -> None:
+    header = handle.read(TRACE_HEADER.size)
+    if len(header) < TRACE_HEADER.size:
+        raise TraceFormatError(f"{path}: truncated trace header")
+    magic, version, record_size = TRACE_HEADER.unpack(header)
+    if magic != TRACE_MAGIC:
+        raise TraceFormatError(f"{path}: not a binary RTL trace")
+    if version != TRACE_VERSION or record_size != TRACE_RECORD.size:
+        raise TraceFormatError(
+            f"{path}: unsupported trace format version {version} "
+            f"(record size {record_size}); expected version {TRACE_VERSION} "
+            f"(record size {TRACE_RECORD.size})"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Render a binary RTL commit trace in the text commit-log format."
+    )
+    parser.add_argument("trace", type=Path, help="trace file (binary or text)")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        metavar="file",
+        help="write the text trace here instead of stdout",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.output is None:
+            sys.stdout.writelines(read_trace_lines(args.trace))
+        else:
+            with args.output.open("w") as output_file:
+                output_file.writelines(read_trace_lines(args.trace))
+    except TraceFormatError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
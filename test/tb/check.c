@@ -105,6 +105,15 @@ int check_final(uint16_t branch_total, uint16_t branch_mispred) {
     return print_a0_status(latest_a0);
 }
 
+// Boot checkpoints (tb_test_env.cpp) carry latest_a0 along with the model.
+int check_checkpoint_save(FILE *file) {
+    return fwrite(&latest_a0, sizeof(latest_a0), 1, file) == 1 ? 0 : -1;
+}
+
+int check_checkpoint_restore(FILE *file) {
+    return fread(&latest_a0, sizeof(latest_a0), 1, file) == 1 ? 0 : -1;
+}
+
 #ifdef __cplusplus
 }
 #endif
@@ -30,13 +30,21 @@
 //                               ends; releases Dromajo resources.
 //
 //   dromajo_has_error()      -- returns 1 if any mismatch has been detected.
+//
+//   dromajo_checkpoint_*()   -- called from tb_test_env.cpp around boot
+//                               checkpoints; see "Checkpoint replay" below.
+//
+//   dromajo_sample_*()       -- called from tb_test_env.cpp for sampled runs;
+//                               see "Sampled simulation" below.
 // ---------------------------------------------------------------------------
 
 #include <cstdio>
 #include <cstdlib>
 #include <cstring>
 #include <stdint.h>
+#include <vector>
 
+#include <svdpi.h>
 #include <verilated.h>
 
 #include "dromajo_cosim.h"
@@ -47,10 +55,85 @@ static bool                   cosim_error = false;
 static bool                   cosim_done  = false;  // Dromajo signalled clean termination (HTIF exit 0)
 static bool                   trap_pending = false;
 
+// Checkpoint replay. Dromajo's own state is not saved with a boot checkpoint;
+// a restoring run re-executes the checkpointed retirements in Dromajo alone
+// (no RTL), which is fast. Retirements are deterministic except for what the
+// DUT feeds in, so only that is logged: interrupts it took and CSR
+// instructions, whose results Dromajo may take from the DUT (counters, time).
+// Each event is preceded by `plain_steps` ordinary retirements.
+enum cosim_event_kind : uint8_t {
+    COSIM_EVENT_INTERRUPT,
+    COSIM_EVENT_CSR,
+    COSIM_EVENT_TIME_READ,
+};
+
+struct cosim_event {
+    uint64_t plain_steps;
+    uint64_t pc;
+    uint64_t wdata;
+    uint64_t mstatus;
+    uint32_t insn;
+    uint8_t  kind;
+    uint8_t  reg_we;
+    uint8_t  cause;
+    uint8_t  reserved;
+};
+
+static bool                     cosim_recording = false;
+static std::vector<cosim_event> cosim_events;
+static uint64_t                 cosim_plain_steps = 0;
+
 static const uint32_t CSR_OPCODE = 0x73;
 static const uint32_t MSTATUS_CSR_ADDR = 0x300;
 static const uint32_t TIME_CSR_ADDR = 0xc01;
 
+// Sampled simulation (see below). The phase decides what dromajo_step does
+// with a retirement.
+enum sample_phase_kind {
+    SAMPLE_OFF,     // not a sampled run
+    SAMPLE_STUB,    // running the restore stub; not stepped in Dromajo
+    SAMPLE_WARMUP,  // co-simulated, not measured
+    SAMPLE_WINDOW,  // co-simulated and measured
+    SAMPLE_DONE,
+};
+
+// Defined in tb_test_env.cpp.
+extern vluint64_t posedge_cnt;
+// Defined in mem_pages.c.
+extern "C" void mem_preload_word(uint32_t index, uint32_t word);
+// Exported by rtl/perf_counters.sv.
+extern "C" long long perf_counter(int index);
+
+// Counters of rtl/perf_counters.sv a sample window reports the change of,
+// by their perf_counter index.
+enum sample_counter {
+    COUNTER_ICACHE_HITS,
+    COUNTER_ICACHE_MISSES,
+    COUNTER_DCACHE_HITS,
+    COUNTER_DCACHE_MISSES,
+    COUNTER_BRANCHES,
+    COUNTER_BRANCH_MISPREDICTS,
+    SAMPLE_COUNTERS,
+};
+static const char *const SAMPLE_COUNTER_NAMES[SAMPLE_COUNTERS] = {
+    "icache_hits", "icache_misses", "dcache_hits",
+    "dcache_misses", "branches", "branch_mispredicts",
+};
+static const char *const PERF_COUNTERS_SCOPE = "TOP.test_env.TOP_M.PERF0";
+
+static sample_phase_kind sample_phase = SAMPLE_OFF;
+static uint64_t          sample_start = 0;    // instructions fast-forwarded
+static uint64_t          sample_warmup = 0;
+static uint64_t          sample_window = 0;
+static uint64_t          sample_retired = 0;  // retirements in the current phase
+static uint64_t          sample_mark = 0;     // cycle the window started at
+static uint64_t          sample_cycles = 0;   // cycles of a completed window
+static uint64_t          sample_counts[SAMPLE_COUNTERS] = {};  // at the window start, then over it
+static bool              sample_reported = false;
+
+static bool sample_retire(uint32_t insn);
+extern "C" void dromajo_sample_report();
+
 // A diverged golden model makes every later retirement meaningless, so a
 // mismatch ends the simulation on the spot ($finish-style, which lets the
 // testbench close the waveform) instead of idling on to MAX_SIM_TIME.
@@ -77,6 +160,22 @@ static bool is_csr_instruction(uint32_t insn, uint32_t expected_csr_addr) {
     return opcode == CSR_OPCODE && funct3 != 0 && csr_addr(insn) == expected_csr_addr;
 }
 
+static void record_event(uint8_t kind, uint64_t pc, uint32_t insn, uint64_t wdata,
+                         uint8_t reg_we, uint64_t mstatus, uint8_t cause) {
+    if (!cosim_recording) return;
+    cosim_event event = {};
+    event.plain_steps = cosim_plain_steps;
+    event.pc = pc;
+    event.wdata = wdata;
+    event.mstatus = mstatus;
+    event.insn = insn;
+    event.kind = kind;
+    event.reg_we = reg_we;
+    event.cause = cause;
+    cosim_events.push_back(event);
+    cosim_plain_steps = 0;
+}
+
 static bool model_matches_retirement(RISCVCPUState *hart, uint64_t pc, uint32_t insn) {
     uint64_t emu_pc = riscv_get_pc(hart);
     uint32_t emu_insn = 0;
@@ -194,11 +293,13 @@ extern "C" void dromajo_fini() {
 // ---------------------------------------------------------------------------
 extern "C" void dromajo_raise_trap(uint8_t cause) {
     if (!cosim_state || cosim_error || cosim_done || trap_pending) return;
+    if (sample_phase == SAMPLE_STUB) return;
 
     uint8_t cause_code = cause & 0x1f;
     if (cause & 0x20) {
         dromajo_cosim_raise_trap(cosim_state, 0, INT64_MIN | cause_code);
         trap_pending = true;
+        record_event(COSIM_EVENT_INTERRUPT, 0, 0, 0, 0, 0, cause_code);
     }
 }
 
@@ -230,12 +331,16 @@ extern "C" void dromajo_step(
     // architectural trap-handler checks.
     if (insn == 0x00000073 || insn == 0x00100073) return;
 #endif
+    if (sample_phase != SAMPLE_OFF && !sample_retire(insn)) return;
 
     // When the instruction does not write a register, pass 0 so Dromajo
     // does not attempt to match a stale wdata value.
     uint64_t check_wdata = reg_we ? normalize_wdata_for_dromajo(insn, wdata) : 0;
 
-    if (retire_time_csr_read(pc, insn, wdata, reg_we)) return;
+    if (retire_time_csr_read(pc, insn, wdata, reg_we)) {
+        record_event(COSIM_EVENT_TIME_READ, pc, insn, wdata, reg_we, mstatus, 0);
+        return;
+    }
 
     int ret = dromajo_cosim_step(
         cosim_state,
@@ -258,6 +363,7 @@ extern "C" void dromajo_step(
             // ret == 1: Dromajo signalled clean termination (HTIF tohost written).
             // The DUT will now spin waiting to be killed; exit immediately so the
             // simulation does not run to MAX_SIM_TIME.
+            dromajo_sample_report();
             dromajo_cosim_fini(cosim_state);
             cosim_state = nullptr;
             cosim_done  = true;
@@ -265,6 +371,11 @@ extern "C" void dromajo_step(
         }
         return;
     }
+    if ((insn & 0x7f) == CSR_OPCODE && ((insn >> 12) & 0x7) != 0) {
+        record_event(COSIM_EVENT_CSR, pc, insn, check_wdata, reg_we, mstatus, 0);
+    } else if (cosim_recording) {
+        cosim_plain_steps++;
+    }
 
     // PC/insn/wdata matched and the golden model has retired this instruction, so
     // Dromajo now holds the post-commit mstatus. Compare it against the DUT.
@@ -330,3 +441,400 @@ extern "C" void dromajo_step(
 extern "C" int dromajo_has_error() {
     return cosim_error ? 1 : 0;
 }
+
+
+// ---------------------------------------------------------------------------
+// Checkpoint replay (see cosim_event above).
+//
+// dromajo_checkpoint_record(1) starts logging at the first retirement; the
+// log is written with each checkpoint and dropped by
+// dromajo_checkpoint_record(0). dromajo_checkpoint_restore() replays a saved
+// log right after dromajo_init(), bringing Dromajo to the checkpointed
+// retirement before the restored DUT resumes.
+// ---------------------------------------------------------------------------
+extern "C" void dromajo_checkpoint_record(int enable) {
+    cosim_recording = enable != 0;
+    cosim_events.clear();
+    cosim_events.shrink_to_fit();
+    cosim_plain_steps = 0;
+}
+
+extern "C" int dromajo_checkpoint_save(FILE *file) {
+    uint64_t count = cosim_events.size();
+    if (fwrite(&count, sizeof(count), 1, file) != 1) return -1;
+    if (count > 0 && fwrite(cosim_events.data(), sizeof(cosim_event), count, file) != count) return -1;
+    return fwrite(&cosim_plain_steps, sizeof(cosim_plain_steps), 1, file) == 1 ? 0 : -1;
+}
+
+// The instruction Dromajo is about to execute, for stepping it unchecked.
+static uint32_t model_next_insn(RISCVCPUState *hart, uint64_t pc) {
+    uint32_t insn = 0;
+    riscv_read_insn(hart, &insn, pc);
+    if ((insn & 3) != 3) {
+        insn &= 0xffff;
+    }
+    return insn;
+}
+
+static bool replay_plain_steps(uint64_t count) {
+    RISCVCPUState *hart = dromajo_hart0();
+    for (uint64_t i = 0; i < count; i++) {
+        uint64_t pc = riscv_get_pc(hart);
+        uint32_t insn = model_next_insn(hart, pc);
+        if (dromajo_cosim_step(cosim_state, 0, pc, insn, 0,
+                               riscv_cpu_get_mstatus(hart), false) != 0) {
+            return false;
+        }
+    }
+    return true;
+}
+
+extern "C" int dromajo_checkpoint_restore(FILE *file) {
+    uint64_t count;
+    uint64_t trailing_steps;
+    cosim_event event;
+
+    if (!cosim_state || dromajo_hart0() == nullptr) return -1;
+    if (fread(&count, sizeof(count), 1, file) != 1) return -1;
+    for (uint64_t i = 0; i < count; i++) {
+        if (fread(&event, sizeof(event), 1, file) != 1) return -1;
+        if (!replay_plain_steps(event.plain_steps)) return -1;
+        switch (event.kind) {
+            case COSIM_EVENT_INTERRUPT:
+                dromajo_cosim_raise_trap(cosim_state, 0, INT64_MIN | event.cause);
+                break;
+            case COSIM_EVENT_TIME_READ:
+                retire_time_csr_read(event.pc, event.insn, event.wdata, event.reg_we);
+                break;
+            case COSIM_EVENT_CSR:
+                if (dromajo_cosim_step(cosim_state, 0, event.pc, event.insn, event.wdata,
+                                       event.mstatus, true) != 0) {
+                    return -1;
+                }
+                break;
+            default:
+                return -1;
+        }
+    }
+    if (fread(&trailing_steps, sizeof(trailing_steps), 1, file) != 1) return -1;
+    if (!replay_plain_steps(trailing_steps)) return -1;
+    trap_pending = false;
+    return cosim_error ? -1 : 0;
+}
+
+
+// ---------------------------------------------------------------------------
+// Sampled simulation (run_tests.py --sample).
+//
+// MAVERIC_SAMPLE_COUNT=1 runs the program in Dromajo alone and prints its
+// length in retired instructions; the RTL never starts. MAVERIC_SAMPLE_START=N
+// fast-forwards Dromajo N instructions and hands its state to the RTL, which
+// is then co-simulated for MAVERIC_SAMPLE_WARMUP instructions to warm the
+// caches and predictors before the cycles of the next MAVERIC_SAMPLE_WINDOW
+// instructions are counted.
+//
+// The RTL has no port to load architectural state through, so the handover
+// is a program: Dromajo's memory is preloaded in place of the test image,
+// together with a stub above Dromajo's RAM that loads the CSRs and registers
+// and mret's to the sample point. The reset vector is patched to jump to the
+// stub, which first puts the two words it overwrote back.
+// ---------------------------------------------------------------------------
+static const uint64_t SAMPLE_RESET_VECTOR = 0x80000000ULL;
+static const uint64_t SAMPLE_STUB_BASE    = 0x9ffff000ULL;
+static const int      SAMPLE_STUB_DATA    = 0x400;  // data offset from the stub base
+static const uint32_t MRET_INSTRUCTION      = 0x30200073;
+static const uint32_t SELF_LOOP_INSTRUCTION = 0x0000006f;  // jal x0, 0
+static const uint32_t FENCE_I_INSTRUCTION   = 0x0000100f;
+static const uint64_t SAMPLE_MSTATUS_MIE  = (uint64_t)1 << 3;
+static const uint64_t SAMPLE_MSTATUS_MPIE = (uint64_t)1 << 7;
+static const uint64_t SAMPLE_MSTATUS_MPP  = (uint64_t)3 << 11;
+static const int      SAMPLE_PRV_M = 3;
+static const int      REG_T0 = 5;
+static const int      REG_T1 = 6;
+static const int      REG_T2 = 7;
+
+// 64-bit slots of the stub's data area.
+enum sample_slot {
+    SLOT_RESET_WORDS,
+    SLOT_RESET_VECTOR,
+    SLOT_MSTATUS,
+    SLOT_MIE,
+    SLOT_MTVEC,
+    SLOT_MSCRATCH,
+    SLOT_MCAUSE,
+    SLOT_MTVAL,
+    SLOT_MEPC,
+    SLOT_REGS,  // x0..x31
+};
+
+static uint64_t sample_env(const char *name) {
+    const char *value = getenv(name);
+    return (value != NULL && value[0] != '\0') ? strtoull(value, NULL, 10) : 0;
+}
+
+// The run ends here the way check.c sees it: a simulator-exit ECALL/EBREAK
+// or a self-loop.
+static bool sample_program_end(uint32_t insn) {
+#ifndef MAVERIC_CONTINUE_AFTER_TRAP
+    if (insn == 0x00000073 || insn == 0x00100073) return true;
+#endif
+    return insn == SELF_LOOP_INSTRUCTION;
+}
+
+static bool sample_in_trap_vector(RISCVCPUState *hart, uint64_t pc) {
+    uint64_t base = hart->mtvec & ~(uint64_t)3;
+    uint64_t span = (hart->mtvec & 1) ? 4 * 16 : 4;
+    return pc - base < span;
+}
+
+// Steps Dromajo alone until `target` instructions have retired outside a
+// trap handler (the stub's mret takes mepc, so the interrupted pc of a
+// handler would be lost), or until the program ends. Returns the number of
+// instructions retired.
+static uint64_t sample_fast_forward(uint64_t target, bool *ended) {
+    RISCVCPUState *hart = dromajo_hart0();
+    bool     in_handler = false;
+    uint64_t retired = 0;
+
+    *ended = false;
+    while (retired < target || in_handler) {
+        uint64_t pc = riscv_get_pc(hart);
+        uint32_t insn = model_next_insn(hart, pc);
+        if (sample_program_end(insn) ||
+            dromajo_cosim_step(cosim_state, 0, pc, insn, 0,
+                               riscv_cpu_get_mstatus(hart), false) != 0) {
+            *ended = true;
+            break;
+        }
+        retired++;
+        if (insn == MRET_INSTRUCTION) {
+            in_handler = false;
+        } else if (sample_in_trap_vector(hart, riscv_get_pc(hart))) {
+            in_handler = true;
+        }
+    }
+    return retired;
+}
+
+static uint32_t encode_ld(int rd, int rs1, int offset) {
+    return (uint32_t)offset << 20 | rs1 << 15 | 3 << 12 | rd << 7 | 0x03;
+}
+
+static uint32_t encode_sd(int rs2, int rs1, int offset) {
+    return (uint32_t)(offset >> 5) << 25 | rs2 << 20 | rs1 << 15 | 3 << 12 |
+           (offset & 0x1f) << 7 | 0x23;
+}
+
+static uint32_t encode_csrw(uint32_t csr, int rs1) {
+    return csr << 20 | rs1 << 15 | 1 << 12 | CSR_OPCODE;
+}
+
+static int slot_offset(int slot) {
+    return SAMPLE_STUB_DATA + 8 * slot;
+}
+
+static void preload_u64(uint64_t addr, uint64_t value) {
+    mem_preload_word((uint32_t)(addr >> 2), (uint32_t)value);
+    mem_preload_word((uint32_t)(addr >> 2) + 1, (uint32_t)(value >> 32));
+}
+
+// Hands Dromajo's state at the sample point to the RTL (see above).
+static void sample_handover() {
+    RISCVMachine  *machine = reinterpret_cast<RISCVMachine *>(cosim_state);
+    RISCVCPUState *hart = dromajo_hart0();
+    uint64_t       ram_end = machine->ram_base_addr + machine->ram_size;
+    uint64_t       resume_pc = riscv_get_pc(hart);
+
+    if (riscv_get_priv_level(hart) != SAMPLE_PRV_M) {
+        fprintf(stderr, "[sample] sample point 0x%016lx is not in machine mode\n",
+                (unsigned long)resume_pc);
+        exit(EXIT_FAILURE);
+    }
+    if (ram_end > SAMPLE_STUB_BASE) {
+        fprintf(stderr, "[sample] Dromajo RAM overlaps the restore stub at 0x%016lx\n",
+                (unsigned long)SAMPLE_STUB_BASE);
+        exit(EXIT_FAILURE);
+    }
+
+    // Untouched pages stay unallocated in mem_pages.c.
+    for (uint64_t addr = machine->ram_base_addr; addr < ram_end; addr += 8) {
+        uint64_t value = 0;
+        if (riscv_read_u64(hart, &value, addr) == 0 && value != 0) {
+            preload_u64(addr, value);
+        }
+    }
+
+    uint64_t data[SLOT_REGS + 32] = {};
+    uint64_t mstatus = riscv_cpu_get_mstatus(hart);
+    riscv_read_u64(hart, &data[SLOT_RESET_WORDS], SAMPLE_RESET_VECTOR);
+    data[SLOT_RESET_VECTOR] = SAMPLE_RESET_VECTOR;
+    // mret sets MIE from MPIE; interrupts stay off until then.
+    data[SLOT_MSTATUS] = (mstatus & ~(SAMPLE_MSTATUS_MIE | SAMPLE_MSTATUS_MPIE)) |
+                         ((mstatus & SAMPLE_MSTATUS_MIE) ? SAMPLE_MSTATUS_MPIE : 0) |
+                         SAMPLE_MSTATUS_MPP;
+    data[SLOT_MIE] = hart->mie;
+    data[SLOT_MTVEC] = hart->mtvec;
+    data[SLOT_MSCRATCH] = hart->mscratch;
+    data[SLOT_MCAUSE] = hart->mcause;
+    data[SLOT_MTVAL] = hart->mtval;
+    data[SLOT_MEPC] = resume_pc;
+    for (int reg = 1; reg < 32; reg++) {
+        data[SLOT_REGS + reg] = riscv_get_reg(hart, reg);
+    }
+
+    // t0 holds the stub base (set by the patched reset vector) until last.
+    std::vector<uint32_t> stub = {
+        encode_ld(REG_T1, REG_T0, slot_offset(SLOT_RESET_WORDS)),
+        encode_ld(REG_T2, REG_T0, slot_offset(SLOT_RESET_VECTOR)),
+        encode_sd(REG_T1, REG_T2, 0),
+        FENCE_I_INSTRUCTION,
+    };
+    const struct { int slot; uint32_t csr; } csrs[] = {
+        {SLOT_MSTATUS, 0x300}, {SLOT_MIE, 0x304},    {SLOT_MTVEC, 0x305},
+        {SLOT_MSCRATCH, 0x340}, {SLOT_MCAUSE, 0x342}, {SLOT_MTVAL, 0x343},
+        {SLOT_MEPC, 0x341},
+    };
+    for (const auto &csr : csrs) {
+        stub.push_back(encode_ld(REG_T1, REG_T0, slot_offset(csr.slot)));
+        stub.push_back(encode_csrw(csr.csr, REG_T1));
+    }
+    for (int reg = 1; reg < 32; reg++) {
+        if (reg != REG_T0) {
+            stub.push_back(encode_ld(reg, REG_T0, slot_offset(SLOT_REGS + reg)));
+        }
+    }
+    stub.push_back(encode_ld(REG_T0, REG_T0, slot_offset(SLOT_REGS + REG_T0)));
+    stub.push_back(MRET_INSTRUCTION);
+
+    for (size_t i = 0; i < stub.size(); i++) {
+        mem_preload_word((uint32_t)((SAMPLE_STUB_BASE >> 2) + i), stub[i]);
+    }
+    for (int slot = 0; slot < SLOT_REGS + 32; slot++) {
+        preload_u64(SAMPLE_STUB_BASE + slot_offset(slot), data[slot]);
+    }
+    // auipc t0, (stub - reset vector) >> 12; jalr x0, 0(t0)
+    mem_preload_word((uint32_t)(SAMPLE_RESET_VECTOR >> 2),
+                     (uint32_t)((SAMPLE_STUB_BASE - SAMPLE_RESET_VECTOR) | REG_T0 << 7 | 0x17));
+    mem_preload_word((uint32_t)(SAMPLE_RESET_VECTOR >> 2) + 1, REG_T0 << 15 | 0x67);
+
+    // Match what the RTL holds after the stub's mret.
+    hart->mepc = resume_pc;
+    hart->mstatus |= SAMPLE_MSTATUS_MPIE;
+}
+
+// Reads the perf_counters totals in that module's DPI scope.
+static void sample_read_counters(uint64_t counts[SAMPLE_COUNTERS]) {
+    svScope caller = svSetScope(svGetScopeFromName(PERF_COUNTERS_SCOPE));
+    for (int counter = 0; counter < SAMPLE_COUNTERS; counter++) {
+        counts[counter] = (uint64_t)perf_counter(counter);
+    }
+    svSetScope(caller);
+}
+
+static void sample_open_window() {
+    sample_phase = SAMPLE_WINDOW;
+    sample_retired = 0;
+    sample_mark = posedge_cnt;
+    sample_read_counters(sample_counts);
+}
+
+// Ends the window where it stands: its cycles, and the change of each
+// counter since it opened.
+static void sample_close_window() {
+    uint64_t counts[SAMPLE_COUNTERS];
+
+    sample_read_counters(counts);
+    for (int counter = 0; counter < SAMPLE_COUNTERS; counter++) {
+        sample_counts[counter] = counts[counter] - sample_counts[counter];
+    }
+    sample_phase = SAMPLE_DONE;
+    sample_window = sample_retired;
+    sample_cycles = posedge_cnt - sample_mark;
+}
+
+// Called from dromajo_step for every retirement of a sampled run. Returns
+// false for the stub's own instructions, which Dromajo must not step.
+static bool sample_retire(uint32_t insn) {
+    switch (sample_phase) {
+        case SAMPLE_STUB:
+            if (insn == MRET_INSTRUCTION) {
+                if (sample_warmup > 0) {
+                    sample_phase = SAMPLE_WARMUP;
+                    sample_retired = 0;
+                } else {
+                    sample_open_window();
+                }
+            }
+            return false;
+        case SAMPLE_WARMUP:
+            if (++sample_retired == sample_warmup) {
+                sample_open_window();
+            }
+            return true;
+        case SAMPLE_WINDOW:
+            if (++sample_retired == sample_window) {
+                sample_close_window();
+                Verilated::gotFinish(true);
+            }
+            return true;
+        default:
+            return true;
+    }
+}
+
+// Returns 1 when the run is complete before the RTL starts: a length count,
+// or a sample point at or past the end of the program.
+extern "C" int dromajo_sample_setup() {
+    bool ended = false;
+
+    if (sample_env("MAVERIC_SAMPLE_COUNT") != 0) {
+        uint64_t length = sample_fast_forward(UINT64_MAX, &ended);
+        printf("Program length: %llu instructions\n", (unsigned long long)length);
+        return 1;
+    }
+    const char *start = getenv("MAVERIC_SAMPLE_START");
+    if (!cosim_state || start == NULL || start[0] == '\0') {
+        return 0;
+    }
+
+    sample_warmup = sample_env("MAVERIC_SAMPLE_WARMUP");
+    sample_window = sample_env("MAVERIC_SAMPLE_WINDOW");
+    sample_start = sample_fast_forward(strtoull(start, NULL, 10), &ended);
+    if (ended || sample_window == 0) {
+        sample_phase = SAMPLE_DONE;
+        sample_window = 0;
+        return 1;
+    }
+    sample_handover();
+    sample_phase = SAMPLE_STUB;
+    return 0;
+}
+
+// A window cut short by the end of the program reports what it measured.
+// Both the clean HTIF exit in dromajo_step and main call this; the window is
+// reported once, as the first call found it.
+extern "C" void dromajo_sample_report() {
+    if (sample_phase == SAMPLE_OFF || sample_reported) {
+        return;
+    }
+    if (sample_phase == SAMPLE_WINDOW) {
+        sample_close_window();
+    } else if (sample_phase != SAMPLE_DONE) {
+        // Stopped before the window opened: nothing measured.
+        sample_phase = SAMPLE_DONE;
+        sample_window = 0;
+        sample_cycles = 0;
+        memset(sample_counts, 0, sizeof(sample_counts));
+    }
+    sample_reported = true;
+
+    printf("Sample window at instruction %llu: %llu instructions in %llu cycles;",
+           (unsigned long long)sample_start, (unsigned long long)sample_window,
+           (unsigned long long)sample_cycles);
+    for (int counter = 0; counter < SAMPLE_COUNTERS; counter++) {
+        printf(" %s=%llu", SAMPLE_COUNTER_NAMES[counter],
+               (unsigned long long)sample_counts[counter]);
+    }
+    printf("\n");
+    fflush(stdout);
+}
@@ -1,8 +1,28 @@
 #include <stdio.h>
 #include <stdint.h>
 #include <stdlib.h>
+#include <string.h>
 
 #define RTL_TRACE_FILE_ENV "MAVERIC_RTL_TRACE_FILE"
+// "binary" selects the fixed-size record format decoded by scripts/tracefmt.py;
+// anything else keeps the text commit log.
+#define RTL_TRACE_FORMAT_ENV "MAVERIC_RTL_TRACE_FORMAT"
+#define TRACE_MAGIC "MVTRACE"
+#define TRACE_VERSION 1u
+#define TRACE_BUFFER_BYTES (1024 * 1024)
+// A Spike-normalized text trace or a binary trace to compare every retirement
+// against as it happens; the run ends at the first mismatch.
+#define REFERENCE_TRACE_FILE_ENV "MAVERIC_REFERENCE_TRACE_FILE"
+#define REFERENCE_CONTEXT_LINES 3
+#define REFERENCE_LOOKAHEAD_LINES 3
+// run_tests.py looks for this prefix in the simulation output.
+#define REFERENCE_MISMATCH_TAG "[tracecomp]"
+#define TRACE_LINE_BYTES 256
+
+#define TRACE_FLAG_REG_WE     0x1u
+#define TRACE_FLAG_MEM_ACCESS 0x2u
+#define TRACE_FLAG_MEM_WE     0x4u
+#define TRACE_FLAG_CSR_WE     0x8u
 #define ECALL_INSTRUCTION 0x00000073u
 #define EBREAK_INSTRUCTION 0x00100073u
 #define SELF_LOOP_INSTRUCTION 0x0000006fu
@@ -12,9 +32,51 @@
 // store to stay aligned with Spike.
 #define TOHOST_ADDRESS 0x0000000080001000ull
 
+// One record per retired instruction, written in host (little-endian) byte
+// order. Must match TRACE_RECORD in scripts/tracefmt.py (56 bytes, no padding).
+struct trace_record {
+    uint64_t pc;
+    uint64_t reg_val;
+    uint64_t mem_addr;
+    uint64_t mem_val;
+    uint64_t csr_data;
+    uint32_t instruction;
+    uint16_t csr_addr;
+    uint8_t  reg_addr;
+    uint8_t  priv_mode;
+    uint8_t  flags;
+    uint8_t  reserved[7];
+};
+
+struct trace_header {
+    char     magic[8];
+    uint32_t version;
+    uint32_t record_size;
+};
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+// Defined in tb_test_env.cpp: ends the simulation like $finish.
+void sim_request_finish(void);
+
+#ifdef __cplusplus
+}
+#endif
+
 static FILE *trace_file = NULL;
 static int trace_file_failed = 0;
 static int trace_complete = 0;
+static int trace_binary = 0;
+static char trace_buffer[TRACE_BUFFER_BYTES];
+
+static FILE *reference_file = NULL;
+static const char *reference_path = NULL;
+static int reference_checked = 0;
+static int reference_binary = 0;
+static uint64_t reference_index = 0;
+static char reference_context[REFERENCE_CONTEXT_LINES][TRACE_LINE_BYTES];
 
 static void close_trace_file(void) {
     if (trace_file != NULL) {
@@ -25,6 +87,7 @@ static void close_trace_file(void) {
 
 static FILE *get_trace_file(void) {
     const char *trace_file_path;
+    const char *trace_format;
 
     if (trace_file != NULL || trace_file_failed) {
         return trace_file;
@@ -41,13 +104,32 @@ static FILE *get_trace_file(void) {
         return NULL;
     }
 
-    trace_file = fopen(trace_file_path, "a");
+    trace_format = getenv(RTL_TRACE_FORMAT_ENV);
+    trace_binary = trace_format != NULL && strcmp(trace_format, "binary") == 0;
+
+    trace_file = fopen(trace_file_path, trace_binary ? "ab" : "a");
     if (trace_file == NULL) {
         perror(trace_file_path);
         trace_file_failed = 1;
         return NULL;
     }
 
+    if (trace_binary) {
+        struct trace_header header;
+
+        // Records are only flushed when the buffer fills or at exit; the text
+        // format stays line-flushed for interactive debugging.
+        setvbuf(trace_file, trace_buffer, _IOFBF, sizeof(trace_buffer));
+        fseek(trace_file, 0, SEEK_END);
+        if (ftell(trace_file) == 0) {
+            memset(&header, 0, sizeof(header));
+            memcpy(header.magic, TRACE_MAGIC, sizeof(TRACE_MAGIC));
+            header.version = TRACE_VERSION;
+            header.record_size = (uint32_t)sizeof(struct trace_record);
+            fwrite(&header, sizeof(header), 1, trace_file);
+        }
+    }
+
     atexit(close_trace_file);
     return trace_file;
 }
@@ -85,26 +167,233 @@ static const char *csr_name(uint16_t csr_addr) {
     }
 }
 
-static void write_csr_trace(FILE *out, uint16_t csr_addr, uint64_t csr_data) {
+static int format_csr_trace(
+    char *line, size_t size, uint16_t csr_addr, uint64_t csr_data
+) {
     const char *name = csr_name(csr_addr);
 
     if (name != NULL) {
-        fprintf(
-            out,
+        return snprintf(
+            line,
+            size,
             ", c%u_%s: 0x%016llx",
             csr_addr,
             name,
             (unsigned long long)csr_data
         );
     }
+    return snprintf(
+        line,
+        size,
+        ", c%u: 0x%016llx",
+        csr_addr,
+        (unsigned long long)csr_data
+    );
+}
+
+// Render a record as one text commit-log line (without the newline); this
+// is the format tracecomp.py normalizes Spike's log to.
+static void format_trace_line(
+    const struct trace_record *record, char *line, size_t size
+) {
+    int length;
+    uint8_t flags = record->flags;
+
+    if (record->instruction == ECALL_INSTRUCTION ||
+        record->instruction == EBREAK_INSTRUCTION) {
+        snprintf(
+            line,
+            size,
+            "- PC: 0x%016llx, INSTR: 0x%08x, %s",
+            (unsigned long long)record->pc,
+            record->instruction,
+            (record->instruction == ECALL_INSTRUCTION) ? "ecall" : "ebreak"
+        );
+        return;
+    }
+
+    length = snprintf(
+        line,
+        size,
+        "%d PC: 0x%016llx, INSTR: 0x%08x",
+        (uint32_t)record->priv_mode,
+        (unsigned long long)record->pc,
+        record->instruction
+    );
+
+    if (flags & TRACE_FLAG_REG_WE) {
+        length += snprintf(
+            line + length,
+            size - length,
+            ", REG x%u: 0x%016llx",
+            (unsigned int)record->reg_addr,
+            (unsigned long long)record->reg_val
+        );
+        if (flags & TRACE_FLAG_MEM_WE) {
+            // Atomic memory op (AMO): writes a register *and* memory, so log
+            // both the register result and the value written to memory.
+            snprintf(
+                line + length,
+                size - length,
+                ", MEM 0x%016llx: 0x%016llx",
+                (unsigned long long)record->mem_addr,
+                (unsigned long long)record->mem_val
+            );
+        }
+        else if (flags & TRACE_FLAG_MEM_ACCESS) {
+            // Load / LR: register written, memory only read.
+            snprintf(
+                line + length,
+                size - length,
+                ", MEM 0x%016llx",
+                (unsigned long long)record->mem_addr
+            );
+        }
+        else if (flags & TRACE_FLAG_CSR_WE) {
+            format_csr_trace(
+                line + length, size - length, record->csr_addr, record->csr_data
+            );
+        }
+    }
+    else if (flags & TRACE_FLAG_MEM_WE) {
+        snprintf(
+            line + length,
+            size - length,
+            ", MEM 0x%016llx: 0x%016llx",
+            (unsigned long long)record->mem_addr,
+            (unsigned long long)record->mem_val
+        );
+    }
+    else if (flags & TRACE_FLAG_MEM_ACCESS) {
+        snprintf(
+            line + length,
+            size - length,
+            ", MEM 0x%016llx",
+            (unsigned long long)record->mem_addr
+        );
+    }
+    else if (flags & TRACE_FLAG_CSR_WE) {
+        format_csr_trace(
+            line + length, size - length, record->csr_addr, record->csr_data
+        );
+    }
+}
+
+static void close_reference_file(void) {
+    if (reference_file != NULL) {
+        fclose(reference_file);
+        reference_file = NULL;
+    }
+}
+
+static void reference_fail(const char *message) {
+    fprintf(stderr, "%s: %s\n", reference_path, message);
+    exit(EXIT_FAILURE);
+}
+
+// Opens the reference trace on first use; returns NULL when lockstep
+// comparison is off (MAVERIC_REFERENCE_TRACE_FILE unset or empty).
+static FILE *get_reference_file(void) {
+    struct trace_header header;
+
+    if (reference_checked) {
+        return reference_file;
+    }
+    reference_checked = 1;
+
+    reference_path = getenv(REFERENCE_TRACE_FILE_ENV);
+    if (reference_path == NULL || reference_path[0] == '\0') {
+        return NULL;
+    }
+
+    reference_file = fopen(reference_path, "rb");
+    if (reference_file == NULL) {
+        perror(reference_path);
+        exit(EXIT_FAILURE);
+    }
+    atexit(close_reference_file);
+
+    if (fread(&header, sizeof(header), 1, reference_file) == 1 &&
+        memcmp(header.magic, TRACE_MAGIC, sizeof(TRACE_MAGIC)) == 0) {
+        if (header.version != TRACE_VERSION ||
+            header.record_size != (uint32_t)sizeof(struct trace_record)) {
+            reference_fail("unsupported binary trace version");
+        }
+        reference_binary = 1;
+    }
     else {
-        fprintf(
-            out,
-            ", c%u: 0x%016llx",
-            csr_addr,
-            (unsigned long long)csr_data
+        rewind(reference_file);
+    }
+    return reference_file;
+}
+
+// Reads the next reference line (without the newline) and returns 1, or
+// returns 0 at the end of the reference trace.
+static int read_reference_line(char *line, size_t size) {
+    if (reference_binary) {
+        struct trace_record record;
+
+        if (fread(&record, sizeof(record), 1, reference_file) != 1) {
+            return 0;
+        }
+        format_trace_line(&record, line, size);
+        return 1;
+    }
+
+    if (fgets(line, (int)size, reference_file) == NULL) {
+        return 0;
+    }
+    line[strcspn(line, "\n")] = '\0';
+    return 1;
+}
+
+// Compares one retirement with the next reference record. On the first
+// mismatch the surrounding lines are printed to the simulation output and the
+// run is ended, so a divergence costs only the cycles up to it.
+static void compare_with_reference(const char *line) {
+    char expected[TRACE_LINE_BYTES];
+    int have_expected = read_reference_line(expected, sizeof(expected));
+    uint64_t first;
+
+    if (have_expected && strcmp(line, expected) == 0) {
+        strcpy(reference_context[reference_index % REFERENCE_CONTEXT_LINES], line);
+        reference_index++;
+        return;
+    }
+
+    printf(
+        "%s MISMATCH at record %llu against %s\n",
+        REFERENCE_MISMATCH_TAG,
+        (unsigned long long)reference_index,
+        reference_path
+    );
+    first = reference_index > REFERENCE_CONTEXT_LINES
+        ? reference_index - REFERENCE_CONTEXT_LINES
+        : 0;
+    for (uint64_t i = first; i < reference_index; i++) {
+        printf(
+            "%s   %s\n",
+            REFERENCE_MISMATCH_TAG,
+            reference_context[i % REFERENCE_CONTEXT_LINES]
         );
     }
+    printf("%s - RTL: %s\n", REFERENCE_MISMATCH_TAG, line);
+    if (have_expected) {
+        printf("%s + REF: %s\n", REFERENCE_MISMATCH_TAG, expected);
+        for (int i = 0; i < REFERENCE_LOOKAHEAD_LINES; i++) {
+            if (!read_reference_line(expected, sizeof(expected))) {
+                break;
+            }
+            printf("%s   REF: %s\n", REFERENCE_MISMATCH_TAG, expected);
+        }
+    }
+    else {
+        printf("%s + REF: <end of reference trace>\n", REFERENCE_MISMATCH_TAG);
+    }
+    fflush(stdout);
+
+    trace_complete = 1;
+    sim_request_finish();
 }
 
 #ifdef __cplusplus
@@ -127,7 +416,8 @@ void log_trace(
     uint64_t csr_data
 ) {
     FILE *out;
-    uint8_t trace_csr_we = csr_we;
+    struct trace_record record;
+    char line[TRACE_LINE_BYTES];
 
     if (trace_complete) {
         return;
@@ -146,70 +436,48 @@ void log_trace(
         return;
     }
 
-    if (instruction == ECALL_INSTRUCTION || instruction == EBREAK_INSTRUCTION) {
-        fprintf(
-            out,
-            "- PC: 0x%016llx, INSTR: 0x%08x, %s\n",
-            (unsigned long long)pc,
-            instruction,
-            (instruction == ECALL_INSTRUCTION) ? "ecall" : "ebreak"
-        );
-        fflush(out);
-#ifndef MAVERIC_CONTINUE_AFTER_TRAP
-        trace_complete = 1;
-#endif
-        return;
-    }
-
-    fprintf(
-        out,
-        "%d PC: 0x%016llx, INSTR: 0x%08x",
-        (uint32_t)priv_mode,
-        (unsigned long long)pc,
-        instruction
-    );
+    memset(&record, 0, sizeof(record));
+    record.pc = pc;
+    record.reg_val = reg_val;
+    record.mem_addr = mem_addr;
+    record.mem_val = mem_val;
+    record.csr_data = csr_data;
+    record.instruction = instruction;
+    record.csr_addr = csr_addr;
+    record.reg_addr = reg_addr;
+    record.priv_mode = priv_mode;
+    record.flags = (reg_we ? TRACE_FLAG_REG_WE : 0) |
+                   (mem_access ? TRACE_FLAG_MEM_ACCESS : 0) |
+                   (mem_we ? TRACE_FLAG_MEM_WE : 0) |
+                   (csr_we ? TRACE_FLAG_CSR_WE : 0);
 
-    if (reg_we) {
-        fprintf(
-            out,
-            ", REG x%u: 0x%016llx",
-            (unsigned int)reg_addr,
-            (unsigned long long)reg_val
-        );
-        if (mem_we) {
-            // Atomic memory op (AMO): writes a register *and* memory, so log
-            // both the register result and the value written to memory.
-            fprintf(
-                out,
-                ", MEM 0x%016llx: 0x%016llx",
-                (unsigned long long)mem_addr,
-                (unsigned long long)mem_val
-            );
-        }
-        else if (mem_access) {
-            // Load / LR: register written, memory only read.
-            fprintf(out, ", MEM 0x%016llx", (unsigned long long)mem_addr);
-        }
-        else if (trace_csr_we) {
-            write_csr_trace(out, csr_addr, csr_data);
+    if (trace_binary) {
+        fwrite(&record, sizeof(record), 1, out);
+        if (get_reference_file() != NULL) {
+            format_trace_line(&record, line, sizeof(line));
         }
     }
-    else if (mem_we) {
-        fprintf(
-            out,
-            ", MEM 0x%016llx: 0x%016llx",
-            (unsigned long long)mem_addr,
-            (unsigned long long)mem_val
-        );
+    else {
+        format_trace_line(&record, line, sizeof(line));
+        fprintf(out, "%s\n", line);
+        fflush(out);
     }
-    else if (mem_access) {
-        fprintf(out, ", MEM 0x%016llx", (unsigned long long)mem_addr);
+
+    // The mismatching record is still logged above, so the post-run
+    // comparison in run_tests.py reports the same first divergence.
+    if (get_reference_file() != NULL) {
+        compare_with_reference(line);
+        if (trace_complete) {
+            return;
+        }
     }
-    else if (trace_csr_we) {
-        write_csr_trace(out, csr_addr, csr_data);
+
+    if (instruction == ECALL_INSTRUCTION || instruction == EBREAK_INSTRUCTION) {
+#ifndef MAVERIC_CONTINUE_AFTER_TRAP
+        trace_complete = 1;
+#endif
+        return;
     }
-    fprintf(out, "\n");
-    fflush(out);
 
 #ifdef MAVERIC_CONTINUE_AFTER_TRAP
     // The write to tohost is the terminating event for riscv-tests: commit it
@@ -0,0 +1,235 @@
+#include <stdio.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+// Native test-image loader for mem_simulated. The PT_LOAD segments of the ELF
+// given on the simulator command line are copied into a word buffer at start
+// of simulation and handed to the RTL one word at a time through
+// mem_image_next(), replacing the objdump -> disasm2mem -> $readmemh chain.
+// Files that are not ELF are loaded as raw binaries at MEM_IMAGE_BASE, the
+// same placement elf2disasm gives .bin inputs. When MAVERIC_MEM_IMAGE_FILE
+// names a disasm2mem hex image, that is parsed instead, which lets sparse
+// (mem_pages.c) builds run --hex-image tests without $readmemh.
+
+#define MEM_IMAGE_BASE     0x80000000ULL
+// mem_simulated indexes its word array with addr[29:2].
+#define MEM_IMAGE_WORD_MASK 0x0fffffffULL
+
+#define ELF_MAGIC          "\177ELF"
+#define ELF_CLASS_32       1
+#define ELF_CLASS_64       2
+#define ELF_DATA_LSB       1
+#define ELF_PT_LOAD        1
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+// Defined in tb_test_env.cpp (MAVERIC_MEM_IMAGE_FILE).
+int mem_image_is_hex(void);
+const char *mem_image_path(void);
+
+#ifdef __cplusplus
+}
+#endif
+
+static const char *mem_image_elf_path = NULL;
+static const char *mem_image_source = NULL;
+static uint32_t   *mem_image_words = NULL;
+static uint64_t    mem_image_first_word = 0;
+static uint64_t    mem_image_word_count = 0;
+static uint64_t    mem_image_cursor = 0;
+static int         mem_image_loaded = 0;
+
+static uint64_t read_le(const unsigned char *bytes, int size) {
+    uint64_t value = 0;
+    for (int i = size - 1; i >= 0; i--) {
+        value = (value << 8) | bytes[i];
+    }
+    return value;
+}
+
+static void mem_image_fail(const char *message) {
+    fprintf(stderr, "%s: %s\n", mem_image_source, message);
+    exit(EXIT_FAILURE);
+}
+
+static unsigned char *read_file(const char *path, size_t *size) {
+    FILE *file = fopen(path, "rb");
+    if (file == NULL) {
+        perror(path);
+        exit(EXIT_FAILURE);
+    }
+    fseek(file, 0, SEEK_END);
+    long length = ftell(file);
+    fseek(file, 0, SEEK_SET);
+    if (length < 0) {
+        perror(path);
+        exit(EXIT_FAILURE);
+    }
+
+    unsigned char *data = (unsigned char *)malloc(length > 0 ? (size_t)length : 1);
+    if (data == NULL || fread(data, 1, (size_t)length, file) != (size_t)length) {
+        mem_image_fail("failed to read the test image");
+    }
+    fclose(file);
+    *size = (size_t)length;
+    return data;
+}
+
+// Size the word buffer to cover [low, high) and zero it, so gaps between
+// segments and .bss read back as zero exactly like the $readmemh image did.
+static void mem_image_allocate(uint64_t low, uint64_t high) {
+    mem_image_first_word = low >> 2;
+    mem_image_word_count = ((high + 3) >> 2) - mem_image_first_word;
+    mem_image_words = (uint32_t *)calloc(mem_image_word_count ? mem_image_word_count : 1,
+                                         sizeof(uint32_t));
+    if (mem_image_words == NULL) {
+        mem_image_fail("out of memory while loading the test image");
+    }
+}
+
+static void mem_image_copy(uint64_t addr, const unsigned char *bytes, uint64_t size) {
+    for (uint64_t i = 0; i < size; i++) {
+        uint64_t byte_addr = addr + i;
+        uint64_t word = (byte_addr >> 2) - mem_image_first_word;
+        mem_image_words[word] |= (uint32_t)bytes[i] << (8 * (byte_addr & 3));
+    }
+}
+
+static void load_raw(const unsigned char *data, size_t size) {
+    mem_image_allocate(MEM_IMAGE_BASE, MEM_IMAGE_BASE + size);
+    mem_image_copy(MEM_IMAGE_BASE, data, size);
+}
+
+// One hex word per line, first line at word 0 (0x80000000), as written by
+// disasm2mem.
+static void load_hex(const char *path) {
+    size_t size;
+    unsigned char *data = read_file(path, &size);
+    uint64_t count = 0;
+
+    for (size_t i = 0; i < size; i++) {
+        if (data[i] == '\n') count++;
+    }
+    if (size > 0 && data[size - 1] != '\n') count++;
+    mem_image_allocate(MEM_IMAGE_BASE, MEM_IMAGE_BASE + 4 * count);
+
+    char *cursor = (char *)data;
+    char *end = (char *)data + size;
+    for (uint64_t word = 0; word < count && cursor < end; word++) {
+        mem_image_words[word] = (uint32_t)strtoul(cursor, NULL, 16);
+        while (cursor < end && *cursor != '\n') cursor++;
+        cursor++;
+    }
+    free(data);
+}
+
+static void load_elf(const unsigned char *data, size_t size) {
+    int is_64 = data[4] == ELF_CLASS_64;
+    if ((data[4] != ELF_CLASS_32 && !is_64) || data[5] != ELF_DATA_LSB) {
+        mem_image_fail("only little-endian ELF32/ELF64 images are supported");
+    }
+
+    size_t ehdr_size = is_64 ? 64 : 52;
+    if (size < ehdr_size) {
+        mem_image_fail("truncated ELF header");
+    }
+    uint64_t phoff     = is_64 ? read_le(data + 32, 8) : read_le(data + 28, 4);
+    uint64_t phentsize = is_64 ? read_le(data + 54, 2) : read_le(data + 42, 2);
+    uint64_t phnum     = is_64 ? read_le(data + 56, 2) : read_le(data + 44, 2);
+    if (phoff + phentsize * phnum > size) {
+        mem_image_fail("program header table lies outside the file");
+    }
+
+    // Two passes: find the span the loadable segments cover, then copy them.
+    uint64_t low = UINT64_MAX;
+    uint64_t high = 0;
+    for (int pass = 0; pass < 2; pass++) {
+        for (uint64_t i = 0; i < phnum; i++) {
+            const unsigned char *phdr = data + phoff + i * phentsize;
+            if (read_le(phdr, 4) != ELF_PT_LOAD) {
+                continue;
+            }
+            uint64_t offset = is_64 ? read_le(phdr + 8, 8)  : read_le(phdr + 4, 4);
+            uint64_t paddr  = is_64 ? read_le(phdr + 24, 8) : read_le(phdr + 12, 4);
+            uint64_t filesz = is_64 ? read_le(phdr + 32, 8) : read_le(phdr + 16, 4);
+            uint64_t memsz  = is_64 ? read_le(phdr + 40, 8) : read_le(phdr + 20, 4);
+            if (memsz == 0) {
+                continue;
+            }
+            if (pass == 0) {
+                if (offset + filesz > size || filesz > memsz) {
+                    mem_image_fail("PT_LOAD segment lies outside the file");
+                }
+                if (paddr < low) low = paddr;
+                if (paddr + memsz > high) high = paddr + memsz;
+            } else {
+                mem_image_copy(paddr, data + offset, filesz);
+            }
+        }
+        if (pass == 0) {
+            if (high == 0) {
+                mem_image_fail("no PT_LOAD segments");
+            }
+            mem_image_allocate(low, high);
+        }
+    }
+}
+
+static void mem_image_load(void) {
+    size_t size;
+    unsigned char *data;
+
+    if (mem_image_is_hex()) {
+        mem_image_source = mem_image_path();
+        load_hex(mem_image_source);
+        mem_image_loaded = 1;
+        return;
+    }
+    if (mem_image_elf_path == NULL) {
+        fprintf(stderr, "No test image given; pass the ELF path to the simulator.\n");
+        exit(EXIT_FAILURE);
+    }
+
+    mem_image_source = mem_image_elf_path;
+    data = read_file(mem_image_source, &size);
+    if (size >= 4 && memcmp(data, ELF_MAGIC, 4) == 0) {
+        load_elf(data, size);
+    } else {
+        load_raw(data, size);
+    }
+    free(data);
+    mem_image_loaded = 1;
+}
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+void mem_image_set_elf(const char *path) {
+    mem_image_elf_path = path;
+}
+
+// DPI-C: yields the next (word index, word) pair of the image and returns 1,
+// or returns 0 once the whole image has been handed out.
+int mem_image_next(int *index, int *word) {
+    if (!mem_image_loaded) {
+        mem_image_load();
+    }
+    if (mem_image_cursor == mem_image_word_count) {
+        free(mem_image_words);
+        mem_image_words = NULL;
+        return 0;
+    }
+
+    *index = (int)((mem_image_first_word + mem_image_cursor) & MEM_IMAGE_WORD_MASK);
+    *word = (int)mem_image_words[mem_image_cursor];
+    mem_image_cursor++;
+    return 1;
+}
+
+#ifdef __cplusplus
+}
+#endif
@@ -0,0 +1,185 @@
+#include <stdio.h>
+#include <stdint.h>
+#include <stdlib.h>
+
+// Sparse backing store for mem_simulated. The 1 GiB word space indexed by
+// addr[29:2] is split into 4 KiB pages that are allocated on first write, so
+// a simulator's resident memory tracks the program's footprint instead of
+// the full array. Reads of untouched pages return zero without allocating.
+// Builds with MAVERIC_DENSE_MEM keep the dense RTL array and do not use this.
+//
+// Boot checkpoints (tb_test_env.cpp) save and restore the page store. Tests
+// that share a checkpoint differ only in a guard range of words; any access to
+// it is noted, so a checkpoint is never taken after the program has looked at
+// bytes another test would see differently.
+//
+// Sampled runs (dromajo_cosim.cpp) start from the memory Dromajo holds at the
+// sample point, handed over through mem_preload_word() instead of the image.
+
+#define MEM_PAGE_WORD_BITS 10
+#define MEM_PAGE_WORDS     (1u << MEM_PAGE_WORD_BITS)
+#define MEM_WORD_MASK      0x0fffffffu
+#define MEM_PAGE_COUNT     ((MEM_WORD_MASK + 1) >> MEM_PAGE_WORD_BITS)
+
+static uint32_t **mem_pages = NULL;
+// Guard range [mem_guard_lo, mem_guard_hi) of word indices; empty by default.
+static uint32_t mem_guard_lo = 0;
+static uint32_t mem_guard_hi = 0;
+static int      mem_guard_touched = 0;
+static int      mem_restored = 0;
+
+static void mem_note_access(uint32_t word_index) {
+    if (word_index - mem_guard_lo < mem_guard_hi - mem_guard_lo) {
+        mem_guard_touched = 1;
+    }
+}
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+int mem_image_next(int *index, int *word);
+
+#ifdef __cplusplus
+}
+#endif
+
+static uint32_t *mem_page_for_write(uint32_t index) {
+    uint32_t page = (index & MEM_WORD_MASK) >> MEM_PAGE_WORD_BITS;
+
+    if (mem_pages == NULL) {
+        mem_pages = (uint32_t **)calloc(MEM_PAGE_COUNT, sizeof(uint32_t *));
+        if (mem_pages == NULL) {
+            fprintf(stderr, "Out of memory allocating the simulated memory page table.\n");
+            exit(EXIT_FAILURE);
+        }
+    }
+    if (mem_pages[page] == NULL) {
+        mem_pages[page] = (uint32_t *)calloc(MEM_PAGE_WORDS, sizeof(uint32_t));
+        if (mem_pages[page] == NULL) {
+            fprintf(stderr, "Out of memory allocating a simulated memory page.\n");
+            exit(EXIT_FAILURE);
+        }
+    }
+    return mem_pages[page];
+}
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+// DPI-C: copies the whole test image (mem_image.c) into the page store.
+void mem_load_image(void) {
+    int index;
+    int word;
+
+    // A restored checkpoint already holds the booted memory (with the guard
+    // range patched in by mem_patch_guard()), and a sampled run the memory
+    // handed over by mem_preload_word().
+    if (mem_restored) {
+        return;
+    }
+    while (mem_image_next(&index, &word)) {
+        uint32_t *page = mem_page_for_write((uint32_t)index);
+        page[(uint32_t)index & (MEM_PAGE_WORDS - 1)] = (uint32_t)word;
+    }
+}
+
+// DPI-C: write_count is not used here. mem_simulated bumps it on every write
+// so that its combinational read path re-evaluates after the store changes.
+int mem_read(int index, int write_count) {
+    uint32_t word_index = (uint32_t)index & MEM_WORD_MASK;
+    const uint32_t *page;
+
+    (void)write_count;
+
+    mem_note_access(word_index);
+    if (mem_pages == NULL) {
+        return 0;
+    }
+    page = mem_pages[word_index >> MEM_PAGE_WORD_BITS];
+    return page != NULL ? (int)page[word_index & (MEM_PAGE_WORDS - 1)] : 0;
+}
+
+void mem_write(int index, int data, uint8_t mask) {
+    mem_note_access((uint32_t)index & MEM_WORD_MASK);
+    uint32_t *page = mem_page_for_write((uint32_t)index);
+    uint32_t *word = &page[(uint32_t)index & (MEM_PAGE_WORDS - 1)];
+    uint32_t byte_mask = 0;
+
+    for (int i = 0; i < 4; i++) {
+        if (mask & (1u << i)) {
+            byte_mask |= 0xffu << (8 * i);
+        }
+    }
+    *word = ((uint32_t)data & byte_mask) | (*word & ~byte_mask);
+}
+
+void mem_set_guard(uint32_t lo, uint32_t hi) {
+    mem_guard_lo = lo;
+    mem_guard_hi = hi > lo ? hi : lo;
+}
+
+int mem_guard_was_touched(void) {
+    return mem_guard_touched;
+}
+
+// Checkpoint layout: the number of allocated pages, then each page's index
+// followed by its words.
+int mem_checkpoint_save(FILE *file) {
+    uint32_t count = 0;
+
+    for (uint32_t page = 0; mem_pages != NULL && page < MEM_PAGE_COUNT; page++) {
+        if (mem_pages[page] != NULL) count++;
+    }
+    if (fwrite(&count, sizeof(count), 1, file) != 1) return -1;
+    for (uint32_t page = 0; mem_pages != NULL && page < MEM_PAGE_COUNT; page++) {
+        if (mem_pages[page] == NULL) continue;
+        if (fwrite(&page, sizeof(page), 1, file) != 1 ||
+            fwrite(mem_pages[page], sizeof(uint32_t), MEM_PAGE_WORDS, file) != MEM_PAGE_WORDS) {
+            return -1;
+        }
+    }
+    return 0;
+}
+
+int mem_checkpoint_restore(FILE *file) {
+    uint32_t count;
+
+    if (fread(&count, sizeof(count), 1, file) != 1) return -1;
+    for (uint32_t i = 0; i < count; i++) {
+        uint32_t page;
+        if (fread(&page, sizeof(page), 1, file) != 1 || page >= MEM_PAGE_COUNT) return -1;
+        uint32_t *words = mem_page_for_write(page << MEM_PAGE_WORD_BITS);
+        if (fread(words, sizeof(uint32_t), MEM_PAGE_WORDS, file) != MEM_PAGE_WORDS) return -1;
+    }
+    mem_restored = 1;
+    return 0;
+}
+
+// Overwrite the guard range of a restored memory with this run's own test
+// image, which is where it differs from the image the checkpoint was taken
+// with.
+void mem_patch_guard(void) {
+    int index;
+    int word;
+
+    while (mem_image_next(&index, &word)) {
+        uint32_t word_index = (uint32_t)index & MEM_WORD_MASK;
+        if (word_index - mem_guard_lo < mem_guard_hi - mem_guard_lo) {
+            uint32_t *page = mem_page_for_write(word_index);
+            page[word_index & (MEM_PAGE_WORDS - 1)] = (uint32_t)word;
+        }
+    }
+}
+
+// Store one word before the RTL starts, in place of the test image.
+void mem_preload_word(uint32_t index, uint32_t word) {
+    uint32_t *page = mem_page_for_write(index);
+    page[index & (MEM_PAGE_WORDS - 1)] = word;
+    mem_restored = 1;
+}
+
+#ifdef __cplusplus
+}
+#endif
@@ -3,9 +3,16 @@
 #include <stdlib.h>
 
 #define PMEM_WRITE_FILE_ENV "MAVERIC_PMEM_WRITE_FILE"
+// MMIO bytes are buffered and written out a line at a time (or when the
+// buffer fills, or at exit) instead of one write() per byte.
+#define PMEM_WRITE_BUFFER_BYTES (64 * 1024)
 
 static FILE *pmem_write_file = NULL;
+static const char *pmem_write_file_path = NULL;
+// Size of the file when it was opened: this run's output starts there.
+static long pmem_write_file_start = 0;
 static int pmem_write_file_failed = 0;
+static char pmem_write_buffer[PMEM_WRITE_BUFFER_BYTES];
 
 static void close_pmem_write_file(void) {
     if (pmem_write_file != NULL) {
@@ -15,8 +22,6 @@ static void close_pmem_write_file(void) {
 }
 
 static FILE *get_pmem_write_file(void) {
-    const char *pmem_write_file_path;
-
     if (pmem_write_file != NULL) {
         return pmem_write_file;
     }
@@ -37,6 +42,9 @@ static FILE *get_pmem_write_file(void) {
         return stdout;
     }
 
+    setvbuf(pmem_write_file, pmem_write_buffer, _IOFBF, sizeof(pmem_write_buffer));
+    fseek(pmem_write_file, 0, SEEK_END);
+    pmem_write_file_start = ftell(pmem_write_file);
     atexit(close_pmem_write_file);
     return pmem_write_file;
 }
@@ -49,10 +57,59 @@ void pmem_write(uint64_t waddr, uint64_t wdata, uint8_t wmask) {
     (void)waddr;
     (void)wmask;
 
+    FILE *out = get_pmem_write_file();
+    int ch = (int)(wdata & 0xff);
+
+    putc(ch, out);
+    if (ch == '\n') {
+        fflush(out);
+    }
+}
+
+// Boot checkpoints (tb_test_env.cpp) carry the console output written so far,
+// so a restored run's console file reads as if it had booted itself. Output
+// that went to stdout is not carried.
+int pmem_checkpoint_save(FILE *file) {
+    uint64_t size = 0;
+    FILE *out = get_pmem_write_file();
+    FILE *in = NULL;
+
+    if (out != stdout) {
+        fflush(out);
+        size = (uint64_t)(ftell(out) - pmem_write_file_start);
+        in = fopen(pmem_write_file_path, "rb");
+        if (in == NULL || fseek(in, pmem_write_file_start, SEEK_SET) != 0) {
+            if (in != NULL) fclose(in);
+            return -1;
+        }
+    }
+    if (fwrite(&size, sizeof(size), 1, file) != 1) {
+        if (in != NULL) fclose(in);
+        return -1;
+    }
+    for (uint64_t i = 0; i < size; i++) {
+        int ch = getc(in);
+        if (ch == EOF || putc(ch, file) == EOF) {
+            fclose(in);
+            return -1;
+        }
+    }
+    if (in != NULL) fclose(in);
+    return 0;
+}
+
+int pmem_checkpoint_restore(FILE *file) {
+    uint64_t size;
     FILE *out = get_pmem_write_file();
 
-    fputc((int)(wdata & 0xff), out);
+    if (fread(&size, sizeof(size), 1, file) != 1) return -1;
+    for (uint64_t i = 0; i < size; i++) {
+        int ch = getc(file);
+        if (ch == EOF) return -1;
+        putc(ch, out);
+    }
     fflush(out);
+    return 0;
 }
 
 #ifdef __cplusplus
@@ -4,41 +4,71 @@
 #include <stdint.h>
 #include <inttypes.h>
 
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+// DPI-C: called from the final block of rtl/perf_counters.sv when the
+// simulation ends. Prints the headline figures for people reading res.txt,
+// then every counter on one "Perf record:" line of name=value pairs that
+// run_tests.py parses into results/perf_records.jsonl. Keep the names in step
+// with PERF_COUNTER_NAMES there.
 void report_perf(
     uint64_t cycle_count,
     uint64_t instr_count,
-    uint64_t stall_cycles,
+    uint64_t stall_cache_cycles,
+    uint64_t stall_mmu_cycles,
+    uint64_t stall_mdu_cycles,
+    uint64_t stall_serialize_cycles,
+    uint64_t flush_branch_cycles,
+    uint64_t stall_load_use_cycles,
     uint64_t icache_hits,
     uint64_t icache_misses,
     uint64_t dcache_hits,
     uint64_t dcache_misses,
+    uint64_t branch_total,
     uint64_t branch_mispred
 ) {
     if (instr_count > 0) {
-
         printf("CPI                 : %.4f\n",
                (double)cycle_count / (double)instr_count);
 
-        if (cycle_count > stall_cycles) {
-
-                printf("PIPELINE CPI        : %.4f\n",
-                   (double)(cycle_count - stall_cycles) / (double)instr_count);
-
+        // Pipeline CPI leaves out the cycles spent waiting on memory.
+        if (cycle_count > stall_cache_cycles) {
+            printf("PIPELINE CPI        : %.4f\n",
+                   (double)(cycle_count - stall_cache_cycles) / (double)instr_count);
         }
-
     }
-    if (icache_hits + icache_misses > 0) {
 
+    if (icache_hits + icache_misses > 0) {
         printf("I$ HIT RATE         : %.2f%%\n",
                100.0 * (double)icache_hits / (double)(icache_hits + icache_misses));
-
     }
 
     if (dcache_hits + dcache_misses > 0) {
-
-
         printf("D$ HIT RATE         : %.2f%%\n",
                100.0 * (double)dcache_hits / (double)(dcache_hits + dcache_misses));
+    }
 
+    if (branch_total > 0) {
+        printf("BRANCH ACCURACY     : %.2f%%\n",
+               100.0 * (double)(branch_total - branch_mispred) / (double)branch_total);
     }
+
+    printf("Perf record: cycles=%" PRIu64 " instret=%" PRIu64
+           " stall_cache=%" PRIu64 " stall_mmu=%" PRIu64 " stall_mdu=%" PRIu64
+           " stall_serialize=%" PRIu64 " flush_branch=%" PRIu64
+           " stall_load_use=%" PRIu64 " icache_hits=%" PRIu64
+           " icache_misses=%" PRIu64 " dcache_hits=%" PRIu64
+           " dcache_misses=%" PRIu64 " branches=%" PRIu64
+           " branch_mispredicts=%" PRIu64 "\n",
+           cycle_count, instr_count, stall_cache_cycles, stall_mmu_cycles,
+           stall_mdu_cycles, stall_serialize_cycles, flush_branch_cycles,
+           stall_load_use_cycles, icache_hits, icache_misses, dcache_hits,
+           dcache_misses, branch_total, branch_mispred);
+    fflush(stdout);
+}
+
+#ifdef __cplusplus
 }
+#endif
@@ -1,12 +1,21 @@
 #include <stdlib.h>
 #include <iostream>
+#include <csignal>
 #include <cstdlib>
 #include <cstdint>
+#include <chrono>
 #include <memory>
+#include <sys/resource.h>
 #include <verilated.h>
 #include <verilated_fst_c.h>
 #include <verilated_cov.h>
 #include "Vtest_env.h"
+#ifdef MAVERIC_CHECKPOINT
+#include <string>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <verilated_save.h>
+#endif
 
 // Backstop only: runs normally end at a retired ebreak/ecall (check.c) or
 // self-loop (check_self_loop). run_tests.py lowers the budget for tests that
@@ -15,11 +24,22 @@
 vluint64_t sim_time = 0;
 vluint64_t posedge_cnt = 0;
 
+// run_tests.py stops runs (timeouts, log caps, Ctrl-C) with SIGTERM. Leave the
+// simulation loop and exit normally so the buffered trace and PMEM output are
+// flushed by their atexit handlers instead of being lost.
+static volatile std::sig_atomic_t stop_requested = 0;
+
+static void request_stop(int) {
+    stop_requested = 1;
+}
+
 #ifdef DROMAJO_COSIM
 // Dromajo co-simulation interface (defined in dromajo_cosim.cpp).
 extern "C" void dromajo_init(const char *elf_path);
 extern "C" void dromajo_fini();
 extern "C" int  dromajo_has_error();
+extern "C" int  dromajo_sample_setup();
+extern "C" void dromajo_sample_report();
 #endif
 
 extern "C" int check_final(uint16_t branch_total, uint16_t branch_mispred);
@@ -29,6 +49,32 @@ static const char *env_or(const char *name, const char *fallback) {
     return (value != NULL && value[0] != '\0') ? value : fallback;
 }
 
+// Native ELF loader behind mem_simulated's mem_image_next hook (mem_image.c).
+extern "C" void mem_image_set_elf(const char *path);
+
+// DPI-C: mem_simulated reads a $readmemh hex image instead of loading the ELF
+// when MAVERIC_MEM_IMAGE_FILE names one (run_tests.py --hex-image).
+extern "C" int mem_image_is_hex() {
+    const char *value = getenv("MAVERIC_MEM_IMAGE_FILE");
+    return value != NULL && value[0] != '\0';
+}
+
+extern "C" const char *mem_image_path() {
+    const char *value = getenv("MAVERIC_MEM_IMAGE_FILE");
+    if (value == NULL || value[0] == '\0') {
+        fprintf(stderr, "MAVERIC_MEM_IMAGE_FILE is not set; no memory image to load.\n");
+        exit(EXIT_FAILURE);
+    }
+    return value;
+}
+
+// log_trace.c calls this on the first mismatch against the reference trace
+// (MAVERIC_REFERENCE_TRACE_FILE); like cosim_fail() it ends the run at the end
+// of the current evaluation.
+extern "C" void sim_request_finish() {
+    Verilated::gotFinish(true);
+}
+
 static vluint64_t max_sim_time_from_env(void) {
     const char *value = getenv("MAVERIC_MAX_SIM_TIME");
     if (value == NULL || value[0] == '\0') {
@@ -37,6 +83,185 @@ static vluint64_t max_sim_time_from_env(void) {
     return strtoull(value, NULL, 10);
 }
 
+#ifdef MAVERIC_CHECKPOINT
+// Boot checkpoints (run_tests.py; builds with --savable). Tests that differ
+// only in a guard range of memory words (MAVERIC_CHECKPOINT_GUARD=lo:hi, the
+// word indices mem_simulated uses) boot identically until the program first
+// touches that range. One of them runs with MAVERIC_CHECKPOINT_SAVE=<dir>:
+// it stages a checkpoint every MAVERIC_CHECKPOINT_INTERVAL cycles and, on the
+// first access to the guard range, publishes the latest one as <dir>. The
+// others run with MAVERIC_CHECKPOINT_RESTORE=<dir>, patch their own guard
+// words into the restored memory and carry on from there.
+#define CHECKPOINT_MAGIC 0x314b5043564d4dULL  // "MMVCPK1"
+#define CHECKPOINT_VERSION 1
+#define DEFAULT_CHECKPOINT_INTERVAL 1000000ULL
+
+extern "C" void mem_set_guard(uint32_t lo, uint32_t hi);
+extern "C" int  mem_guard_was_touched(void);
+extern "C" int  mem_checkpoint_save(FILE *file);
+extern "C" int  mem_checkpoint_restore(FILE *file);
+extern "C" void mem_patch_guard(void);
+extern "C" int  check_checkpoint_save(FILE *file);
+extern "C" int  check_checkpoint_restore(FILE *file);
+extern "C" int  pmem_checkpoint_save(FILE *file);
+extern "C" int  pmem_checkpoint_restore(FILE *file);
+#ifdef DROMAJO_COSIM
+extern "C" void dromajo_checkpoint_record(int enable);
+extern "C" int  dromajo_checkpoint_save(FILE *file);
+extern "C" int  dromajo_checkpoint_restore(FILE *file);
+#endif
+
+static std::string checkpoint_dir;
+static std::string checkpoint_staging;
+static vluint64_t  checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL;
+static vluint64_t  checkpoint_cycle = 0;  // cycle of the latest staged checkpoint
+static bool        checkpoint_saving = false;
+
+// The model and state files are written under temporary names and renamed,
+// so the staging directory always holds one complete checkpoint.
+static bool checkpoint_write(Vtest_env *dut) {
+    const std::string model = checkpoint_staging + "/model";
+    const std::string state = checkpoint_staging + "/state";
+    {
+        VerilatedSave os;
+        os.open((model + ".new").c_str());
+        if (!os.isOpen()) {
+            return false;
+        }
+        os << *dut;
+        os.close();
+    }
+
+    FILE *file = fopen((state + ".new").c_str(), "wb");
+    if (file == NULL) {
+        return false;
+    }
+    const uint64_t header[] = {CHECKPOINT_MAGIC, CHECKPOINT_VERSION, sim_time, posedge_cnt};
+    bool ok = fwrite(header, sizeof(header), 1, file) == 1 &&
+              check_checkpoint_save(file) == 0 &&
+              mem_checkpoint_save(file) == 0 &&
+              pmem_checkpoint_save(file) == 0;
+#ifdef DROMAJO_COSIM
+    ok = ok && dromajo_checkpoint_save(file) == 0;
+#endif
+    ok = fclose(file) == 0 && ok;
+    return ok &&
+           rename((model + ".new").c_str(), model.c_str()) == 0 &&
+           rename((state + ".new").c_str(), state.c_str()) == 0;
+}
+
+static void checkpoint_stop_saving(bool publish) {
+    if (publish && rename(checkpoint_staging.c_str(), checkpoint_dir.c_str()) == 0) {
+        printf("Checkpoint saved at cycle %llu\n", (unsigned long long)checkpoint_cycle);
+    } else {
+        // Nothing worth keeping, or another run published the same checkpoint.
+        for (const char *name : {"/model", "/model.new", "/state", "/state.new"}) {
+            unlink((checkpoint_staging + name).c_str());
+        }
+        rmdir(checkpoint_staging.c_str());
+    }
+    checkpoint_saving = false;
+#ifdef DROMAJO_COSIM
+    dromajo_checkpoint_record(0);
+#endif
+}
+
+static void checkpoint_restore(Vtest_env *dut, const std::string &dir) {
+    const std::string state = dir + "/state";
+    {
+        VerilatedRestore os;
+        os.open((dir + "/model").c_str());
+        os >> *dut;
+        os.close();
+    }
+
+    FILE *file = fopen(state.c_str(), "rb");
+    if (file == NULL) {
+        perror(state.c_str());
+        exit(EXIT_FAILURE);
+    }
+    uint64_t header[4];
+    bool ok = fread(header, sizeof(header), 1, file) == 1 &&
+              header[0] == CHECKPOINT_MAGIC && header[1] == CHECKPOINT_VERSION &&
+              check_checkpoint_restore(file) == 0 &&
+              mem_checkpoint_restore(file) == 0 &&
+              pmem_checkpoint_restore(file) == 0;
+#ifdef DROMAJO_COSIM
+    ok = ok && dromajo_checkpoint_restore(file) == 0;
+#endif
+    fclose(file);
+    if (!ok) {
+        fprintf(stderr, "%s: unreadable or incompatible checkpoint\n", state.c_str());
+        exit(EXIT_FAILURE);
+    }
+    sim_time = header[2];
+    posedge_cnt = header[3];
+    mem_patch_guard();
+    printf("Restored checkpoint at cycle %llu\n", (unsigned long long)posedge_cnt);
+}
+
+static void checkpoint_setup(Vtest_env *dut) {
+    const char *guard = getenv("MAVERIC_CHECKPOINT_GUARD");
+    unsigned long lo = 0;
+    unsigned long hi = 0;
+    if (guard == NULL || sscanf(guard, "%lu:%lu", &lo, &hi) != 2) {
+        return;
+    }
+    mem_set_guard((uint32_t)lo, (uint32_t)hi);
+
+    const char *restore_dir = getenv("MAVERIC_CHECKPOINT_RESTORE");
+    if (restore_dir != NULL && restore_dir[0] != '\0') {
+        checkpoint_restore(dut, restore_dir);
+        return;
+    }
+
+    const char *save_dir = getenv("MAVERIC_CHECKPOINT_SAVE");
+    if (save_dir == NULL || save_dir[0] == '\0') {
+        return;
+    }
+    checkpoint_dir = save_dir;
+    checkpoint_staging = checkpoint_dir + ".tmp-" + std::to_string(getpid());
+    checkpoint_interval = strtoull(env_or("MAVERIC_CHECKPOINT_INTERVAL", "0"), NULL, 10);
+    if (checkpoint_interval == 0) {
+        checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL;
+    }
+    if (mkdir(checkpoint_staging.c_str(), 0777) != 0) {
+        perror(checkpoint_staging.c_str());
+        return;
+    }
+    checkpoint_saving = true;
+#ifdef DROMAJO_COSIM
+    dromajo_checkpoint_record(1);
+#endif
+}
+
+// Called after every rising edge. The guard is checked before saving, so a
+// checkpoint never includes a cycle that read or wrote the guard range.
+static void checkpoint_tick(Vtest_env *dut) {
+    if (!checkpoint_saving) {
+        return;
+    }
+#ifdef DROMAJO_COSIM
+    if (dromajo_has_error()) {
+        checkpoint_stop_saving(false);
+        return;
+    }
+#endif
+    if (mem_guard_was_touched()) {
+        checkpoint_stop_saving(checkpoint_cycle > 0);
+        return;
+    }
+    if (posedge_cnt % checkpoint_interval == 0) {
+        if (!checkpoint_write(dut)) {
+            fprintf(stderr, "Could not write a checkpoint to %s\n", checkpoint_staging.c_str());
+            checkpoint_stop_saving(false);
+            return;
+        }
+        checkpoint_cycle = posedge_cnt;
+    }
+}
+#endif
+
 void dut_reset (Vtest_env *dut, vluint64_t &sim_time){
     if( sim_time < 100 ){
         dut->arst_i = 1;
@@ -55,12 +280,21 @@ int main(int argc, char** argv, char** env) {
         fprintf(stderr, "Usage: %s <elf_path>\n", argv[0]);
         exit(EXIT_FAILURE);
     }
-#ifdef DROMAJO_COSIM
     const char *elf_path = argv[1];
+    mem_image_set_elf(elf_path);
+#ifdef DROMAJO_COSIM
     dromajo_init(elf_path);
+    // Sampled runs (MAVERIC_SAMPLE_*): a length count or a sample point past
+    // the end of the program needs no RTL.
+    if (dromajo_sample_setup()) {
+        dromajo_sample_report();
+        dromajo_fini();
+        exit(EXIT_SUCCESS);
+    }
 #endif
 
     const vluint64_t max_sim_time = max_sim_time_from_env();
+    std::signal(SIGTERM, request_stop);
 
     Vtest_env *dut = new Vtest_env;
 #if VM_TRACE
@@ -69,7 +303,12 @@ int main(int argc, char** argv, char** env) {
     dut->trace(sim_trace, 10);
     sim_trace->open(env_or("MAVERIC_WAVEFORM_FILE", "waveform.fst"));
 #endif
-    while (sim_time < max_sim_time && (!Verilated::gotFinish())) {
+#ifdef MAVERIC_CHECKPOINT
+    checkpoint_setup(dut);
+#endif
+    const vluint64_t start_cycle = posedge_cnt;
+    const auto start_time = std::chrono::steady_clock::now();
+    while (sim_time < max_sim_time && (!Verilated::gotFinish()) && !stop_requested) {
         dut_reset(dut, sim_time);
         dut->clk_i ^= 1;
         dut->eval();
@@ -81,7 +320,19 @@ int main(int argc, char** argv, char** env) {
         sim_trace->dump(sim_time);
 #endif
         sim_time++;
+#ifdef MAVERIC_CHECKPOINT
+        if (dut->clk_i == 1) {
+            checkpoint_tick(dut);
+        }
+#endif
     }
+#ifdef MAVERIC_CHECKPOINT
+    if (checkpoint_saving) {
+        checkpoint_stop_saving(false);
+    }
+#endif
+    const std::chrono::duration<double> run_time =
+        std::chrono::steady_clock::now() - start_time;
 #if VM_TRACE
     sim_trace->close();
     delete sim_trace;
@@ -89,12 +340,24 @@ int main(int argc, char** argv, char** env) {
 #if VM_COVERAGE
     VerilatedCov::write(env_or("MAVERIC_COVERAGE_FILE", "coverage.dat"));
 #endif
-    if (!Verilated::gotFinish()) {
+    if (!Verilated::gotFinish() && !stop_requested) {
         check_final(0, 0);
     }
 
+    // run_tests.py reports this per test to compare --sim-profile builds.
+    // A run restored from a checkpoint counts only the cycles it simulated.
+    printf("Simulated %llu cycles in %.3f s\n",
+           (unsigned long long)(posedge_cnt - start_cycle), run_time.count());
+    // ... and learns each test's memory footprint from this (Linux reports
+    // ru_maxrss in KiB) to decide how many tests fit next to each other.
+    struct rusage usage;
+    if (getrusage(RUSAGE_SELF, &usage) == 0) {
+        printf("Peak memory: %ld KiB\n", (long)usage.ru_maxrss);
+    }
+
     int cosim_failed = 0;
 #ifdef DROMAJO_COSIM
+    dromajo_sample_report();
     cosim_failed = dromajo_has_error();
     dromajo_fini();
 #endif